@@ -0,0 +1,342 @@
+"""Reductions over the fields of PLACE experiments, larger than memory
+
+The functions here average, sum or take the root mean square of array
+fields (such as traces) over the updates of an experiment, reading the data
+a chunk at a time through :class:`place.reader.Experiment`, so experiments
+of any size and any storage layout can be reduced. For example, to average
+the traces recorded at each stage position::
+
+    from place.analysis import reduce
+
+    means = reduce('/path/to/experiment', 'ATS660-trace', by='LongStage-position')
+    for position, count, trace in means:
+        ...
+
+The result is a NumPy structured array. Given an ``output`` directory, it
+is also saved there as an experiment of its own (a ``config.json`` and a
+``data.npy``), which can be opened like any other experiment.
+
+The same reductions are available from the ``place_reduce`` command.
+"""
+import argparse
+import json
+import os
+from functools import partial
+
+import numpy as np
+
+from .reader import CHUNK_BYTES, Experiment
+from .storage import write_json
+from .utilities import read_ahead
+
+OPERATIONS = ('mean', 'sum', 'rms')
+"""The reductions that can be computed"""
+
+
+def main():
+    """Command-line entry point for reducing experiments"""
+    parser = argparse.ArgumentParser(
+        description='Average, sum or take the RMS of fields of a PLACE experiment, '
+                    'or average repeated experiments, saving the result as a new '
+                    'experiment.')
+    parser.add_argument('directories', metavar='DIRECTORY', nargs='+',
+                        help='a PLACE experiment directory (several with --stack)')
+    parser.add_argument('--field', action='append', required=True,
+                        help='a field to reduce (can be given more than once)')
+    parser.add_argument('--output', required=True,
+                        help='the directory of the new experiment')
+    parser.add_argument('--operation', choices=OPERATIONS, default='mean',
+                        help='the reduction (default: mean)')
+    parser.add_argument('--by', help='reduce each group of updates with the same '
+                                     'value in this field, such as a stage position')
+    parser.add_argument('--decimals', type=int,
+                        help='round the --by values to this many decimals first')
+    parser.add_argument('--stack', action='store_true',
+                        help='average the experiments, update by update')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='the number of chunks read at the same time (default: 1)')
+    args = parser.parse_args()
+    if args.stack:
+        result = stack(args.directories, args.field, workers=args.workers, output=args.output)
+    else:
+        if len(args.directories) > 1:
+            parser.error('only one DIRECTORY can be reduced, unless --stack is used')
+        result = reduce(args.directories[0], args.field, operation=args.operation,
+                        by=args.by, decimals=args.decimals, workers=args.workers,
+                        output=args.output)
+    print('{}: {} rows'.format(args.output, len(result)))
+
+
+def reduce(directory, fields, operation='mean', by=None, decimals=None,
+           chunk=None, workers=1, output=None):
+    """Reduce fields over the updates of an experiment
+
+    The values are accumulated in 64-bit floating point, a chunk of updates
+    at a time.
+
+    :param directory: the experiment directory
+    :type directory: str
+
+    :param fields: the field, or fields, to reduce
+    :type fields: str or list
+
+    :param operation: ``mean``, ``sum`` or ``rms``
+    :type operation: str
+
+    :param by: (optional) a scalar field, such as a stage position; the
+               updates with each value are reduced separately
+    :type by: str
+
+    :param decimals: (optional) round the values of ``by`` to this many
+                     decimals, so that nearly equal positions are grouped
+                     together
+    :type decimals: int
+
+    :param chunk: the number of updates read at a time (default: about
+                  16 MiB of values)
+    :type chunk: int
+
+    :param workers: the number of chunks read and reduced at the same time
+    :type workers: int
+
+    :param output: (optional) a new directory in which to save the result
+                   as an experiment
+    :type output: str
+
+    :returns: one row for each value of ``by`` (in increasing order), or a
+              single row, holding that value, the number of updates reduced
+              and the result for each field
+    :rtype: numpy.array
+
+    :raises KeyError: if the experiment has no such field
+    :raises ValueError: if the operation is unknown, a field is not
+                        numeric, or ``by`` is not a scalar field
+    """
+    if operation not in OPERATIONS:
+        raise ValueError('unknown operation: {}'.format(operation))
+    experiment = Experiment(directory)
+    fields = _field_list(experiment, fields)
+    if by is not None:
+        if by not in experiment:
+            raise KeyError(by)
+        if experiment.dtype[by].shape:
+            raise ValueError('{} is not a scalar field'.format(by))
+    work = partial(_reduce_chunk, experiment, fields, by, decimals, operation == 'rms')
+    total = None
+    for part in _map(work, _spans(experiment, fields, chunk), workers):
+        total = _merge(total, part)
+    dtype = [(by, experiment.dtype[by])] if by is not None else []
+    dtype.append(('count', np.int64))
+    dtype.extend((name, np.float64, experiment.dtype[name].shape) for name in fields)
+    if total is None:
+        result = np.zeros(0 if by is not None else 1, dtype=dtype)
+    else:
+        keys, counts, sums, squares = total
+        result = np.zeros(len(keys), dtype=dtype)
+        if by is not None:
+            result[by] = keys
+        result['count'] = counts
+        for name, values, square in zip(fields, sums, squares):
+            scale = counts.reshape((-1,) + (1,) * (values.ndim - 1))
+            if operation == 'mean':
+                result[name] = values / scale
+            elif operation == 'sum':
+                result[name] = values
+            else:
+                result[name] = np.sqrt(square / scale)
+    if output is not None:
+        _save(output, result, [experiment], {
+            'operation': operation, 'fields': fields, 'by': by, 'decimals': decimals})
+    return result
+
+
+def stack(directories, fields, chunk=None, workers=1, output=None):
+    """Average repeated experiments, update by update
+
+    The other fields are copied from the first experiment, so the result has
+    the same fields, and is used in the same way, as each of the
+    experiments. Only as many updates as the shortest experiment has are
+    stacked.
+
+    :param directories: the experiment directories
+    :type directories: list
+
+    :param fields: the field, or fields, to average
+    :type fields: str or list
+
+    :param chunk: the number of updates read at a time (default: about
+                  16 MiB of values)
+    :type chunk: int
+
+    :param workers: the number of chunks read and averaged at the same time
+    :type workers: int
+
+    :param output: (optional) a new directory in which to save the result
+                   as an experiment; the result is written straight to its
+                   ``data.npy``, so it need not fit in memory
+    :type output: str
+
+    :returns: one row for each update
+    :rtype: numpy.array, or numpy.memmap if ``output`` is given
+
+    :raises KeyError: if an experiment does not have a field
+    :raises ValueError: if the experiments are not alike
+    """
+    experiments = [Experiment(directory) for directory in directories]
+    if not experiments:
+        raise ValueError('no experiments to stack')
+    first = experiments[0]
+    fields = _field_list(first, fields)
+    for experiment in experiments[1:]:
+        for name in fields:
+            if name not in experiment or experiment.dtype[name].shape != first.dtype[name].shape:
+                raise ValueError('{} does not match in {}'.format(name, experiment.directory))
+    length = min(len(experiment) for experiment in experiments)
+    dtype = [(name, np.float64, first.dtype[name].shape) if name in fields
+             else (name, first.dtype[name]) for name in first.names]
+    if output is None:
+        result = np.zeros(length, dtype=dtype)
+    else:
+        result = _create(output, length, dtype, experiments, {
+            'operation': 'stack', 'fields': fields})
+
+    def _stack_chunk(span):
+        start, stop = span
+        rows = result[start:stop]
+        for name in first.names:
+            if name not in fields:
+                rows[name] = first.field(name, start, stop)
+        for name in fields:
+            total = np.zeros(rows[name].shape)
+            for experiment in experiments:
+                total += experiment.field(name, start, stop)
+            rows[name] = total / len(experiments)
+
+    for _ in _map(_stack_chunk, _spans(first, fields, chunk, length), workers):
+        pass
+    if output is None:
+        return result
+    result.flush()
+    del result
+    return _finish(output)
+
+
+def _field_list(experiment, fields):
+    """Check the fields to be reduced"""
+    fields = [fields] if isinstance(fields, str) else list(fields)
+    for name in fields:
+        if name not in experiment:
+            raise KeyError(name)
+        if experiment.dtype[name].base.kind not in 'biuf':
+            raise ValueError('{} is not a numeric field'.format(name))
+    return fields
+
+
+def _spans(experiment, fields, chunk, length=None):
+    """Split the updates into chunks of about CHUNK_BYTES of 64-bit values"""
+    length = len(experiment) if length is None else length
+    if chunk is None:
+        row_bytes = sum(8 * max(1, int(np.prod(experiment.dtype[name].shape)))
+                        for name in fields)
+        chunk = max(1, CHUNK_BYTES // row_bytes)
+    return [(start, min(start + chunk, length)) for start in range(0, length, chunk)]
+
+
+def _map(func, items, workers):
+    """Call a function for each item, in order, on a pool of threads if asked"""
+    if workers <= 1:
+        return map(func, items)
+    return read_ahead(func, items, workers)
+
+
+def _reduce_chunk(experiment, fields, by, decimals, squares, span):
+    """Sum the values (and squares) of one chunk, for each value of ``by``
+
+    The sums for each value are taken as one matrix product, with a matrix
+    selecting the updates with that value, which is much faster than
+    summing the groups one at a time.
+
+    :returns: the values of ``by``, and the count, sums and sums of squares
+              for each of them
+    :rtype: tuple
+    """
+    start, stop = span
+    if by is None:
+        keys = np.zeros(1)
+        selection = np.ones((1, stop - start))
+    else:
+        values = np.asarray(experiment.field(by, start, stop))
+        if decimals is not None:
+            values = np.round(values, decimals)
+        keys, inverse = np.unique(values, return_inverse=True)
+        selection = np.zeros((len(keys), stop - start))
+        selection[inverse.ravel(), np.arange(stop - start)] = 1.0
+    sums = []
+    square_sums = []
+    for name in fields:
+        values = np.asarray(experiment.field(name, start, stop), dtype=np.float64)
+        shape = (len(keys),) + values.shape[1:]
+        values = values.reshape(len(values), -1)
+        sums.append((selection @ values).reshape(shape))
+        square_sums.append((selection @ (values * values)).reshape(shape) if squares else None)
+    return keys, selection.sum(axis=1).astype(np.int64), sums, square_sums
+
+
+def _merge(total, part):
+    """Add the sums of one chunk to the running total"""
+    if total is None:
+        return part
+    if np.array_equal(total[0], part[0]):
+        keys = total[0]
+        first = second = slice(None)
+    else:
+        keys = np.union1d(total[0], part[0])
+        first = np.searchsorted(keys, total[0])
+        second = np.searchsorted(keys, part[0])
+
+    def _add(old, new):
+        if old is None:
+            return None
+        combined = np.zeros((len(keys),) + old.shape[1:], dtype=old.dtype)
+        combined[first] += old
+        combined[second] += new
+        return combined
+
+    return (keys, _add(total[1], part[1]),
+            [_add(*values) for values in zip(total[2], part[2])],
+            [_add(*values) for values in zip(total[3], part[3])])
+
+
+def _save(output, result, sources, analysis):
+    """Save a result, held in memory, as an experiment"""
+    data = _create(output, len(result), result.dtype, sources, analysis)
+    data[:] = result
+    data.flush()
+    del data
+    _finish(output)
+
+
+def _create(output, length, dtype, sources, analysis):
+    """Create the directory and configuration of a new experiment, and a
+    memory-mapped ``data.npy.part`` for its data
+
+    :raises FileExistsError: if the directory already exists
+    """
+    output = os.path.abspath(output)
+    os.makedirs(output)
+    config = json.loads(json.dumps(sources[0].config))
+    config['directory'] = output
+    config['updates'] = length
+    config['title'] = '{} ({})'.format(config.get('title', ''), analysis['operation']).strip()
+    analysis['sources'] = [experiment.directory for experiment in sources]
+    config.setdefault('metadata', {})['analysis'] = analysis
+    write_json(os.path.join(output, 'config.json'), config)
+    return np.lib.format.open_memmap(
+        os.path.join(output, 'data.npy.part'), mode='w+', dtype=dtype, shape=(length,))
+
+
+def _finish(output):
+    """Move the completed ``data.npy`` into place, and open it"""
+    filename = os.path.join(output, 'data.npy')
+    os.replace(filename + '.part', filename)
+    return np.load(filename, mmap_mode='r')
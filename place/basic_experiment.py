@@ -3,10 +3,13 @@ import datetime
 import json
 import os
 from importlib import import_module
+from functools import partial
 from operator import attrgetter
-from time import time
+from time import monotonic, time
 from threading import Event
 import copy
+import cProfile
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import pkg_resources
 import numpy as np
@@ -15,17 +18,18 @@ from numpy.lib import recfunctions as rfn
 
 from placeweb.settings import MEDIA_ROOT
 
+from .config import PlaceConfig
 from .place_progress import PlaceProgress
-from .plots import PlacePlotter
+from .plots import PlacePlotter, wait_for_plots
 from .plugins.export import Export
-from .plugins.instrument import Instrument
+from .plugins.instrument import AbortExperiment, Instrument
 from .plugins.postprocessing import PostProcessing
-from .utilities import build_single_file
+from .pipeline import Stage
+from .preview import PreviewFiles
+from .storage import open_storage, write_json
 
 
-class AbortExperiment(Exception):
-    """Custom exceptions for aborting an experiment"""
-    pass
+_TIME_FIELD = ('PLACE-time', 'datetime64[us]')
 
 
 class BasicExperiment:
@@ -49,41 +53,136 @@ class BasicExperiment:
     |               |                         | the beginning of each   |
     |               |                         | update                  |
     +---------------+-------------------------+-------------------------+
+
+    Some behaviour of the experiment can be changed with experiment options.
+    These are read from the experiment configuration data, if present, or
+    else from the ``[Experiment]`` section of the PLACE config file:
+
+    =================== ======= ================================================
+    Option              Default Meaning
+    =================== ======= ================================================
+    storage             files   how rows are written to disk (see
+                                :mod:`place.storage`)
+    compression         zlib    the codec used by the ``compressed`` storage
+                                mode (``zlib``, ``zstd`` or ``lz4``)
+    durability          none    how often the data is synchronized to the disk:
+                                ``none``, ``update`` or a number of updates
+                                (see :mod:`place.storage`)
+    pipeline_depth      0       if greater than zero, overlap the instrument
+                                updates with post-processing and storage,
+                                letting up to this many updates wait to be saved
+    parallel_updates    false   update instruments with equal priority at the
+                                same time
+    parallel_config     false   configure, and clean up, instruments with equal
+                                priority at the same time
+    batch_size          1       the number of updates requested from each plugin
+                                at once (see ``Instrument.update_block``)
+    profile             false   run each phase under ``cProfile`` and save the
+                                statistics as ``profile_<phase>.prof`` in the
+                                experiment directory
+    checkpoint          true    save ``checkpoint.json`` in the experiment
+                                directory as updates are saved, so the
+                                experiment can be resumed if it is interrupted
+    checkpoint_interval 1.0     the least time, in seconds, between checkpoints
+                                when the durability is ``none``; with any other
+                                durability, a checkpoint is saved each time the
+                                data is synchronized
+    preview             true    save a min/max preview of the traces as they
+                                are written (see :mod:`place.preview`)
+    =================== ======= ================================================
+
+    The time taken by each plugin's config, update, cleanup, export and
+    plotting calls, and by the storage of each update, is recorded in the
+    progress (under ``timings``) and saved into ``results.json``.
+
+    Instruments can also be updated (and configured, and cleaned up) at the
+    same time by giving them the same ``parallel_group`` value in their
+    plugin configuration (next to their ``priority``). Only instruments that
+    are next to each other in priority order are grouped. The data returned
+    by a group is always merged in priority order. When a group is
+    configured, each instrument records its metadata into its own copy of
+    the metadata, and the copies are merged in priority order. If several
+    instruments in a group fail, their errors are reported together.
+
+    The checkpoint records the last update that was saved and the state
+    returned by the ``checkpoint`` method of each plugin. An interrupted
+    experiment is resumed by constructing the experiment with ``resume=True``
+    and the configuration saved in its ``config.json``. The plugins are
+    configured again, given their saved state through their ``resume``
+    method, and the updates continue in the same directory from the update
+    after the checkpoint. The checkpoint is removed when the experiment
+    completes.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, resume=False):
         """Experiment constructor
 
         :param config: a decoded JSON dictionary
         :type config: dict
+
+        :param resume: continue an interrupted experiment in the directory
+                       named in the config, from its last checkpoint
+        :type resume: bool
+
+        :raises FileNotFoundError: if resuming and the experiment directory
+                                   has no checkpoint
         """
         version = pkg_resources.require("place")[0].version
         self.abort_event = Event()
         self.config = config
         self.plugins = []
+        self._plotters = {}
+        self.storage = None
+        self.preview = None
+        self._executor = None
+        self._fields = {}
+        self._row_dtype = np.dtype([_TIME_FIELD])
+        self._checkpoint = None
+        self._checkpointing = False
+        self._checkpoint_interval = 0.0
+        self._last_checkpoint = None
+        self._latest_checkpoint = None
         self.metadata = {
             'PLACE_version': version,
             'timestamp': int(round(time() * 1000)),  # milliseconds since epoch
         }
         self.progress = PlaceProgress(config)
         self.progress.update_time = 0.0
-        self._create_experiment_directory()
+        if resume:
+            self.config['directory'] = os.path.abspath(
+                os.path.expanduser(self.config['directory']))
+            with open(self.config['directory'] + '/checkpoint.json') as checkpoint_file:
+                self._checkpoint = json.load(checkpoint_file)
+        else:
+            self._create_experiment_directory()
 
-        # save config data right away in case we need to reload the settings
-        with open(self.config['directory'] + '/config.json', 'x') as config_file:
-            json.dump(_remove_specific_items(self.config),
-                      config_file, indent=2, sort_keys=True)
+            # save config data right away in case we need to reload the settings
+            with open(self.config['directory'] + '/config.json', 'x') as config_file:
+                json.dump(_remove_specific_items(self.config),
+                          config_file, indent=2, sort_keys=True)
 
         self.init_phase()
 
     def run(self):
         """Run the experiment"""
+        profile = self._option('profile', False)
         try:
-            self.config_phase()
-            self.update_phase()
-            self.cleanup_phase()
+            self._run_phase('config', profile, self.config_phase)
+            self._run_phase('update', profile, self.update_phase)
+            self._run_phase('cleanup', profile, self.cleanup_phase)
         except AbortExperiment:
-            self.cleanup_phase(abort=True)
+            self._run_phase('abort', profile, self.cleanup_phase, abort=True)
+
+    def _run_phase(self, name, profile, phase, **kwargs):
+        """Run one phase of the experiment, optionally under cProfile"""
+        if not profile:
+            return phase(**kwargs)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(phase, **kwargs)
+        finally:
+            profiler.dump_stats(
+                '{}/profile_{}.prof'.format(self.config['directory'], name))
 
     def init_phase(self):
         """Initialize the plugins
@@ -114,7 +213,10 @@ class BasicExperiment:
             )
 
             # create a PLACE plotter for the plugin
-            plotter = PlacePlotter(prog, directory)
+            plotter = PlacePlotter(
+                prog, directory, timer=partial(self.progress.timer, elm_name, 'plot'),
+                name=python_class_name)
+            self._plotters[elm_name] = plotter
 
             # attempt to dynamically import the plugin's Python module
             try:
@@ -124,7 +226,10 @@ class BasicExperiment:
                 raise RuntimeError(
                     'Cannot find module related to: {}'.format(plugin_data))
             plugin.priority = plugin_data['priority']
+            plugin.parallel_group = plugin_data.get(
+                'parallel_group', getattr(plugin, 'parallel_group', None))
             plugin.elm_module_name = elm_name
+            plugin.abort_event = self.abort_event
             self.plugins.append(plugin)
         # sort plugins based on priority
         self.plugins.sort(key=attrgetter('priority'))
@@ -138,18 +243,17 @@ class BasicExperiment:
         """
         self.metadata['directory'] = self.config['directory']
 
-        for plugin in self.plugins:
+        for group in _parallel_groups(self.plugins, self._option('parallel_config', False)):
             if self.abort_event.is_set():
                 raise AbortExperiment
-            self.progress.log('config', plugin.elm_module_name)
-            try:
-                config_func = plugin.config
-            except AttributeError:
-                continue
-            config_func(self.metadata, self.config['updates'])
+            for metadata in self._run_together(group, self._config_plugin):
+                self.metadata.update(metadata)
 
         del self.metadata['directory']
         self.config['metadata'] = self.metadata
+        self._declare_fields()
+        if self._checkpoint is not None:
+            self._resume_plugins(self._checkpoint['plugins'])
 
         # overwrite the config data now that all plugins have submitted their
         # metadata
@@ -157,6 +261,43 @@ class BasicExperiment:
             json.dump(_remove_specific_items(self.config),
                       config_file, indent=2, sort_keys=True)
 
+    def _config_plugin(self, plugin):
+        """Configure one plugin, returning its copy of the metadata"""
+        self.progress.log('config', plugin.elm_module_name)
+        metadata = dict(self.metadata)
+        try:
+            config_func = plugin.config
+        except AttributeError:
+            return metadata
+        with self.progress.timer(plugin.elm_module_name, 'config'):
+            config_func(metadata, self.config['updates'])
+        return metadata
+
+    def _declare_fields(self):
+        """Collect the fields declared by the plugins
+
+        The row dtype for each update starts with the PLACE timestamp,
+        followed by the declared fields of each plugin in priority order.
+        """
+        descr = [_TIME_FIELD]
+        for plugin in self.plugins:
+            try:
+                fields = plugin.fields()
+            except AttributeError:
+                continue
+            if fields is None:
+                continue
+            self._fields[plugin.elm_module_name] = [field[0] for field in fields]
+            descr.extend(fields)
+        self._row_dtype = np.dtype(descr)
+
+    def _resume_plugins(self, states):
+        """Give each plugin the state it saved in the checkpoint"""
+        for plugin in self.plugins:
+            state = states.get(plugin.elm_module_name)
+            if state is not None:
+                plugin.resume(state)
+
     def update_phase(self):
         """Perform all the updates on the plugins.
 
@@ -165,13 +306,61 @@ class BasicExperiment:
         post-processing plugins (based on their priority) and calls their
         update method.
 
-        One NumPy file will be written for each update. If the experiement
-        completes normally, these files will be merged into a single NumPy
-        file.
+        The data from each update is written using the storage selected by
+        the ``storage`` option. By default, one NumPy file will be written for
+        each update. If the experiement completes normally, these files will
+        be merged into a single NumPy file.
+
+        If the ``pipeline_depth`` option is greater than zero, the updates are
+        pipelined: the instruments are updated on this thread while the
+        post-processing and storage of previous updates is done on a
+        background thread. At most ``pipeline_depth`` updates wait for the
+        background thread; after that, the instruments wait for it to catch
+        up. Post-processing plugins always run after all the instruments in
+        this mode. If the experiment stops early, the updates that are
+        waiting are still post-processed and saved; if it was aborted, the
+        post-processing plugins stop at the first of them, and the rest are
+        run again when the experiment is resumed.
+
+        If the ``batch_size`` option is greater than one, the updates are run
+        in blocks. Each plugin produces the rows for a whole block in one
+        call (``update_block``) and each block is saved at once. Every row in
+        a block has the ``PLACE-time`` of the start of the block.
+
+        When resuming, the updates start after the last checkpoint.
         """
+        self.storage = open_storage(
+            self._option('storage', 'files'),
+            self.config['directory'],
+            self.config['updates'],
+            compression=self._option('compression', 'zlib'),
+            durability=self._option('durability', 'none')
+        )
+        if self._option('preview', True):
+            self.preview = PreviewFiles(self.config['directory'], self.config['updates'])
+        start = 0
+        if self._checkpoint is not None:
+            start = self._checkpoint['update'] + 1
+            self.storage.resume(start)
+            if self.preview is not None:
+                self.preview.resume(start)
+        self._checkpointing = self._option('checkpoint', True)
+        self._checkpoint_interval = self._option('checkpoint_interval', 1.0)
         self.progress.update_time = 1.0
-        for update_number in range(self.config['updates']):
-            self._run_update(update_number)
+        depth = self._option('pipeline_depth', 0)
+        parallel = self._option('parallel_updates', False)
+        blocks = self._blocks(self._option('batch_size', 1), start)
+        try:
+            if depth > 0:
+                self._run_pipelined_updates(blocks, depth, parallel)
+            else:
+                groups = _parallel_groups(self.plugins, parallel)
+                for update_number, count in blocks:
+                    self._run_update(update_number, groups, count)
+        except RuntimeError as err:
+            self.progress.message = str(err)
+            self.cleanup_phase(abort=True)
+            raise
         self.progress.update_time = 0.0
 
     def cleanup_phase(self, abort=False):
@@ -184,23 +373,61 @@ class BasicExperiment:
         :param abort: signals that the experiment is being aborted
         :type abort: bool
         """
-        if abort:
-            for plugin in self.plugins:
-                plugin.cleanup(abort=True)
-            return
-
-        build_single_file(self.config['directory'])
-        for plugin in self.plugins:
-            if self.abort_event.is_set():
-                raise AbortExperiment
-            self.progress.log('cleanup', plugin.elm_module_name)
-            if issubclass(plugin.__class__, Export):
-                plugin.export(self.config['directory'])
-            else:
-                plugin.cleanup(abort=False)
+        self._close_storage(abort)
+        groups = _parallel_groups(self.plugins, self._option('parallel_config', False))
+        try:
+            if abort:
+                for group in groups:
+                    self._run_together(group, _abort_plugin)
+                return
+
+            for group in groups:
+                if self.abort_event.is_set():
+                    raise AbortExperiment
+                self._run_together(group, self._cleanup_plugin)
+        finally:
+            self._shutdown_executor()
+        wait_for_plots()
         with open(self.config['directory'] + '/results.json', 'x') as results_file:
             json.dump(self.progress.to_dict(), results_file,
                       indent=2, sort_keys=True)
+        try:
+            os.remove(self.config['directory'] + '/checkpoint.json')
+        except FileNotFoundError:
+            pass
+
+    def _cleanup_plugin(self, plugin):
+        """Clean up one plugin, or run its export"""
+        self.progress.log('cleanup', plugin.elm_module_name)
+        if issubclass(plugin.__class__, Export):
+            with self.progress.timer(plugin.elm_module_name, 'export'):
+                plugin.export(self.config['directory'])
+        else:
+            with self.progress.timer(plugin.elm_module_name, 'cleanup'):
+                plugin.cleanup(abort=False)
+
+    def _run_together(self, group, func):
+        """Call a function for each plugin in a group, at the same time
+
+        :returns: the results, in the order of the group
+        :rtype: list
+
+        :raises Exception: the error from the plugin, if one plugin in the
+                           group fails, or a ``RuntimeError`` describing
+                           every error if several fail
+        """
+        if len(group) == 1:
+            return [func(group[0])]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.plugins))
+        futures = [self._executor.submit(func, plugin) for plugin in group]
+        wait(futures)
+        errors = [(plugin, future.exception())
+                  for plugin, future in zip(group, futures)
+                  if future.exception() is not None]
+        if errors:
+            raise _combine_errors(errors)
+        return [future.result() for future in futures]
 
     def _create_experiment_directory(self):
         self.config['directory'] = os.path.abspath(
@@ -216,49 +443,252 @@ class BasicExperiment:
                   self.config['directory'])
             os.makedirs(self.config['directory'])
 
-    def _run_update(self, update_number):
-        """Run one update phase"""
+    def _option(self, name, default):
+        """Get an experiment option
+
+        Options in the experiment configuration take precedence over options
+        in the ``[Experiment]`` section of the PLACE config file.
+        """
+        try:
+            return self.config[name]
+        except KeyError:
+            value = PlaceConfig().get_config_value('Experiment', name, str(default))
+        if isinstance(default, bool):
+            return value.lower() in ['true', 'yes', 'on', '1']
+        return type(default)(value)
+
+    def _write(self, update_number, data):
+        """Save the rows for one update, or a block of updates
+
+        :returns: ``True`` if every row so far has been saved, so a
+                  checkpoint can be taken
+        :rtype: bool
+        """
+        with self.progress.timer('PLACE', 'storage'):
+            saved = self.storage.write(update_number, data)
+        if self.preview is not None:
+            with self.progress.timer('PLACE', 'preview'):
+                self.preview.write(update_number, data)
+        return saved
+
+    def _close_storage(self, abort):
+        """Close the storage (and preview), if it has been opened"""
+        try:
+            if self.preview is not None:
+                preview, self.preview = self.preview, None
+                preview.close(abort=abort)
+        finally:
+            if self.storage is not None:
+                storage, self.storage = self.storage, None
+                with self.progress.timer('PLACE', 'close storage'):
+                    storage.close(abort=abort)
+                if abort:
+                    self._write_checkpoint(storage.sync_every > 0)
+
+    def _shutdown_executor(self):
+        """Stop the threads used to run plugins at the same time"""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown()
+
+    def _blocks(self, batch_size, start=0):
+        """List the first update number and the size of each block"""
+        updates = self.config['updates']
+        batch_size = max(1, batch_size)
+        return [(update_number, min(batch_size, updates - update_number))
+                for update_number in range(start, updates, batch_size)]
+
+    def _run_update(self, update_number, groups, count=1):
+        """Run one update phase (or one block of update phases)"""
         then = time()
         self.progress.start_update(update_number)
-        data = np.array([(npdatetime64(datetime.datetime.now()),)],
-                        dtype=[('PLACE-time', 'datetime64[us]')])
-        for plugin in self.plugins:
+        data = self._run_plugins(groups, update_number, self._new_row(count))
+
+        # save data for this update
+        saved = self._write(update_number, data)
+        self._save_checkpoint(
+            update_number + count - 1, self._plugin_states(self.plugins), saved)
+        self._record_update_time(update_number + count - 1, (time() - then) / count)
+
+    def _plugin_states(self, plugins):
+        """Collect the resumable state of some plugins"""
+        states = {}
+        if not self._checkpointing:
+            return states
+        for plugin in plugins:
+            try:
+                state = plugin.checkpoint()
+            except AttributeError:
+                continue
+            if state is not None:
+                states[plugin.elm_module_name] = state
+        return states
+
+    def _save_checkpoint(self, update_number, states, saved):
+        """Record that all updates up to this one have been written
+
+        The checkpoint is only written once the storage has saved every
+        update so far. It is written to a temporary file and then moved into
+        place, so an interruption never leaves a partial checkpoint. If the
+        storage is synchronized, so is the checkpoint, which is then written
+        every time. Otherwise, it is written at most once every
+        ``checkpoint_interval`` seconds. If the experiment is aborted, the
+        checkpoint of the last update is written once the storage is closed.
+        """
+        if not self._checkpointing:
+            return
+        self._latest_checkpoint = (update_number, states)
+        if not saved:
+            return
+        sync = self.storage.sync_every > 0
+        if (not sync and self._last_checkpoint is not None
+                and monotonic() - self._last_checkpoint < self._checkpoint_interval):
+            return
+        self._write_checkpoint(sync)
+
+    def _write_checkpoint(self, sync):
+        """Write the latest checkpoint, if it has not been written"""
+        if self._latest_checkpoint is None:
+            return
+        update_number, states = self._latest_checkpoint
+        self._latest_checkpoint = None
+        self._last_checkpoint = monotonic()
+        with self.progress.timer('PLACE', 'checkpoint'):
+            write_json(self.config['directory'] + '/checkpoint.json',
+                        {'update': update_number, 'plugins': states}, sync=sync)
+
+    def _run_pipelined_updates(self, blocks, depth, parallel):
+        """Run all the update phases, overlapping them with post-processing"""
+        instruments = _parallel_groups(
+            [plugin for plugin in self.plugins
+             if issubclass(plugin.__class__, Instrument)],
+            parallel
+        )
+        postprocessors = _parallel_groups(
+            [plugin for plugin in self.plugins
+             if issubclass(plugin.__class__, PostProcessing)],
+            parallel
+        )
+        stage = Stage(self._finish_update, depth)
+        try:
+            for update_number, count in blocks:
+                then = time()
+                self.progress.start_update(update_number)
+                data = self._run_plugins(instruments, update_number, self._new_row(count))
+                states = self._plugin_states(
+                    [plugin for group in instruments for plugin in group])
+                stage.put(update_number, data, postprocessors, states)
+                self._record_update_time(
+                    update_number + count - 1, (time() - then) / count)
+            stage.join()
+        finally:
+            stage.stop(drain=True)
+
+    def _finish_update(self, update_number, data, groups, states):
+        """Post-process and save the data from one pipelined update
+
+        The checkpoint combines the state of the instruments, taken when the
+        update was queued, with the state of the post-processing plugins.
+        """
+        data = self._run_plugins(groups, update_number, data)
+        saved = self._write(update_number, data)
+        states.update(self._plugin_states([plugin for group in groups for plugin in group]))
+        self._save_checkpoint(update_number + len(data) - 1, states, saved)
+
+    def _run_plugins(self, groups, update_number, data):
+        """Run the update phase on groups of PLACE plugins, in order"""
+        for group in groups:
             if self.abort_event.is_set():
                 raise AbortExperiment
-            self.progress.log('update', plugin.elm_module_name)
-            data = self._run_plugin_update(plugin, update_number, data)
+            self.progress.log('update', group[0].elm_module_name)
+            for plugin in group:
+                self._plotters[plugin.elm_module_name].start_update(
+                    update_number, len(data), self.config['updates'])
+            if len(group) == 1:
+                data = self._run_plugin_update(group[0], update_number, data)
+            else:
+                data = self._run_parallel_update(group, update_number, data)
+        return data
 
-        # save data for this update
-        filename = '{}/data_{:03d}.npy'.format(
-            self.config['directory'], update_number)
-        with open(filename, 'xb') as data_file:
-            np.save(data_file, data.copy(), allow_pickle=False)
-        now = time()
-        update_time = now - then
+    def _run_parallel_update(self, group, update_number, data):
+        """Run the update phase on several instruments at the same time
+
+        The returned data is merged in the order of the group, so the result
+        is the same as if the instruments had been updated one at a time.
+        """
+        new_data = self._run_together(
+            group, lambda plugin: self._update_instrument(plugin, update_number, data))
+        new_data = [row for row in new_data if row is not None]
+        if new_data:
+            data = rfn.merge_arrays([data] + new_data, flatten=True)
+        return data
+
+    def _record_update_time(self, update_number, update_time):
+        """Add the duration of an update to the smoothed update time"""
+        self.progress.record_time('PLACE', 'update', update_time)
         weight = max(0.1, 1 / (update_number + 1))
         self.progress.update_time = (
             update_time * weight
             + self.progress.update_time * (1 - weight)
         )
 
+    def _new_row(self, count=1):
+        """Start the row of data for one update, with the PLACE timestamp
+
+        When updates are run in blocks, this makes one row for each update
+        in the block.
+        """
+        data = np.zeros((count,), dtype=self._row_dtype)
+        data['PLACE-time'] = npdatetime64(datetime.datetime.now())
+        return data
+
     def _run_plugin_update(self, plugin, update_number, data):
         """Run the update phase on one PLACE plugin"""
         class_ = plugin.__class__
-        elm_name = plugin.elm_module_name
-        try:
-            if issubclass(class_, Instrument):
-                new_data = plugin.update(
-                    update_number, self.progress.experiment['plugins'][elm_name]['progress'])
-                if new_data is not None:
-                    data = rfn.merge_arrays([data, new_data], flatten=True)
-            elif issubclass(class_, PostProcessing):
-                data = plugin.update(update_number, data.copy())
-        except RuntimeError as err:
-            self.progress.message = str(err)
-            self.cleanup_phase(abort=True)
-            raise
+        if issubclass(class_, Instrument):
+            new_data = self._update_instrument(plugin, update_number, data)
+            if new_data is not None:
+                data = rfn.merge_arrays([data, new_data], flatten=True)
+        elif issubclass(class_, PostProcessing):
+            with self.progress.timer(plugin.elm_module_name, 'update'):
+                if len(data) > 1:
+                    data = plugin.update_block(update_number, data)
+                elif plugin.elm_module_name in self._fields:
+                    new_data = plugin.update(update_number, data)
+                    if new_data is not None:
+                        data = new_data
+                else:
+                    data = plugin.update(update_number, data.copy())
         return data
 
+    def _update_instrument(self, plugin, update_number, data):
+        """Update one instrument, returning any data that must be merged
+
+        Instruments that declared their fields are given a writable view of
+        those fields in the row, so their data is written in place.
+        """
+        progress = self.progress.experiment['plugins'][plugin.elm_module_name]['progress']
+        names = self._fields.get(plugin.elm_module_name)
+        if len(data) > 1:
+            with self.progress.timer(plugin.elm_module_name, 'update'):
+                new_data = plugin.update_block(update_number, len(data), progress)
+            if names is None or new_data is None:
+                return new_data
+            row = data[names]
+            for name in names:
+                row[name] = new_data[name]
+            return None
+        if names is None:
+            with self.progress.timer(plugin.elm_module_name, 'update'):
+                return plugin.update(update_number, progress)
+        row = data[names]
+        with self.progress.timer(plugin.elm_module_name, 'update'):
+            new_data = plugin.update(update_number, progress, row=row)
+        if new_data is not None and new_data is not row:
+            for name in names:
+                row[name] = new_data[name]
+        return None
+
     def get_progress(self):
         """Return the progress message"""
         return self.progress.to_dict()
@@ -269,6 +699,51 @@ class BasicExperiment:
         self.abort_event.set()
 
 
+def _parallel_groups(plugins, by_priority):
+    """Split plugins (in priority order) into groups that can run together
+
+    Neighbouring instruments are grouped if they have the same
+    ``parallel_group`` value or, when ``by_priority`` is set, the same
+    priority. All other plugins are placed in a group of their own.
+    """
+    groups = []
+    for plugin in plugins:
+        if groups and _can_share_group(groups[-1][-1], plugin, by_priority):
+            groups[-1].append(plugin)
+        else:
+            groups.append([plugin])
+    return groups
+
+
+def _can_share_group(first, second, by_priority):
+    if not (issubclass(first.__class__, Instrument)
+            and issubclass(second.__class__, Instrument)):
+        return False
+    first_group = getattr(first, 'parallel_group', None)
+    second_group = getattr(second, 'parallel_group', None)
+    if first_group is not None or second_group is not None:
+        return first_group == second_group
+    return by_priority and first.priority == second.priority
+
+
+def _abort_plugin(plugin):
+    plugin.cleanup(abort=True)
+
+
+def _combine_errors(errors):
+    """Combine the errors from a group of plugins into one exception
+
+    An abort is reported as an abort. A single error is returned
+    unchanged, so its type is kept.
+    """
+    if any(isinstance(err, AbortExperiment) for _, err in errors):
+        return AbortExperiment()
+    if len(errors) == 1:
+        return errors[0][1]
+    return RuntimeError('; '.join(
+        '{}: {}'.format(plugin.elm_module_name, err) for plugin, err in errors))
+
+
 def _programmatic_import(module_name, class_name, config, plotter):
     """Import a module based on string input.
 
@@ -0,0 +1,222 @@
+"""Benchmark the overhead of PLACE itself
+
+The ``place_bench`` command runs a complete ``BasicExperiment`` using
+synthetic instruments (``SyntheticDemo`` and, optionally, a simulated
+AlazarTech card), so it can be run on any computer without hardware. The
+results are printed as JSON, so runs with different options can be compared.
+
+Example::
+
+    place_bench --updates 10000 --plugins 2 --points 512 --storage memmap
+
+or, from a source checkout, ``python -m place.bench`` with the same options.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from .basic_experiment import BasicExperiment
+from .reader import Experiment
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_NOT_OPTIONS = ['plugins', 'directory', 'title', 'comments', 'metadata']
+
+
+def main():
+    """Command-line entry point for benchmarking PLACE"""
+    parser = argparse.ArgumentParser(
+        description='Run a PLACE experiment with synthetic instruments and '
+                    'report its throughput as JSON.')
+    parser.add_argument('--updates', type=int, default=1000,
+                        help='number of updates (default: 1000)')
+    parser.add_argument('--plugins', type=int, default=1,
+                        help='number of synthetic instruments (default: 1)')
+    parser.add_argument('--points', type=int, default=1000,
+                        help='samples in each synthetic trace (default: 1000)')
+    parser.add_argument('--dtype', default='float64',
+                        help='data type of the synthetic traces (default: float64)')
+    parser.add_argument('--ats', action='store_true',
+                        help='add a simulated AlazarTech card')
+    parser.add_argument('--plot', action='store_true',
+                        help='plot during each update')
+    parser.add_argument('--storage', default='files',
+                        help='storage mode (default: files)')
+    parser.add_argument('--durability', default='none',
+                        help='none, update or a number of updates (default: none)')
+    parser.add_argument('--pipeline-depth', type=int, default=0,
+                        help='pipeline depth (default: 0, not pipelined)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='updates per block (default: 1)')
+    parser.add_argument('--parallel', action='store_true',
+                        help='update instruments with equal priority together')
+    parser.add_argument('--directory',
+                        help='where to write the experiment (default: a '
+                             'temporary directory, removed afterwards)')
+    parser.add_argument('--output',
+                        help='write the JSON report to this file')
+    args = parser.parse_args()
+
+    report = benchmark(
+        bench_config(args),
+        directory=args.directory
+    )
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as file_p:
+            file_p.write(text + '\n')
+
+
+def bench_config(args):
+    """Build the experiment configuration for a benchmark
+
+    :param args: the parsed command-line arguments
+    :type args: argparse.Namespace
+
+    :returns: the experiment configuration
+    :rtype: dict
+    """
+    plugins = {}
+    for i in range(args.plugins):
+        plugins['Synthetic{}'.format(i)] = {
+            'metadata': {
+                'python_module_name': 'place_demo',
+                'python_class_name': 'SyntheticDemo',
+            },
+            'priority': 10,
+            'config': {
+                'number_of_points': args.points,
+                'dtype': args.dtype,
+                'plot': args.plot,
+            },
+        }
+    if args.ats:
+        plugins['ATSSimulated'] = {
+            'metadata': {
+                'python_module_name': 'alazartech',
+                'python_class_name': 'ATSSimulated',
+            },
+            'priority': 10,
+            'config': _ats_config(args.points, args.plot),
+        }
+    return {
+        'title': 'place_bench',
+        'comments': 'benchmark with synthetic instruments',
+        'updates': args.updates,
+        'directory': None,
+        'plugins': plugins,
+        'storage': args.storage,
+        'durability': args.durability,
+        'pipeline_depth': args.pipeline_depth,
+        'batch_size': args.batch_size,
+        'parallel_updates': args.parallel,
+        'profile': False,
+    }
+
+
+def benchmark(config, directory=None):
+    """Run an experiment and measure its throughput
+
+    :param config: the experiment configuration
+    :type config: dict
+
+    :param directory: where to write the experiment, or ``None`` to use a
+                      temporary directory that is removed afterwards
+    :type directory: str
+
+    :returns: the benchmark report
+    :rtype: dict
+    """
+    temporary = directory is None
+    if temporary:
+        directory = tempfile.mkdtemp(prefix='place_bench_')
+    config['directory'] = os.path.join(directory, 'experiment')
+    phases = {}
+    try:
+        # plugins print freely, so keep stdout clean for the report
+        with redirect_stdout(sys.stderr):
+            then = perf_counter()
+            experiment = BasicExperiment(config)
+            phases['init'] = perf_counter() - then
+            for name, phase in [('config', experiment.config_phase),
+                                ('update', experiment.update_phase),
+                                ('cleanup', experiment.cleanup_phase)]:
+                then = perf_counter()
+                phase()
+                phases[name] = perf_counter() - then
+        data_bytes = _data_bytes(experiment.config['directory'])
+    finally:
+        if temporary:
+            shutil.rmtree(directory, ignore_errors=True)
+    updates = config['updates']
+    return {
+        'options': {key: value for key, value in config.items()
+                    if key not in _NOT_OPTIONS},
+        'plugins': sorted(config['plugins']),
+        'phases': phases,
+        'updates_per_second': updates / phases['update'],
+        'bytes': data_bytes,
+        'bytes_per_second': data_bytes / phases['update'],
+        'peak_rss_mb': _peak_rss_mb(),
+        'timings': experiment.progress.timings_to_dict(),
+    }
+
+
+def _data_bytes(directory):
+    """The size of the experiment data, in bytes"""
+    data = Experiment(directory)
+    return len(data) * data.dtype.itemsize
+
+
+def _peak_rss_mb():
+    """The peak resident memory of this process, in megabytes"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / 2**20  # bytes
+    return peak / 2**10  # kilobytes
+
+
+def _ats_config(points, plot):
+    """Configuration for the simulated AlazarTech card"""
+    return {
+        'clock_source': 'INTERNAL_CLOCK',
+        'sample_rate': 'SAMPLE_RATE_10MSPS',
+        'clock_edge': 'CLOCK_EDGE_RISING',
+        'decimation': 0,
+        'analog_inputs': [{
+            'input_channel': 'CHANNEL_A',
+            'input_coupling': 'DC_COUPLING',
+            'input_range': 'INPUT_RANGE_PM_400_MV',
+            'input_impedance': 'IMPEDANCE_50_OHM',
+        }],
+        'trigger_operation': 'TRIG_ENGINE_OP_J',
+        'trigger_engine_1': 'TRIG_ENGINE_J',
+        'trigger_source_1': 'TRIG_FORCE',
+        'trigger_slope_1': 'TRIGGER_SLOPE_POSITIVE',
+        'trigger_level_1': 128,
+        'trigger_engine_2': 'TRIG_ENGINE_K',
+        'trigger_source_2': 'TRIG_FORCE',
+        'trigger_slope_2': 'TRIGGER_SLOPE_POSITIVE',
+        'trigger_level_2': 128,
+        'pre_trigger_samples': 0,
+        'post_trigger_samples': points,
+        'records': 1,
+        'average': True,
+        'plot': 'yes' if plot else 'no',
+    }
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""A bounded background stage for overlapping work with the update loop"""
+import queue
+from threading import Event, Thread
+
+_DONE = object()
+
+
+class Stage:
+    """Process items, in order, on a background thread
+
+    Items are passed to the stage with :meth:`put` and processed one at a
+    time by the target function. The queue between the caller and the stage
+    is bounded, so :meth:`put` blocks when the stage falls behind. If the
+    target raises an exception, the stage stops and the exception is raised
+    again in the calling thread the next time it uses the stage.
+    """
+
+    def __init__(self, target, depth):
+        """Constructor
+
+        :param target: the function to call for each item
+        :type target: callable
+
+        :param depth: the maximum number of items waiting to be processed
+        :type depth: int
+        """
+        self._target = target
+        self._queue = queue.Queue(maxsize=depth)
+        self._error = None
+        self._stop_event = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, *args):
+        """Queue one item for processing, waiting if the queue is full
+
+        :raises Exception: any exception raised by the target function
+        """
+        while True:
+            self._check()
+            try:
+                self._queue.put(args, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def wait(self):
+        """Wait for every queued item to be processed, leaving the stage
+        running
+
+        :raises Exception: any exception raised by the target function
+        """
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                self._check()
+                self._queue.all_tasks_done.wait(timeout=0.1)
+        self._check()
+
+    def join(self):
+        """Wait for every queued item to be processed
+
+        :raises Exception: any exception raised by the target function
+        """
+        self.put(_DONE)
+        self._thread.join()
+        self._check()
+
+    def stop(self, drain=False):
+        """Stop the stage, without raising any exception from the target
+
+        :param drain: if ``True``, the items already queued are processed
+                      first; otherwise the stage stops after the current
+                      item and the rest are discarded
+        :type drain: bool
+        """
+        if drain:
+            while self._thread.is_alive():
+                try:
+                    self._queue.put((_DONE,), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+        else:
+            self._stop_event.set()
+        self._thread.join()
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item[0] is _DONE:
+                return
+            try:
+                self._target(*item)
+            except BaseException as err:  # pylint: disable=broad-except
+                self._error = err
+                return
+            self._queue.task_done()
@@ -1,4 +1,8 @@
 """Module for handling PLACE experiment progress"""
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
 
 
 class PlaceProgress:
@@ -15,6 +19,7 @@ class PlaceProgress:
       phase
     - The current plugin that is running and, optionally, the progress of
       that plugin
+    - Timing statistics for each step of each plugin, and for PLACE itself
     """
 
     def __init__(self, config):
@@ -35,6 +40,8 @@ class PlaceProgress:
                                'The key "metadata" or "elm_module_name" is missing.')
 
         self.message = ""  # text to display in webapp
+        self.timings = {}
+        self._timings_lock = Lock()
 
     def log(self, phase, plugin):
         """Set the phase and plugin status"""
@@ -49,6 +56,47 @@ class PlaceProgress:
         """Record the current update and log the start time of an update"""
         self.current_update = num
 
+    @contextmanager
+    def timer(self, source, step):
+        """Time a block of code and add it to the timing statistics
+
+        Here is an example of how this is used::
+
+            with progress.timer('PlaceDemo', 'update'):
+                plugin.update(update_number, plugin_progress)
+
+        :param source: the plugin (or part of PLACE) doing the work
+        :type source: str
+
+        :param step: the step being timed, such as 'config' or 'update'
+        :type step: str
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record_time(source, step, perf_counter() - start)
+
+    def record_time(self, source, step, seconds):
+        """Add one duration to the timing statistics
+
+        :param source: the plugin (or part of PLACE) doing the work
+        :type source: str
+
+        :param step: the step being timed, such as 'config' or 'update'
+        :type step: str
+
+        :param seconds: the duration, in seconds
+        :type seconds: float
+        """
+        with self._timings_lock:
+            steps = self.timings.setdefault(source, {})
+            try:
+                stats = steps[step]
+            except KeyError:
+                stats = steps[step] = RunningStats()
+            stats.add(seconds)
+
     def to_dict(self):
         """Put all data into dictionary"""
         return {
@@ -59,5 +107,59 @@ class PlaceProgress:
             'total_updates': self.total_updates,
             'update_time': self.update_time,
             'current_plugin': self.current_plugin,
-            'message': self.message
+            'message': self.message,
+            'timings': self.timings_to_dict()
         }
+
+    def timings_to_dict(self):
+        """Put the timing statistics into a dictionary"""
+        with self._timings_lock:
+            return {
+                source: {step: stats.to_dict() for step, stats in steps.items()}
+                for source, steps in self.timings.items()
+            }
+
+
+class RunningStats:
+    """Running statistics for a series of durations
+
+    The count, mean and maximum cover every duration. The percentiles are
+    calculated from the most recent durations only, so the memory used stays
+    the same for experiments of any length.
+    """
+
+    def __init__(self, window=1000):
+        """Constructor
+
+        :param window: the number of recent durations used for percentiles
+        :type window: int
+        """
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self._recent = deque(maxlen=window)
+
+    def add(self, value):
+        """Add one duration, in seconds"""
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+        self._recent.append(value)
+
+    def to_dict(self):
+        """Put the statistics into a dictionary"""
+        recent = sorted(self._recent)
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': _percentile(recent, 50),
+            'p95': _percentile(recent, 95),
+            'max': self.maximum,
+        }
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of sorted values (0.0 if there are none)"""
+    if not values:
+        return 0.0
+    return values[int(round(percent / 100 * (len(values) - 1)))]
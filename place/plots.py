@@ -1,21 +1,51 @@
 """The PLACE plotting module"""
+import base64
+import functools
 import os.path
+import threading
 from random import random
+from time import monotonic
 
 import numpy as np
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.image import imsave
 
 from placeweb.settings import MEDIA_ROOT
 
 from place.config import PlaceConfig
+from place.preview import Preview
 
 DATA_POINT_LIMIT = int(PlaceConfig().get_config_value(
     'Plots', 'maximum points for network transfer', "10000"))
+"""The most points sent in one plot; longer series are reduced to fit, keeping
+the minimum and maximum of each group of points"""
 DEFAULT_FIGSIZE = (7.29, 4.17)
 DEFAULT_DPI = 96
 
 
+def _throttled(method):
+    """Skip a plotting method if the figure is not due (see ``PlacePlotter.due``)"""
+    @functools.wraps(method)
+    def wrapper(self, title, *args, **kwargs):
+        if not self.due(title):
+            return None
+        self.mark(title)
+        return method(self, title, *args, **kwargs)
+    return wrapper
+
+
+def _timed(method):
+    """Record the time spent in a plotting method, if the plotter has a timer"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.timer is None:
+            return method(self, *args, **kwargs)
+        with self.timer():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class PlacePlotter:
     """A plotter for making common PLACE plots
 
@@ -23,10 +53,85 @@ class PlacePlotter:
     directory and progress dictionary.
     """
 
-    def __init__(self, progress, directory):
+    def __init__(self, progress, directory, timer=None, name=None):
+        """Constructor
+
+        How often each figure is sent is set by ``minimum seconds between
+        plots`` and ``plot every nth update``, in the section of the PLACE
+        config file named for the plugin, or else in the ``[Plots]``
+        section. Plots that are not due are skipped, except on the last
+        update of the experiment.
+
+        :param progress: the progress dictionary of the plugin
+        :type progress: dict
+
+        :param directory: the experiment directory, relative to the media root
+        :type directory: str
+
+        :param timer: (optional) a function returning a context manager that
+                      is used to time each plot
+        :type timer: callable
+
+        :param name: (optional) the section of the PLACE config file with the
+                     plot settings of the plugin, usually its class name
+        :type name: str
+        """
         self.progress = progress
         self.directory = directory
+        self.timer = timer
+        self.interval = float(_setting(name, 'minimum seconds between plots', '0'))
+        self.every = max(1, int(_setting(name, 'plot every nth update', '1')))
+        self._updates = None
+        self._total_updates = None
+        self._last = {}
+
+    def start_update(self, update_number, count=1, total_updates=None):
+        """Tell the plotter which updates are being run
+
+        This is called by PLACE before each update, or block of updates, of
+        the plugin.
+
+        :param update_number: the (first) update
+        :type update_number: int
+
+        :param count: the number of updates in the block
+        :type count: int
+
+        :param total_updates: the number of updates in the experiment
+        :type total_updates: int
+        """
+        self._updates = (update_number, count)
+        self._total_updates = total_updates
+
+    def due(self, title):
+        """Check if a figure would be sent now
+
+        Plugins can check this before preparing the data for a plot, to
+        skip that work as well when the plot would not be sent.
+
+        :param title: The title for the figure
+        :type title: str
 
+        :returns: ``False`` if the plot would be skipped
+        :rtype: bool
+        """
+        if self._updates is None:
+            return True
+        first, count = self._updates
+        if self._total_updates is not None and first + count >= self._total_updates:
+            return True
+        if -first % self.every >= count:
+            return False
+        if not self.interval:
+            return True
+        return monotonic() - self._last.get(title, -self.interval) >= self.interval
+
+    def mark(self, title):
+        """Record that a figure has just been sent"""
+        self._last[title] = monotonic()
+
+    @_throttled
+    @_timed
     def view1(self, title, ydata1, xdata1=None):
         """Make a line chart
 
@@ -49,15 +154,13 @@ class PlacePlotter:
         :param xdata1: The x values for the series (optional)
         :type xdata1: numpy.array or list or ``None``
         """
-        data1 = _data(ydata1, xdata1)
-        if len(data1['y']) > DATA_POINT_LIMIT:
-            self._make_png(title, [self.line(ydata1, xdata1)])
-        else:
-            self.progress[title] = {
-                'f': 'view1',
-                'data1': data1
-            }
+        self.progress[title] = {
+            'f': 'view1',
+            'data1': _data(ydata1, xdata1, DATA_POINT_LIMIT)
+        }
 
+    @_throttled
+    @_timed
     def view2(self, title, ydata1, ydata2, xdata1=None, xdata2=None):
         """Make a line chart with 2 series
 
@@ -90,22 +193,15 @@ class PlacePlotter:
         :param xdata2: The x values for the second series (optional)
         :type xdata2: numpy.array or list or ``None``
         """
-        data1 = _data(ydata1, xdata1)
-        data2 = _data(ydata2, xdata2)
-        if sum([len(d['y']) for d in [data1, data2]]) > DATA_POINT_LIMIT:
-            self._make_png(
-                title, [
-                    self.line(ydata1, xdata1),
-                    self.line(ydata2, xdata2)
-                ]
-            )
-        else:
-            self.progress[title] = {
-                'f': 'view2',
-                'data1': data1,
-                'data2': data2
-            }
+        budget1, budget2 = _budgets([ydata1, ydata2])
+        self.progress[title] = {
+            'f': 'view2',
+            'data1': _data(ydata1, xdata1, budget1),
+            'data2': _data(ydata2, xdata2, budget2)
+        }
 
+    @_throttled
+    @_timed
     def view3(self, title, ydata1, ydata2, ydata3, xdata1=None, xdata2=None, xdata3=None):
         """Make a line chart with 3 series
 
@@ -145,25 +241,16 @@ class PlacePlotter:
         :param xdata3: The x values for the third series (optional)
         :type xdata3: numpy.array or list or ``None``
         """
-        data1 = _data(ydata1, xdata1)
-        data2 = _data(ydata2, xdata2)
-        data3 = _data(ydata3, xdata3)
-        if sum([len(d['y']) for d in [data1, data2, data3]]) > DATA_POINT_LIMIT:
-            self._make_png(
-                title, [
-                    self.line(ydata1, xdata1),
-                    self.line(ydata2, xdata2),
-                    self.line(ydata3, xdata3)
-                ]
-            )
-        else:
-            self.progress[title] = {
-                'f': 'view3',
-                'data1': data1,
-                'data2': data2,
-                'data3': data3
-            }
+        budget1, budget2, budget3 = _budgets([ydata1, ydata2, ydata3])
+        self.progress[title] = {
+            'f': 'view3',
+            'data1': _data(ydata1, xdata1, budget1),
+            'data2': _data(ydata2, xdata2, budget2),
+            'data3': _data(ydata3, xdata3, budget3)
+        }
 
+    @_throttled
+    @_timed
     def view(self, title, series, as_png=False):
         """Show any amount of lines
 
@@ -194,13 +281,20 @@ class PlacePlotter:
         :param as_png: send a PNG file instead of JSON *(Default: False)*
         :type as_png: bool
         """
-        if as_png or sum([len(s['data']['y']) for s in series]) > DATA_POINT_LIMIT:
+        self._view(title, series, as_png)
+
+    def _view(self, title, series, as_png=False):
+        """Send a figure made by ``view``, without throttling or timing it"""
+        if as_png:
             self._make_png(title, series)
-        else:
-            self.progress[title] = {
-                'f': 'view',
-                'series': series
-            }
+            return
+        budgets = _budgets([s['data'] for s in series])
+        self.progress[title] = {
+            'f': 'view',
+            'series': [
+                dict(s, data=_reduce(s['data'], budget)) for s, budget in zip(series, budgets)
+            ]
+        }
 
     def line(self, ydata, xdata=None, color='blue', shape='none', label='data'):
         """Customize a solid line
@@ -286,6 +380,46 @@ class PlacePlotter:
             'data': _data(ydata, xdata)
         }
 
+    @_throttled
+    @_timed
+    def preview(self, title, experiment, field, update):
+        """Show one update of a trace from the preview of an experiment
+
+        The minimum and maximum of each group of samples are sent as two
+        lines, from the level of the preview that fits within
+        ``DATA_POINT_LIMIT``. This is much less data than the full trace,
+        and so it can be used to look at earlier updates, or other
+        experiments, while an experiment is running.
+
+        :param title: The title for the figure
+        :type title: str
+
+        :param experiment: the experiment directory, relative to the media
+                           root (or an absolute path)
+        :type experiment: str
+
+        :param field: the name of the trace field
+        :type field: str
+
+        :param update: the update number
+        :type update: int
+
+        :raises FileNotFoundError: if the experiment has no preview
+        :raises KeyError: if the field has no preview
+        """
+        pyramid = Preview(os.path.join(MEDIA_ROOT, experiment))
+        traces = int(np.prod(pyramid.read(field, update)[1].shape[:-2]))
+        factor, minmax = pyramid.read(field, update, width=DATA_POINT_LIMIT // (2 * traces))
+        minmax = minmax.reshape(traces, -1, 2)
+        xdata = np.arange(minmax.shape[1]) * factor
+        series = []
+        for i, trace in enumerate(minmax):
+            suffix = '' if traces == 1 else ' {}'.format(i)
+            series.append(self.line(trace[:, 1], xdata, label='max' + suffix))
+            series.append(self.line(trace[:, 0], xdata, color='blueLight', label='min' + suffix))
+        self._view(title, series)
+
+    @_timed
     def png(self, title, fig, alt="PLACE figure"):
         """Register a figure to be sent to PLACE as a PNG file
 
@@ -293,15 +427,50 @@ class PlacePlotter:
         unless you know you want something different. These defaults are
         available as `place.plots.DEFAULT_FIGSIZE` and `place.plots.DEFAULT_DPI`.
 
-        :param fig: the figure to render as a PNG
-        :type fig: matplotlib.figure.Figure
+        Rendering a figure can take longer than an update. To keep it off
+        the update, pass a function that draws the figure and returns it,
+        instead of the figure itself::
+
+            self.plotter.png(title, functools.partial(draw_trace, fig, trace))
+
+        The function is called later, on the plotting thread, so it should
+        only use data that the plugin will not change (such as the trace of
+        this update) and figures that only the plotting thread draws on.
+        The functions for a title are all called, in order, so figures that
+        build up over the updates are complete, but only the latest figure
+        is rendered: if the plotting thread falls behind, or the figure is
+        not due, the older frames are skipped.
+
+        A figure passed directly is also rendered on the plotting thread, if
+        it is due, so the plugin must not draw on it again until
+        :func:`wait_for_plots` returns; pass a function instead for figures
+        that are drawn on every update.
+
+        If drawing or rendering fails, the error is raised again by the next
+        call to this method, or by :func:`wait_for_plots`.
+
+        :param fig: the figure to render as a PNG, or a function returning it
+        :type fig: matplotlib.figure.Figure or callable
 
         :param title: The title for the figure
         :type title: str
 
         :param alt: alt text to show if the image cannot be displayed
         :type alt: str
+
+        :raises Exception: any error from drawing or rendering an earlier
+                           figure of this plotter
         """
+        render = self.due(title)
+        if render:
+            self.mark(title)
+        if callable(fig):
+            _WORKER.submit(self, title, fig, alt, render)
+        elif render:
+            _WORKER.submit(self, title, lambda: fig, alt)
+
+    def _save_png(self, title, fig, alt="PLACE figure"):
+        """Write a figure to a PNG file and register it in the progress"""
         if not os.path.exists(os.path.join(MEDIA_ROOT, self.directory)):
             os.makedirs(os.path.join(MEDIA_ROOT, self.directory))
         valid = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
@@ -312,31 +481,390 @@ class PlacePlotter:
             self.directory, '{}_{}.png'.format(file_title, file_hash)
         )
         path = os.path.join(MEDIA_ROOT, filename)
-        with open(path, 'wb') as file_path:
+        with open(path + '.tmp', 'wb') as file_path:
             fig.savefig(file_path, format='png')
+        os.replace(path + '.tmp', path)
         src = 'figures/{}?{}'.format(filename, rand_ext)
         self.progress[title] = {'f': 'png', 'image': {'src': src, 'alt': alt}}
 
     def _make_png(self, title, series):
-        """Make a PNG file instead of sending all the data to PLACE."""
-        fig = Figure(figsize=DEFAULT_FIGSIZE, dpi=DEFAULT_DPI)
-        FigureCanvas(fig)
-        ax = fig.add_subplot(111)
-        ax.set_title(
-            'Number of points exceeded threshold: PNG rendered instead')
-        for ser in series:
-            ax.plot(ser['data']['x'], ser['data']['y'])
-        self.png(title, fig)
-
-
-def _data(ydata, xdata=None):
-    if xdata is None:
-        xdata = [n for n in range(len(ydata))]
-    if isinstance(ydata, list):
-        ydata = np.array(ydata)
-    if isinstance(xdata, list):
-        xdata = np.array(xdata)
-    return {
-        'x': xdata.astype(float, casting='same_kind').tolist(),
-        'y': ydata.astype(float, casting='same_kind').tolist(),
+        """Make a PNG file instead of sending the data to PLACE."""
+        _WORKER.submit(self, title, functools.partial(_draw_series, series), "PLACE figure")
+
+
+class WigglePlot:
+    """A wiggle plot, or B-scan, of one trace per update, drawn as it grows
+
+    Each trace is drawn into an image that is kept between updates, and only
+    that image is sent, as a PNG file. Unlike adding a line to a matplotlib
+    figure on every update, this takes the same time on the last update as
+    on the first. The updates run from left to right, and time runs down.
+
+    In a wiggle plot, each trace is a black line around the position of its
+    update, with the positive side filled in; a value of ``scale`` reaches
+    the next update. In a B-scan, each update is a column shaded from black
+    (``-scale``) to white (``scale``).
+
+    Here is an example of how you would use this in your plugin::
+
+        # in config
+        self._wiggle = WigglePlot(self.plotter, 'Wiggle plot', total_updates,
+                                  scale=2**15)
+        # in update
+        self._wiggle.add(update_number, trace)
+    """
+
+    def __init__(self, plotter, title, updates, scale=1.0, style='wiggle',
+                 size=None, alt="PLACE wiggle plot"):
+        """Constructor
+
+        :param plotter: the plotter of the plugin
+        :type plotter: PlacePlotter
+
+        :param title: The title for the figure
+        :type title: str
+
+        :param updates: the number of updates in the experiment
+        :type updates: int
+
+        :param scale: the value that reaches the next update (wiggle), or
+                      white (B-scan)
+        :type scale: float
+
+        :param style: ``wiggle`` or ``bscan``
+        :type style: str
+
+        :param size: the width and height of the image, in pixels (default:
+                     the size of the other PLACE figures)
+        :type size: (int, int)
+
+        :param alt: alt text to show if the image cannot be displayed
+        :type alt: str
+
+        :raises ValueError: if the style is unknown
+        """
+        if style not in ['wiggle', 'bscan']:
+            raise ValueError('unknown wiggle plot style: {}'.format(style))
+        if size is None:
+            size = (int(DEFAULT_FIGSIZE[0] * DEFAULT_DPI), int(DEFAULT_FIGSIZE[1] * DEFAULT_DPI))
+        width, height = size
+        self.plotter = plotter
+        self.title = title
+        self.updates = max(1, updates)
+        self.scale = scale
+        self.style = style
+        self.alt = alt
+        self.image = np.full((height, width), 255, dtype=np.uint8)
+
+    def add(self, update_number, trace):
+        """Draw the trace of an update, and send the plot
+
+        The drawing is done on the plotting thread (see
+        :meth:`PlacePlotter.png`).
+
+        :param update_number: the update that recorded the trace
+        :type update_number: int
+
+        :param trace: the trace
+        :type trace: numpy.array
+        """
+        trace = np.array(trace, dtype=np.float64).ravel()
+        self.plotter.png(self.title, functools.partial(self._draw, update_number, trace),
+                         alt=self.alt)
+
+    def savefig(self, file_p, format='png'):  # pylint: disable=redefined-builtin
+        """Write the image, in the same way as ``Figure.savefig``"""
+        imsave(file_p, self.image, cmap='gray', vmin=0, vmax=255, format=format)
+
+    def _draw(self, update_number, trace):
+        height, width = self.image.shape
+        values = _rows(trace, height) / self.scale
+        spacing = width / self.updates
+        left = int(update_number * spacing)
+        if self.style == 'bscan':
+            right = max(left + 1, int((update_number + 1) * spacing))
+            shade = np.clip((values + 1.0) * 127.5, 0, 255).astype(np.uint8)
+            self.image[:, left:right] = shade[:, np.newaxis]
+            return self
+        center = (update_number + 0.5) * spacing
+        position = np.clip(center + values * spacing, 0, width - 1)
+        following = np.append(position[1:], position[-1])
+        low = np.round(np.minimum(position, following))
+        high = np.round(np.maximum(position, following))
+        first = int(min(low.min(), center))
+        columns = np.arange(first, int(max(high.max(), center)) + 1)
+        line = (columns >= low[:, np.newaxis]) & (columns <= high[:, np.newaxis])
+        fill = ((columns >= center) & (columns <= position[:, np.newaxis])
+                & (values > 0)[:, np.newaxis])
+        window = self.image[:, first:first + len(columns)]
+        window[line | fill] = 0
+        return self
+
+
+class _PlotWorker:
+    """Draw and render figures on a background thread
+
+    Requests are handled in batches: every drawing function in the batch is
+    called, in order, and then only the last figure for each title is
+    rendered (if any request for it in the batch asked to be rendered). The
+    first error of each plotter is kept, and raised again in the calling
+    thread the next time that plotter submits a figure, or by :meth:`wait`.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._busy = False
+        self._errors = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, plotter, title, draw, alt, render=True):
+        """Queue a figure to be drawn, and rendered if ``render`` is true
+
+        :raises Exception: the first error from an earlier figure of the
+                           plotter
+        """
+        with self._condition:
+            error = self._errors.pop(plotter, None)
+            if error is not None:
+                raise error
+            self._pending.append((plotter, title, draw, alt, render))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait(self):
+        """Wait until every queued figure has been rendered
+
+        :raises Exception: the first error from any plotter
+        """
+        with self._condition:
+            while self._pending or self._busy:
+                self._condition.wait()
+            errors, self._errors = list(self._errors.values()), {}
+        if errors:
+            raise errors[0]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                requests, self._pending = self._pending, []
+                self._busy = True
+            latest = {}
+            rendered = set()
+            errors = {}
+            for plotter, title, draw, alt, render in requests:
+                try:
+                    latest[(plotter, title)] = (draw(), alt)
+                except Exception as err:  # pylint: disable=broad-except
+                    errors.setdefault(plotter, err)
+                if render:
+                    rendered.add((plotter, title))
+            for (plotter, title), (fig, alt) in latest.items():
+                if (plotter, title) not in rendered:
+                    continue
+                try:
+                    plotter._save_png(title, fig, alt)  # pylint: disable=protected-access
+                except Exception as err:  # pylint: disable=broad-except
+                    errors.setdefault(plotter, err)
+            with self._condition:
+                for plotter, err in errors.items():
+                    self._errors.setdefault(plotter, err)
+                self._busy = False
+                self._condition.notify_all()
+
+
+_WORKER = _PlotWorker()
+
+
+def _setting(name, option, default):
+    """Get a plot setting for a plugin, or else from the ``[Plots]`` section"""
+    config = PlaceConfig()
+    if name is not None and config.has_option(name, option):
+        return config.get_config_value(name, option)
+    return config.get_config_value('Plots', option, default)
+
+
+def wait_for_plots():
+    """Wait until the figures queued by every plotter have been rendered
+
+    :raises Exception: the first error from drawing or rendering a figure
+    """
+    _WORKER.wait()
+
+
+def _rows(trace, rows):
+    """Resample a trace to one value for each row of an image
+
+    When there are more samples than rows, the sample with the largest
+    magnitude in each row is used, so peaks are not lost.
+    """
+    if len(trace) < rows:
+        return np.interp(np.linspace(0, len(trace) - 1, rows), np.arange(len(trace)), trace)
+    starts = np.arange(rows) * len(trace) // rows
+    high = np.maximum.reduceat(trace, starts)
+    low = np.minimum.reduceat(trace, starts)
+    return np.where(np.abs(high) >= np.abs(low), high, low)
+
+
+def _draw_series(series):
+    """Draw series made by ``PlacePlotter.line`` on a new figure"""
+    fig = Figure(figsize=DEFAULT_FIGSIZE, dpi=DEFAULT_DPI)
+    FigureCanvas(fig)
+    ax = fig.add_subplot(111)
+    for ser in series:
+        ax.plot(*_values(ser['data']))
+    return fig
+
+
+def _data(ydata, xdata=None, points=None):
+    """Encode the values of a series to be sent to the web application
+
+    The y values are sent as base64 text of little-endian 32-bit floats,
+    marked by an ``encoding`` of ``f32``. Evenly spaced x values (including
+    the default, ``0, 1, 2...``) are sent as a start and a step; other x
+    values are sent in the same way as the y values, relative to the first
+    one so that large values (such as times) keep their precision. This is
+    decoded by ``helper_functions.js``.
+
+    Series that are not numbers (such as ``datetime64`` times, sent as
+    milliseconds since the epoch, or arrays of Python objects) are sent as
+    lists of floats instead.
+
+    :param ydata: The y values for the series
+    :type ydata: numpy.array or list
+
+    :param xdata: The x values for the series (optional)
+    :type xdata: numpy.array or list or ``None``
+
+    :param points: (optional) the most points to send; longer series are
+                   reduced by ``_downsample``
+    :type points: int
+
+    :returns: the encoded series
+    :rtype: dict
+    """
+    ydata = np.asarray(ydata)
+    xdata = None if xdata is None else np.asarray(xdata)
+    if not all(values.dtype.kind in 'biuf' for values in [ydata, xdata] if values is not None):
+        return _listed(ydata, xdata, points)
+    if points is not None and len(ydata) > points:
+        xdata = np.arange(len(ydata)) if xdata is None else xdata
+        xdata, ydata = _downsample(xdata, ydata, points)
+    data = {
+        'encoding': 'f32',
+        'n': len(ydata),
+        'y': _encode(ydata.astype('<f4', casting='same_kind')),
+        'x0': 0.0,
+        'dx': 1.0,
     }
+    if xdata is not None and len(ydata):
+        xdata = np.asarray(xdata).astype(np.float64, casting='same_kind')
+        data['x0'] = float(xdata[0])
+        data['dx'] = float(xdata[-1] - xdata[0]) / max(len(xdata) - 1, 1)
+        offsets = xdata - xdata[0]
+        if not np.allclose(offsets, data['dx'] * np.arange(len(xdata)), rtol=1e-6, atol=0.0):
+            del data['dx']
+            data['x'] = _encode(offsets.astype('<f4'))
+    return data
+
+
+def _listed(ydata, xdata=None, points=None):
+    """Send a series that is not numeric as lists of floats"""
+    ydata = _floats(ydata)
+    xdata = np.arange(len(ydata), dtype=np.float64) if xdata is None else _floats(xdata)
+    if points is not None and len(ydata) > points:
+        xdata, ydata = _downsample(xdata, ydata, points)
+    return {'n': len(ydata), 'x': xdata.tolist(), 'y': ydata.tolist()}
+
+
+def _floats(values):
+    """Convert values to floats, with times in milliseconds since the epoch"""
+    if values.dtype.kind == 'O':
+        try:
+            values = values.astype(np.float64)
+        except (TypeError, ValueError):
+            values = values.astype('datetime64[ms]')
+    if values.dtype.kind in 'Mm':
+        values = values.astype(values.dtype.str[:3] + '[ms]').view(np.int64)
+    return values.astype(np.float64)
+
+
+def _downsample(xdata, ydata, points):
+    """Reduce a series to at most ``points`` points, keeping its peaks
+
+    The series is split into ``points / 2`` buckets of consecutive points,
+    and the minimum and maximum of each bucket are kept, in their original
+    order. Unlike taking every Nth point, this draws the same envelope as
+    the full series, so no spike is lost.
+
+    :returns: the x values and y values that are kept
+    :rtype: (numpy.array, numpy.array)
+    """
+    size = -(-len(ydata) // max(points // 2, 1))
+    full = len(ydata) // size
+    starts = np.arange(full) * size
+    body = ydata[:full * size].reshape(full, size)
+    lows = [starts + body.argmin(axis=1)]
+    highs = [starts + body.argmax(axis=1)]
+    if full * size < len(ydata):
+        tail = ydata[full * size:]
+        lows.append([full * size + tail.argmin()])
+        highs.append([full * size + tail.argmax()])
+    keep = np.sort(np.stack([np.concatenate(lows), np.concatenate(highs)], axis=1), axis=1)
+    keep = keep.ravel()
+    keep = keep[np.concatenate([[True], keep[1:] != keep[:-1]])]
+    return xdata[keep], ydata[keep]
+
+
+def _reduce(data, points):
+    """Reduce a series made by ``_data`` to at most ``points`` points"""
+    if data['n'] <= points:
+        return data
+    xdata, ydata = _values(data)
+    return _data(ydata, xdata, points)
+
+
+def _budgets(series):
+    """Share DATA_POINT_LIMIT between series
+
+    Series that fit in an equal share are sent whole, and what they leave is
+    shared between the longer series.
+
+    :param series: the y values of each series, or encoded series
+    :type series: list
+
+    :returns: the most points to send for each series
+    :rtype: list
+    """
+    lengths = [data['n'] if isinstance(data, dict) else len(data) for data in series]
+    budgets = [0] * len(lengths)
+    remaining = DATA_POINT_LIMIT
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    for count, i in enumerate(order):
+        budgets[i] = max(2, min(lengths[i], remaining // (len(order) - count)))
+        remaining -= budgets[i]
+    return budgets
+
+
+def _values(data):
+    """Decode a series made by ``_data``
+
+    :returns: the x values and y values
+    :rtype: (numpy.array, numpy.array)
+    """
+    if data.get('encoding') != 'f32':
+        return np.array(data['x']), np.array(data['y'])
+    ydata = np.frombuffer(base64.b64decode(data['y']), dtype='<f4')
+    if 'x' in data:
+        xdata = data['x0'] + np.frombuffer(base64.b64decode(data['x']), dtype='<f4')
+    else:
+        xdata = data['x0'] + data['dx'] * np.arange(data['n'])
+    return xdata, ydata
+
+
+def _encode(values):
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')
@@ -1,7 +1,7 @@
 """AlazarTech instrument classes"""
 #try:
-#	from .alazartech import ATSGeneric, ATS660, ATS9440, ATS9462
+#	from .alazartech import ATSGeneric, ATS660, ATS9440, ATS9462, ATSSimulated
 #except:
 #	pass
 
-from .alazartech import ATSGeneric, ATS660, ATS9440, ATS9462
+from .alazartech import ATSGeneric, ATS660, ATS9440, ATS9462, ATSSimulated
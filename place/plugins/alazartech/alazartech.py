@@ -10,14 +10,13 @@ into the PLACE system.
 """
 from ctypes import c_void_p
 from math import ceil
-from time import sleep
 
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.figure import Figure
 import numpy as np
 
+from place.plots import WigglePlot
 from place.plugins.instrument import Instrument
 
+from . import dummy_atsapi
 try:
     from . import atsapi as ats
 except OSError:
@@ -156,8 +155,7 @@ class ATSGeneric(Instrument, ats.Board):
         self._data = None
         self._samples = None
         self._sample_rate = None
-        self._wiggle_figs = None
-        self._wiggle_axes = None
+        self._wiggles = None
 
     def config(self, metadata, total_updates):
         """Configure the AlazarTech oscilliscope card.
@@ -213,11 +211,12 @@ class ATSGeneric(Instrument, ats.Board):
                          + self._config['post_trigger_samples'])
         metadata['samples_per_record'] = self._samples
         if self._config['plot'] == 'yes':
-            self._wiggle_figs = [Figure(figsize=(7.29, 4.17), dpi=96) for i in range(
-                len(self._config['analog_inputs']))]
-            _ = [FigureCanvas(fig) for fig in self._wiggle_figs]
-            self._wiggle_axes = [fig.add_subplot(
-                111) for fig in self._wiggle_figs]
+            self._wiggles = [
+                WigglePlot(self.plotter,
+                           'Channel {} wiggle plot'.format(analog_input['input_channel'][-1]),
+                           total_updates)
+                for analog_input in self._config['analog_inputs']
+            ]
 
     def update(self, update_number, progress):
         """Record a trace using the current configuration.
@@ -337,7 +336,7 @@ class ATSGeneric(Instrument, ats.Board):
             if (self._config['trigger_source_1'] == 'TRIG_FORCE'
                     or self._config['trigger_source_2'] == 'TRIG_FORCE'):
                 self.forceTrigger()
-            sleep(0.1)
+            self.wait(0.1)
         else:
             print("Alazartech: Timeout ocurred. Continuing")
             #raise RuntimeError(
@@ -411,6 +410,8 @@ class ATSGeneric(Instrument, ats.Board):
             ydata = channel[first_record]
             letter = self._config['analog_inputs'][i]['input_channel'][-1]
             title = 'Channel {} trace'.format(letter)
+            if not self.plotter.due(title):
+                continue
             self.plotter.view(
                 title,
                 [
@@ -427,22 +428,8 @@ class ATSGeneric(Instrument, ats.Board):
             # plt.xlabel(r'$\mu$secs')
             # plt.ylim((0, 2**bits))
             # plt.tight_layout()
-        for i, channel in enumerate(place_headings):
-            letter = self._config['analog_inputs'][i]['input_channel'][-1]
-            title = 'Channel {} wiggle plot'.format(letter)
-            trace = channel[first_record] / 2**(bits-1) + update_number - 1
-            self._wiggle_axes[i].plot(
-                trace, times, color='black', linewidth=0.5)
-            self._wiggle_axes[i].fill_betweenx(
-                times,
-                trace,
-                update_number,
-                where=trace > update_number,
-                color='black')
-            self._wiggle_axes[i].set_xlim((-1, self._updates))
-            self._wiggle_axes[i].set_xlabel('Update Number')
-            self._wiggle_axes[i].set_ylabel(r'$\mu$secs')
-            self.plotter.png(title, self._wiggle_figs[i])
+        for wiggle, channel in zip(self._wiggles, place_headings):
+            wiggle.add(update_number, channel[first_record] / 2**(bits-1) - 1)
 
 
 class AnalogInput:
@@ -518,6 +505,23 @@ class ATS9462(ATSGeneric):
     """Subclass for ATS9462"""
     pass
 
+class ATSSimulated(dummy_atsapi.SimulatedBoard, ATSGeneric):
+    """Simulated AlazarTech card, producing synthetic traces without hardware
+
+    The AlazarTech driver is never used by this class, even if it is
+    installed, so it can be used to benchmark PLACE on any computer.
+    """
+    def __init__(self, config, plotter):
+        # pylint: disable=super-init-not-called
+        Instrument.__init__(self, config, plotter)
+        dummy_atsapi.SimulatedBoard.__init__(self)
+        self._updates = None
+        self._analog_inputs = None
+        self._data = None
+        self._samples = None
+        self._sample_rate = None
+        self._wiggles = None
+
 # Private functions
 
 
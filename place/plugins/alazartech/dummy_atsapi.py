@@ -4,9 +4,67 @@
 Used to prevent error messages when PLACE is run on systems without the Alazar
 drivers.
 """
+import ctypes
+
+import numpy as np
+
+
 class Board:
     pass
 
+
+class SimulatedBoard:
+    """A software stand-in for an AlazarTech board
+
+    Used to exercise the AlazarTech plugin (for example, when benchmarking
+    PLACE) without a card. Records are a decaying sine wave with noise, and a
+    capture is never busy, so triggers happen immediately.
+    """
+    def __init__(self, bitsPerSample=14):
+        self.bitsPerSample = bitsPerSample
+        self.preTriggerSamples = 0
+        self.postTriggerSamples = 0
+        self.recordCount = 1
+
+    def busy(self):
+        return False
+
+    def forceTrigger(self):
+        pass
+
+    def getChannelInfo(self):
+        return (ctypes.c_uint32(2**24), ctypes.c_uint8(self.bitsPerSample))
+
+    def inputControl(self, channel, coupling, inputRange, impedance):
+        pass
+
+    def read(self, channelId, buffer, elementSize, record, transferOffset, transferLength):
+        samples = np.ctypeslib.as_array(
+            ctypes.cast(buffer, ctypes.POINTER(ctypes.c_uint16)), shape=(transferLength,))
+        times = np.linspace(0, 4, transferLength)
+        signal = np.exp(-times) * np.sin(2 * np.pi * times)
+        noise = np.random.normal(0, 0.05, transferLength)
+        full_scale = 2**15 - 1
+        samples[:] = (signal + noise + 1) / 2 * full_scale
+
+    def setCaptureClock(self, source, rate, edge, decimation):
+        pass
+
+    def setRecordCount(self, count):
+        self.recordCount = count
+
+    def setRecordSize(self, preTriggerSamples, postTriggerSamples):
+        self.preTriggerSamples = preTriggerSamples
+        self.postTriggerSamples = postTriggerSamples
+
+    def setTriggerOperation(self, operation,
+                            engine1, source1, slope1, level1,
+                            engine2, source2, slope2, level2):
+        pass
+
+    def startCapture(self):
+        pass
+
 INTERNAL_CLOCK = 0x1
 EXTERNAL_CLOCK = 0x2
 FAST_EXTERNAL_CLOCK = 0x2
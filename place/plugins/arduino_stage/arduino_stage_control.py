@@ -41,7 +41,7 @@ class ArduinoStage(Instrument):
 
         self.arduino.write(bytes('c{}\n'.format(new_pos),'ascii'))
 
-        time.sleep(self._config['wait']) 
+        self.wait(self._config['wait'])
         self._position = _read_serial(self.arduino)
 
         field = '{}-position'.format(self.name)
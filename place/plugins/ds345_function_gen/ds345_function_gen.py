@@ -3,7 +3,7 @@ import time
 import sys
 import threading
 
-from place.plugins.instrument import Instrument
+from place.plugins.instrument import AbortExperiment, Instrument
 from place.config import PlaceConfig
 from .ds345_driver import DS345Driver
 
@@ -100,7 +100,7 @@ class DS345(Instrument):
         self.current_amplitude = self._config["start_amplitude"]
         self.current_offset = self._config["start_offset"]     
 
-        time.sleep(2)    #Future comms seem to fail without a pause
+        self.wait(2)    #Future comms seem to fail without a pause
 
     def update(self, update_number, progress):
         """Perform updates to the pre-amp during an experiment.
@@ -127,11 +127,11 @@ class DS345(Instrument):
 
         if self._config["mode"] == "freq_sweep":
             self.function_gen.ampl(amplitude=self.current_amplitude)
-            time.sleep(0.1)
+            self.wait(0.1)
             self.function_gen.trg()  
             
             if self._config["wait_for_sweep"]:
-                time.sleep(self._config["sweep_duration"] + 1)
+                self.wait(self._config["sweep_duration"] + 1)
 
         elif self._config["mode"] == "function":
             if self._config["wait_for_sweep"]:
@@ -144,7 +144,7 @@ class DS345(Instrument):
             #self.function_gen.ampl(amplitude=self.current_amplitude)
             if self._config["wait_for_sweep"]:
                 self._trigger_burst(self._config["start_delay"])
-                time.sleep(self._config["burst_count"]/self._config["start_freq"])
+                self.wait(self._config["burst_count"]/self._config["start_freq"])
             else:
                 thread = threading.Thread(target=self._trigger_burst, args=(self._config["start_delay"], True),daemon=True)
                 thread.start()   
@@ -205,14 +205,18 @@ class DS345(Instrument):
         so that the function can be started and stopped
         at certain times while PLACE continues"""
 
-        time.sleep(delay)
-        self.function_gen.ampl(amplitude=self.current_amplitude)
+        try:
+            self.wait(delay)
+            self.function_gen.ampl(amplitude=self.current_amplitude)
 
-        if duration > 0.0:
-            start_time = time.time()
-            while ( (time.time() - start_time) < duration) or (self.update_number != update_number):
-                time.sleep(0.1)
-            self.function_gen.ampl(amplitude=0.0)
+            if duration > 0.0:
+                start_time = time.time()
+                while ( (time.time() - start_time) < duration) or (self.update_number != update_number):
+                    self.wait(0.1)
+                self.function_gen.ampl(amplitude=0.0)
+        except AbortExperiment:  # cleanup sets the amplitude to 0
+            if not exit_after:
+                raise
 
         if exit_after:
             sys.exit() # Terminate the thread
@@ -222,8 +226,12 @@ class DS345(Instrument):
         so that the burst can be triggered
         at certain times while PLACE continues"""
 
-        time.sleep(delay)
-        self.function_gen.trg()
+        try:
+            self.wait(delay)
+            self.function_gen.trg()
+        except AbortExperiment:
+            if not exit_after:
+                raise
 
         if exit_after:
             sys.exit() # Terminate the thread
@@ -2,13 +2,13 @@
 import json
 import re
 from warnings import warn
-import numpy as np
 try:
     from obspy.core import Stream, Trace
     from obspy.core.trace import Stats
 except ImportError:
     warn("Use of the PAL H5 plugin for PLACE requires installing ObsPy")
 from place.plugins.export import Export
+from place.reader import Experiment
 
 _NUMBER = r'[-+]?\d*\.\d+|\d+'
 
@@ -40,7 +40,7 @@ class H5Output(Export):
         if self._config['reprocess'] != '':
             path = self._config['reprocess']
         header = self._init_header(path)
-        data = _load_data(path)
+        data = Experiment(path)
         streams = self._get_channel_streams(data)
         for update in data:
             header.starttime = str(update['time'])
@@ -135,11 +135,6 @@ def _load_config(path):
         return json.load(file_p)
 
 
-def _load_data(path):
-    with open(path + '/data.npy', 'rb') as file_p:
-        return np.load(file_p)
-
-
 def _write_streams(path, streams):
     for stream_num, stream in enumerate(streams, start=1):
         stream.write(path + '/channel_{}.h5'.format(stream_num), format='H5')
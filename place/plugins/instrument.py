@@ -1,5 +1,13 @@
 """Instrument base class for PLACE"""
 # pylint: disable=no-self-use, unused-argument
+from time import sleep
+
+import numpy as np
+
+
+class AbortExperiment(Exception):
+    """Custom exceptions for aborting an experiment"""
+    pass
 
 
 class Instrument:
@@ -21,10 +29,19 @@ class Instrument:
         backwards to you, use the phrase "this is my number one priority" to
         help you remember.
 
+        Instruments with the same parallel_group (or, if the experiment
+        allows it, the same priority) may be updated at the same time as each
+        other. Leave this as ``None`` unless your instrument is safe to update
+        from another thread.
+
         The elm_module_name is used to send progress back to the web
         application. Therefore, your Elm frontend should always include this
         field.
 
+        The abort_event is set by PLACE when the experiment is aborted. Use
+        the ``wait`` method, rather than ``time.sleep``, so that an abort does
+        not have to wait for a long sleep to finish.
+
         :param config: configuration data (from JSON)
         :type config: dict
 
@@ -33,8 +50,10 @@ class Instrument:
         """
         self._config = config
         self.priority = 100
+        self.parallel_group = None
         self.plotter = plotter
         self.elm_module_name = ''
+        self.abort_event = None
 
     def config(self, metadata, total_updates):
         """Configure the instrument.
@@ -72,6 +91,26 @@ class Instrument:
         """
         raise NotImplementedError
 
+    def fields(self):
+        """Declare the data fields produced by the instrument.
+
+        Called once, after the configuration phase. Instruments that know the
+        names, types and shapes of the data they will produce can return them
+        here, as a list of NumPy dtype descriptions. For example::
+
+            return [('Probe-temperature', 'float64', 4)]
+
+        PLACE will then allocate these fields in the row for each update and
+        pass a writable view of them to ``update`` as the ``row`` argument, so
+        the data can be written in place instead of being returned and
+        merged.
+
+        :returns: the field descriptions, or ``None`` if the fields are not
+                  declared
+        :rtype: list or None
+        """
+        return None
+
     def update(self, update_number, progress):
         """Update the instrument for this step of the experiment.
 
@@ -83,6 +122,12 @@ class Instrument:
         At the end of the update phase, the instrument may return the data to
         be saved into the data file. Returning data is optional.
 
+        If the instrument declares its data with ``fields``, this method is
+        also called with a ``row`` keyword argument. This is a NumPy structured
+        array of shape (1,) containing only the declared fields, and data
+        written into it is saved directly. In this case, the method should
+        return ``None`` (or ``row``).
+
         :param update_number: The count of the current update. This will start at 0.
         :type update_number: int
 
@@ -93,6 +138,89 @@ class Instrument:
         """
         raise NotImplementedError
 
+    def update_block(self, update_number, count, progress):
+        """Update the instrument for several steps of the experiment at once.
+
+        Called instead of ``update`` when the experiment runs its updates in
+        blocks (the ``batch_size`` experiment option). The instrument should
+        return the data for every update in the block, as an array with one
+        row per update, or ``None`` if it does not return data.
+
+        This default implementation calls ``update`` once for each update in
+        the block. Instruments that can produce many rows more efficiently in
+        one call (for example, by reading a buffer from the device) should
+        override it.
+
+        :param update_number: The count of the first update in the block.
+        :type update_number: int
+
+        :param count: The number of updates in the block.
+        :type count: int
+
+        :param progress: A blank dictionary that is sent to your Elm module
+        :type progress: dict
+
+        :returns: the data for the block, with shape (count,), or ``None``
+        :rtype: numpy.array or None
+        """
+        fields = self.fields()
+        if fields is not None:
+            block = np.zeros((count,), dtype=fields)
+            for i in range(count):
+                self.update(update_number + i, progress, row=block[i:i + 1])
+            return block
+        rows = [self.update(update_number + i, progress) for i in range(count)]
+        if rows[0] is None:
+            return None
+        return np.concatenate(rows)
+
+    def wait(self, seconds):
+        """Sleep, unless the experiment is aborted.
+
+        Instruments should use this instead of ``time.sleep`` (including in
+        polling loops) during the config and update phases. It returns as
+        soon as the experiment is aborted, by raising an exception that
+        PLACE handles by cleaning up with ``abort=True``. It should not be
+        used in ``cleanup``, which still runs after the abort.
+
+        :param seconds: the time to sleep
+        :type seconds: float
+
+        :raises AbortExperiment: if the experiment is aborted
+        """
+        if self.abort_event is None:
+            sleep(seconds)
+        elif self.abort_event.wait(seconds):
+            raise AbortExperiment
+
+    def checkpoint(self):
+        """Return the state needed to resume the instrument.
+
+        Called after each update has been saved, when the experiment is
+        recording checkpoints. Instruments whose behaviour depends on earlier
+        updates (for example, a stage stepping through a list of positions)
+        should return enough information to continue from the next update, as
+        a value that can be saved as JSON.
+
+        :returns: the instrument state, or ``None`` if there is no state to save
+        :rtype: dict or None
+        """
+        return None
+
+    def resume(self, state):
+        """Restore the state saved by ``checkpoint``.
+
+        Called when an interrupted experiment is resumed, after ``config`` and
+        before the first update. The next call to ``update`` will be for the
+        update after the checkpoint.
+
+        :param state: the value returned by ``checkpoint``
+        :type state: dict
+
+        :raises NotImplementedError: if not implemented
+        """
+        raise NotImplementedError
+
     def cleanup(self, abort=False):
         """Called at the end of an experiment, or if there is an error along the way.
 
@@ -5,8 +5,8 @@ except ImportError:
     pass
 import numpy as np
 from numpy.lib import recfunctions as rfn
-import matplotlib.pyplot as plt
 from place.config import PlaceConfig
+from place.plots import WigglePlot
 from place.plugins.postprocessing import PostProcessing
 
 # the name of the field that will contain the post-processed data
@@ -19,12 +19,14 @@ class IQDemodulation(PostProcessing):
 
     This class performs IQ demodulation on trace data from PLACE
     """
-    def __init__(self, config):
+    def __init__(self, config, plotter=None):
         PostProcessing.__init__(self, config)
+        self.plotter = plotter
         self.trace_field = None
         self.sampling_rate = None
         self.updates = None
         self.lowpass_cutoff = None
+        self._wiggle = None
 
     def config(self, metadata, total_updates):
         """Configuration for IQ demodulation
@@ -57,10 +59,8 @@ class IQDemodulation(PostProcessing):
                                                                    'lowpass_cutoff',
                                                                    '10e6'))
         metadata['demodulation'] = 'IQ'
-        if self._config['plot']:
-            plt.figure(self.__class__.__name__)
-            plt.clf()
-            plt.ion()
+        if self._config['plot'] and self.plotter is not None:
+            self._wiggle = WigglePlot(self.plotter, name + ' wiggle plot', total_updates)
 
     def update(self, update_number, data):
         if self.trace_field is None:
@@ -82,39 +82,24 @@ class IQDemodulation(PostProcessing):
         # perform post-processing
         processed_data, times = self._post_processing(data_to_process)
         # plot data
-        if self._config['plot']:
-            plot_data = lowpass(processed_data[FIELD],
-                                self._config['lowpass_cutoff'],
+        if self._wiggle is not None:
+            plot_data = lowpass(processed_data[FIELD][0],
+                                self.lowpass_cutoff,
                                 self.sampling_rate,
                                 corners=4,
                                 zerophase=True)
-            plt.figure(self.__class__.__name__)
-            # current plot
-            plt.subplot(211)
-            plt.cla()
-            plt.plot(times, plot_data)
-            plt.xlabel(r'Time [microseconds]')
-            plt.ylabel(r'Velocity[m/s]')
-            plt.pause(0.05)
-            # wiggle plot
-            plt.subplot(212)
-            axes = plt.gca()
-            data = plot_data / (2*max(plot_data)) + update_number
-            axes.plot(data, times, color='black', linewidth=0.5)
-            plt.xlim((-1, self.updates))
-            plt.xlabel('Update Number')
-            plt.ylabel(r'Time [microseconds]')
-            plt.pause(0.05)
+            self.plotter.view(
+                self.__class__.__name__ + ' velocity',
+                [self.plotter.line(plot_data[:len(times)], xdata=times, shape='none')]
+            )
+            peak = np.abs(plot_data).max()
+            self._wiggle.add(update_number, plot_data / (2*peak) if peak else plot_data)
 
         # insert and return the new data
         return rfn.merge_arrays([other_data, processed_data], flatten=True, usemask=False)
 
     def cleanup(self, abort=False):
-        if abort is False and self._config['plot']:
-            plt.figure(self.__class__.__name__)
-            plt.ioff()
-            print('...please close the {} plot to continue...'.format(self.__class__.__name__))
-            plt.show()
+        pass
 
     def _post_processing(self, data_to_process):
         #wavelength = 1550.0e-9
@@ -1,7 +1,7 @@
 """Mirror movement using the New Focus picomotors."""
+import functools
 from itertools import cycle, repeat
 from socket import timeout
-from time import sleep
 
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 from matplotlib.figure import Figure
@@ -29,10 +29,12 @@ class Picomotor(Instrument):
         Instrument.__init__(self, config, plotter)
         self._controller = None
         self._position = None
-        self.last_x = None
-        self.last_y = None
+        self._moves = 0
+        self.x_positions = []
+        self.y_positions = []
         self.fig = None
         self.ax = None
+        self.line = None
 
     def config(self, metadata, total_updates):
         """Configure the picomotors for an experiment.
@@ -66,9 +68,29 @@ class Picomotor(Instrument):
             dtype=[(x_field, 'int32'), (y_field, 'int32')])
         if self._config['plot']:
             self._make_position_plot(data, update_number)
-        sleep(self._config['sleep_time'])
+        self.wait(self._config['sleep_time'])
         return data
 
+    def checkpoint(self):
+        """Save the number of moves made so far.
+
+        :returns: the picomotor state
+        :rtype: dict
+        """
+        return {'moves': self._moves}
+
+    def resume(self, state):
+        """Skip the positions already visited before the checkpoint.
+
+        The position plot starts again from the next position.
+
+        :param state: the state saved by ``checkpoint``
+        :type state: dict
+        """
+        for _ in range(state['moves']):
+            next(self._position)
+        self._moves = state['moves']
+
     def cleanup(self, abort=False):
         """Stop picomotor and end experiment.
 
@@ -174,6 +196,7 @@ class Picomotor(Instrument):
         tries = 25
         pause = 10
         x_position, y_position = next(self._position)
+        self._moves += 1
         for i in range(tries):
             try:
                 if i > 0:
@@ -190,22 +213,36 @@ class Picomotor(Instrument):
                 self._controller.close()
             if i >= tries - 1:
                 raise RuntimeError('could not communicate with picomotors')
-            sleep(pause)
+            self.wait(pause)
 
     def _make_position_plot(self, data, update_number):
         """Plot the x,y position throughout the experiment.
 
+        The figure is drawn on the plotting thread (see
+        :meth:`place.plots.PlacePlotter.png`).
+
         :param data: the data to display on the plot
         :type data: numpy.array
 
         :param update_number: the current update
         :type update_number: int
-
-        :returns: the PLACE plot
-        :rtype: dict
         """
         name = self.__class__.__name__
-        if update_number == 0:
+        curr_x = data[0]['{}-x_position'.format(name)]
+        curr_y = data[0]['{}-y_position'.format(name)]
+        self.plotter.png(
+            'Picomotor motion',
+            functools.partial(self._draw_position, curr_x, curr_y),
+            alt='Plot showing the movement of the picomotors'
+        )
+
+    def _draw_position(self, curr_x, curr_y):
+        """Add the latest position to the plot (on the plotting thread).
+
+        The positions are drawn as one line, which is extended on each
+        update rather than adding a new line to the figure.
+        """
+        if self.fig is None:
             self.fig = Figure(figsize=(7.29, 4.17), dpi=96)
             FigureCanvas(self.fig)
             self.ax = self.fig.add_subplot(111)
@@ -214,24 +251,13 @@ class Picomotor(Instrument):
             if self._config['invert_y']:
                 self.ax.invert_yaxis()
             self.ax.axis('equal')
-            curr_x = data[0]['{}-x_position'.format(name)]
-            curr_y = data[0]['{}-y_position'.format(name)]
-            self.ax.plot(curr_x, curr_y, '-o')
-            self.last_x = curr_x
-            self.last_y = curr_y
-        else:
-            curr_x = data[0]['{}-x_position'.format(name)]
-            curr_y = data[0]['{}-y_position'.format(name)]
-            self.ax.plot([self.last_x, curr_x],
-                         [self.last_y, curr_y], '-o')
-            self.last_x = curr_x
-            self.last_y = curr_y
-        return self.plotter.png(
-            'Picomotor motion',
-            self.fig,
-            alt='Plot showing the movement of the picomotors'
-        )
-
+            self.line, = self.ax.plot([], [], '-o')
+        self.x_positions.append(curr_x)
+        self.y_positions.append(curr_y)
+        self.line.set_data(self.x_positions, self.y_positions)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        return self.fig
 
 def polar_to_cart(rho, phi):
     """Convert polar to cartesian"""
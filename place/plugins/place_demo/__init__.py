@@ -1,2 +1,2 @@
 """A demo instrument class"""
-from .place_demo import PlaceDemo
+from .place_demo import PlaceDemo, SyntheticDemo
@@ -53,9 +53,20 @@ class PlaceDemo(Instrument):
         self._samples = self._config['number_of_points']
         self._updates = total_updates
         metadata['{}_samples'.format(self.__class__.__name__)] = self._samples
-        sleep(self._config['config_sleep_time'])
+        self.wait(self._config['config_sleep_time'])
 
-    def update(self, update_number, progress):
+    def fields(self):
+        """Declare the count and trace fields.
+
+        :returns: the field descriptions
+        :rtype: list
+        """
+        return [
+            ('{}-count'.format(self.__class__.__name__), 'int16'),
+            ('{}-trace'.format(self.__class__.__name__), 'float64', self._samples),
+        ]
+
+    def update(self, update_number, progress, row=None):
         """Increment the counter.
 
         Additionally, this will generate a random trace, plot the trace, and
@@ -68,6 +79,9 @@ class PlaceDemo(Instrument):
         :param progress: A blank dictionary for sending data back to the frontend
         :type progress: dict
 
+        :param row: the declared fields for this update, to be written in place
+        :type row: numpy.array
+
         :returns: the current count (1-indexed) and a dummy trace in a numpy
                   record array
         :rtype: numpy.recarray
@@ -87,10 +101,11 @@ class PlaceDemo(Instrument):
         trace3 = (samples + noise3 + 1) * 2**13
         count_field = '{}-count'.format(self.__class__.__name__)
         trace_field = '{}-trace'.format(self.__class__.__name__)
-        data = np.array(
-            [(self._count, trace1)],
-            dtype=[(count_field, 'int16'), (trace_field, 'float64', self._samples)])
-        sleep(self._config['update_sleep_time'])
+        if row is None:
+            row = np.zeros((1,), dtype=self.fields())
+        row[count_field] = self._count
+        row[trace_field] = trace1
+        self.wait(self._config['update_sleep_time'])
 
         # plotting one series
         self.plotter.view1(
@@ -131,7 +146,8 @@ class PlaceDemo(Instrument):
             ]
         )
 
-        # example of what happens if your number of points exceeds the maximum
+        # example of what happens if your number of points exceeds the maximum:
+        # the trace is reduced to fit, keeping the peaks
         max_points = DATA_POINT_LIMIT
         many_samples = np.array(
             [np.exp(-i) * np.sin(2*np.pi*i) for i in np.linspace(0, 4, max_points * 2)])
@@ -144,7 +160,59 @@ class PlaceDemo(Instrument):
         )
 
         # return data to be saved in `data.npy` file
-        return data
+        return row
+
+    def update_block(self, update_number, count, progress):
+        """Increment the counter for a block of updates.
+
+        This produces the same data as calling ``update`` for each update in
+        the block, but generates all the traces at once and only plots the
+        last one.
+
+        :param update_number: the count of the first update in the block
+        :type update_number: int
+
+        :param count: the number of updates in the block
+        :type count: int
+
+        :param progress: A blank dictionary for sending data back to the frontend
+        :type progress: dict
+
+        :returns: the counts and dummy traces for the block
+        :rtype: numpy.recarray
+        """
+        self._number = update_number + count - 1
+        samples = np.exp(-np.linspace(0, 4, self._samples)) * np.sin(
+            2*np.pi*np.linspace(0, 4, self._samples))
+        noise = np.random.normal(  # pylint: disable=no-member
+            0, 0.15, (count, self._samples))
+        block = np.zeros((count,), dtype=self.fields())
+        block['{}-count'.format(self.__class__.__name__)] = np.arange(
+            self._count + 1, self._count + count + 1)
+        block['{}-trace'.format(self.__class__.__name__)] = (samples + noise + 1) * 2**13
+        self._count += count
+        self.wait(self._config['update_sleep_time'] * count)
+        self.plotter.view1(
+            'Figure 1: Plot one series',
+            block['{}-trace'.format(self.__class__.__name__)][-1]
+        )
+        return block
+
+    def checkpoint(self):
+        """Save the count.
+
+        :returns: the counter state
+        :rtype: dict
+        """
+        return {'count': self._count}
+
+    def resume(self, state):
+        """Continue counting from the checkpoint.
+
+        :param state: the state saved by ``checkpoint``
+        :type state: dict
+        """
+        self._count = state['count']
 
     def cleanup(self, abort=False):
         """Stop the demo and cleanup.
@@ -154,3 +222,112 @@ class PlaceDemo(Instrument):
         :type abort: bool
         """
         sleep(self._config['cleanup_sleep_time'])
+
+
+class SyntheticDemo(PlaceDemo):
+    """Synthetic instrument for measuring the overhead of PLACE.
+
+    This behaves like ``PlaceDemo``, but it never sleeps, its traces are
+    cheap to produce, and its field names start with the Elm module name
+    (rather than the class name), so any number of them can be used in one
+    experiment. It is used by the ``place_bench`` command.
+
+    ``SyntheticDemo`` requires ``number_of_points`` and ``plot`` values, and
+    accepts an optional NumPy ``dtype`` for the trace (default: float64).
+    """
+
+    def __init__(self, config, plotter):
+        """Initialize the instrument, without configuring.
+
+        :param config: configuration data (as a parsed JSON object)
+        :type config: dict
+
+        :param plotter: a plotting object to return plots to the web interface
+        :type plotter: plots.PlacePlotter
+        """
+        PlaceDemo.__init__(self, config, plotter)
+        self._trace = None
+
+    def config(self, metadata, total_updates):
+        """Prepare the base trace.
+
+        :param metadata: metadata for the experiment
+        :type metadata: dict
+
+        :param total_updates: number of update that will be performed
+        :type total_updates: int
+        """
+        self._count = 0
+        self._samples = self._config['number_of_points']
+        self._updates = total_updates
+        times = np.linspace(0, 4, self._samples)
+        self._trace = (np.exp(-times) * np.sin(2*np.pi*times) + 1) * 2**13
+
+    def fields(self):
+        """Declare the count and trace fields.
+
+        :returns: the field descriptions
+        :rtype: list
+        """
+        return [
+            ('{}-count'.format(self.elm_module_name), 'int64'),
+            ('{}-trace'.format(self.elm_module_name),
+             self._config.get('dtype', 'float64'), self._samples),
+        ]
+
+    def update(self, update_number, progress, row=None):
+        """Write the count and trace for one update.
+
+        :param update_number: the count of the current update (0-indexed)
+        :type update_number: int
+
+        :param progress: A blank dictionary for sending data back to the frontend
+        :type progress: dict
+
+        :param row: the declared fields for this update, to be written in place
+        :type row: numpy.array
+
+        :returns: the count and trace
+        :rtype: numpy.recarray
+        """
+        block = self.update_block(update_number, 1, progress)
+        if row is None:
+            return block
+        row[...] = block
+        return row
+
+    def update_block(self, update_number, count, progress):
+        """Write the counts and traces for a block of updates.
+
+        :param update_number: the count of the first update in the block
+        :type update_number: int
+
+        :param count: the number of updates in the block
+        :type count: int
+
+        :param progress: A blank dictionary for sending data back to the frontend
+        :type progress: dict
+
+        :returns: the counts and traces
+        :rtype: numpy.recarray
+        """
+        block = np.zeros((count,), dtype=self.fields())
+        counts = np.arange(self._count + 1, self._count + count + 1)
+        block['{}-count'.format(self.elm_module_name)] = counts
+        block['{}-trace'.format(self.elm_module_name)] = self._trace * (
+            1 + 1e-3 * counts[:, np.newaxis])
+        self._count += count
+        if self._config['plot']:
+            self.plotter.view1(
+                '{} trace'.format(self.elm_module_name),
+                block['{}-trace'.format(self.elm_module_name)][-1]
+            )
+        return block
+
+    def cleanup(self, abort=False):
+        """Nothing to cleanup.
+
+        :param abort: ``True`` if the experiement is being aborted
+        :type abort: bool
+        """
+        return
@@ -15,7 +15,6 @@ VD-09 is 'VeloDec,1'
 """
 import ast
 import re
-from time import sleep
 
 import numpy as np
 import serial
@@ -252,7 +251,7 @@ class Polytec(Instrument):
         countdown = timeout
         tick = 1
         while countdown > 0:
-            sleep(tick)
+            self.wait(tick)
             countdown -= tick
             if self._write_and_readline('Get,SensorHead,0,AutoFocusResult\n') == 'Found\n':
                 break
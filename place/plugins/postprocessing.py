@@ -1,4 +1,7 @@
 """Post-processing base class for PLACE"""
+import numpy as np
+
+
 class PostProcessing:
     """Generic interface for post-processing data generated in PLACE.
 
@@ -58,6 +61,22 @@ class PostProcessing:
         """
         raise NotImplementedError
 
+    def fields(self):
+        """Declare the data fields produced by the post-processing.
+
+        Called once, after the configuration phase. If this returns a list of
+        NumPy dtype descriptions, PLACE allocates these fields in the row for
+        each update before any plugin runs. The ``update`` method then
+        receives the row itself, rather than a copy, and should write its
+        results into its declared fields in place. Post-processing that
+        removes or renames fields should not declare its fields.
+
+        :returns: the field descriptions, or ``None`` if the fields are not
+                  declared
+        :rtype: list or None
+        """
+        return None
+
     def update(self, update_number, data):
         """Update the data by performing post-processing on one or more fields.
 
@@ -114,6 +133,35 @@ class PostProcessing:
         """
         raise NotImplementedError
 
+    def update_block(self, update_number, data):
+        """Post-process the data for several updates at once.
+
+        Called instead of ``update`` when the experiment runs its updates in
+        blocks (the ``batch_size`` experiment option). The data contains one
+        row for each update in the block, and the method must return one row
+        for each update in the same order.
+
+        This default implementation calls ``update`` once for each row.
+        Post-processing that can be vectorized across rows should override
+        it.
+
+        :param update_number: The count of the first update in the block.
+        :type update_number: int
+
+        :param data: the rows collected so far for the block
+        :type data: numpy.array, structured array of shape (count,)
+
+        :returns: the post-processed rows
+        :rtype: numpy.array
+        """
+        declared = self.fields() is not None
+        rows = []
+        for i in range(len(data)):
+            row = data[i:i + 1] if declared else data[i:i + 1].copy()
+            new_row = self.update(update_number + i, row)
+            rows.append(row if new_row is None else new_row)
+        return np.concatenate(rows)
+
     def cleanup(self, abort=False):
         """Called at the end of an experiment, or if there is an error along the way.
 
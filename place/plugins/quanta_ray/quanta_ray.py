@@ -8,7 +8,7 @@ from time import sleep
 import threading
 import numpy as np
 import pandas
-from place.plugins.instrument import Instrument
+from place.plugins.instrument import AbortExperiment, Instrument
 from place.config import PlaceConfig
 from .qray_driver import QuantaRay
 
@@ -121,7 +121,7 @@ class QuantaRayINDI(Instrument):
 
         self._start_laser()
 
-        sleep(1)
+        self.wait(1)
         metadata['oscillator_power'] = QuantaRay(portINDI=self.port).get_osc_power()
         metadata['repeat_rate'] = QuantaRay(portINDI=self.port).get_trig_rate()
 
@@ -160,10 +160,10 @@ class QuantaRayINDI(Instrument):
 
         if self._config["power_mode"] == "var_power" and update_number > 0:
             QuantaRay(portINDI=self.port).set_osc_power(self._config['start_power_percentage'] + (update_number * self.power_increment) )
-            sleep(1)
+            self.wait(1)
         elif self._config["power_mode"] == "usr_profile" and update_number > 0:
             QuantaRay(portINDI=self.port).set_osc_power(self.power_profile[update_number])
-            sleep(1)           
+            self.wait(1)           
 
         osc_power = float(QuantaRay(portINDI=self.port).get_osc_power().split(' ')[0])
 
@@ -203,7 +203,7 @@ class QuantaRayINDI(Instrument):
         if 'Oscillator simmer is on' not in str(QuantaRay(portINDI=self.port).get_status()):
             QuantaRay(portINDI=self.port).turn_on()
             print('...waiting 20 seconds for laser to turn on...')
-            sleep(20)
+            self.wait(20)
 
         QuantaRay(portINDI=self.port).single_shot()
         QuantaRay(portINDI=self.port).normal_mode()
@@ -217,32 +217,35 @@ class QuantaRayINDI(Instrument):
     def _control_shots(self, number_of_shots, shot_interval):
         """
         Control the shots from the laser. This is designed to
-        run in a separate thread so that it does not block PLACE.
+        run in a separate thread so that it does not block PLACE. If the
+        experiment is aborted, no more shots are fired.
         """
-
-        sleep(5)
-
-        # If the shot interval is the native rep rate (0.1 s),
-        # set to REP for the required time to avoid missing shots.
-        # Otherwise, fire a single shot at the right interval.
-        if shot_interval == 0.1:
-            total_time = shot_interval * (number_of_shots - 1)
-            QuantaRay(portINDI=self.port).set_watchdog(min(109, 2 * total_time))
-            QuantaRay(portINDI=self.port).set('REP')
-            sleep(total_time + 0.2)
-            try:
-                QuantaRay(portINDI=self.port).set('SING')
-                QuantaRay(portINDI=self.port).set_watchdog(self._config['watchdog_time'])
-            except:
-                print("Serial Exception in _control_shots for INDI. Continuing.")
-        else:
-            num_shots = 0
-            while num_shots < number_of_shots:
-                QuantaRay(portINDI=self.port).set(cmd='FIR')
-                num_shots += 1
-
-                if num_shots < number_of_shots:
-                    sleep(max(0.1, shot_interval))
+        try:
+            self.wait(5)
+
+            # If the shot interval is the native rep rate (0.1 s),
+            # set to REP for the required time to avoid missing shots.
+            # Otherwise, fire a single shot at the right interval.
+            if shot_interval == 0.1:
+                total_time = shot_interval * (number_of_shots - 1)
+                QuantaRay(portINDI=self.port).set_watchdog(min(109, 2 * total_time))
+                QuantaRay(portINDI=self.port).set('REP')
+                self.wait(total_time + 0.2)
+                try:
+                    QuantaRay(portINDI=self.port).set('SING')
+                    QuantaRay(portINDI=self.port).set_watchdog(self._config['watchdog_time'])
+                except:
+                    print("Serial Exception in _control_shots for INDI. Continuing.")
+            else:
+                num_shots = 0
+                while num_shots < number_of_shots:
+                    QuantaRay(portINDI=self.port).set(cmd='FIR')
+                    num_shots += 1
+
+                    if num_shots < number_of_shots:
+                        self.wait(max(0.1, shot_interval))
+        except AbortExperiment:
+            return
 
         sys.exit()
 
@@ -1,13 +1,11 @@
 """Tektronix oscilloscope."""
 
 from socket import AF_INET, SOCK_STREAM, socket
-from time import sleep
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 from place.config import PlaceConfig
-from place.plots import DEFAULT_DPI, DEFAULT_FIGSIZE
+from place.plots import WigglePlot
 from place.plugins.instrument import Instrument
 
 
@@ -88,6 +86,7 @@ class TektronixCommon(Instrument):
         self._record_length = None
         self._x_zero = None
         self._x_increment = None
+        self._wiggles = None
 
     def config(self, metadata, total_updates):
         """Configure the oscilloscope.
@@ -138,16 +137,12 @@ class TektronixCommon(Instrument):
                 channel+1)] = self._get_y_multiplier(channel+1)
         self._scope.close()
         if self._config['plot']:
-            for channel, active in enumerate(self._channels):
-                if not active:
-                    continue
-                width, height = DEFAULT_FIGSIZE
-                plt.figure(
-                    name + '-ch{:d}'.format(channel+1),
-                    figsize=(width, height*2),  # two subplots
-                    dpi=DEFAULT_DPI
-                )
-                plt.clf()
+            self._wiggles = {
+                channel+1: WigglePlot(self.plotter,
+                                      name + '-ch{:d} wiggle plot'.format(channel+1),
+                                      total_updates, scale=2**15)
+                for channel, active in enumerate(self._channels) if active
+            }
 
     def update(self, update_number, progress):
         """Get data from the oscilloscope.
@@ -305,7 +300,7 @@ class TektronixCommon(Instrument):
 
     def _activate_acquisition(self):
         self._scope.sendall(b':ACQUIRE:STATE ON\n')
-        sleep(0.1)
+        self.wait(0.1)
         if self._config['force_trigger']:
             self._force_trigger()
         else:
@@ -315,7 +310,7 @@ class TektronixCommon(Instrument):
         for _ in range(120):
             self._scope.settimeout(60)
             self._scope.sendall(b':TRIGGER FORCE\n')
-            sleep(0.1)
+            self.wait(0.1)
             self._scope.settimeout(0.25)
             try:
                 self._scope.recv(4096)
@@ -323,7 +318,7 @@ class TektronixCommon(Instrument):
                 pass
             self._scope.settimeout(60)
             self._scope.sendall(b':ACQUIRE:STATE?\n')
-            sleep(0.1)
+            self.wait(0.1)
             byte = b''
             for _ in range(600):
                 byte = self._scope.recv(1)
@@ -346,14 +341,14 @@ class TektronixCommon(Instrument):
                 try:
                     byte = self._scope.recv(1)
                 except BlockingIOError:
-                    sleep(0.1)
+                    self.wait(0.1)
                     continue
                 if byte == b'0' or byte == b'1':
                     break
 
             if byte == b'0':
                 break
-            sleep(0.5)
+            self.wait(0.5)
 
     def _request_curve(self, channel):
         self._scope.settimeout(60.0)
@@ -377,35 +372,12 @@ class TektronixCommon(Instrument):
         times = np.arange(len(trace)) * \
             self._x_increment[channel-1] + self._x_zero[channel-1]
         name = self.__class__.__name__
-        plt.figure(name + '-ch{:d}'.format(channel))
-        # trace plot
-        plt.subplot(211)
-        plt.cla()
-        plt.plot(times, trace)
-        plt.xlabel('seconds')
-        plt.ylim((-(2**15), 2**15))
-        plt.title('Update {:03}'.format(update_number))
-        plt.tight_layout()
-        # wiggle plot
-        plt.subplot(212)
-        axes = plt.gca()
-        data = trace / 2**15 + update_number
-        axes.plot(data, times, color='black', linewidth=0.5)
-        axes.fill_betweenx(
-            times,
-            data,
-            update_number,
-            where=data > update_number,
-            color='black')
-        plt.xlim((-1, self._updates))
-        plt.xlabel('Update Number')
-        plt.ylabel('seconds')
-        plt.tight_layout()
-        # save plot to progress
-        self.plotter.png(
-            name + '-ch{: d}'.format(channel),
-            plt.gcf()
+        self.plotter.view(
+            name + '-ch{:d} trace'.format(channel),
+            [self.plotter.line(trace, xdata=times, shape='none',
+                               label='Update {:03}'.format(update_number))]
         )
+        self._wiggles[channel].add(update_number, trace)
 
 
 class MSO3000andDPO3000Series(TektronixCommon):
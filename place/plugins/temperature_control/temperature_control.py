@@ -110,7 +110,7 @@ class TemperatureControl(Instrument):
             else:
                 self.last_set = total_updates
 
-        time.sleep(2)
+        self.wait(2)
 
 
     def update(self, update_number, progress):
@@ -156,12 +156,12 @@ class TemperatureControl(Instrument):
             self.new_setpoint = t_profile[update_number]
             self._change_setpoint = True
             while self._change_setpoint:
-                time.sleep(0.5)
+                self.wait(0.5)
                 if self.new_setpoint < 0.0:
                     raise Exception
             
             print("Waiting for {} hours".format(self.fixed_wait_time))
-            time.sleep(self.fixed_wait_time*3600)
+            self.wait(self.fixed_wait_time*3600)
 
             print("Checking for temperature stability")
             num_to_check = int((self.stability_time * 60) / self.seconds_between_reads)
@@ -174,7 +174,7 @@ class TemperatureControl(Instrument):
                 vals_to_check = o_temps[-num_to_check:]
                 if np.std(vals_to_check) < self.temp_tolerance:
                     stability_reached = True
-                time.sleep(self.seconds_between_reads*6)
+                self.wait(self.seconds_between_reads*6)
                 with open(override_file, 'r') as f:
                     manual_override = int(f.read())
                     print("Temperature loop manual override")
@@ -1,5 +1,4 @@
 """Stage movement using the XPS-C8 controller."""
-from time import sleep
 from itertools import count, repeat
 import numpy as np
 from place.plugins.instrument import Instrument
@@ -69,6 +68,8 @@ class Stage(Instrument):
         self._position = None
         self._group = None
         self._positioner = None
+        self._moves = 0
+        self._jogging = False
 
     def config(self, metadata, total_updates):
         """Configure the stage for an experiment.
@@ -97,7 +98,7 @@ class Stage(Instrument):
         self._move_stage(position=self._config['start'])
         if self._config['mode'] == 'continuous':
             self._enable_jogging()
-        sleep(self._config['wait'])
+        self.wait(self._config['wait'])
 
     def update(self, update_number, progress):
         """Move the stage.
@@ -120,10 +121,11 @@ class Stage(Instrument):
         if self._config['mode'] == 'incremental':
             # Move the stage to the next position.
             self._move_stage()
-        elif self._config['mode'] == 'continuous' and update_number == 0:
+        elif self._config['mode'] == 'continuous' and not self._jogging:
             # Turn on stage jogging.
             self._jog_stage()
-        sleep(self._config['wait'])
+            self._jogging = True
+        self.wait(self._config['wait'])
 
         # Get the current position and save it in our data array.
         field = '{}-position'.format(self.__class__.__name__)
@@ -134,6 +136,27 @@ class Stage(Instrument):
         # return the data from this instrument for this update
         return data
 
+    def checkpoint(self):
+        """Save the number of incremental moves made so far.
+
+        :returns: the stage state
+        :rtype: dict
+        """
+        return {'moves': self._moves}
+
+    def resume(self, state):
+        """Skip the positions already visited before the checkpoint.
+
+        In continuous mode, jogging restarts on the next update.
+
+        :param state: the state saved by ``checkpoint``
+        :type state: dict
+        """
+        if self._config['mode'] == 'incremental':
+            for _ in range(state['moves']):
+                next(self._position)
+        self._moves = state['moves']
+
     def cleanup(self, abort=False):
         """Stop stage movement and end the experiment.
 
@@ -228,6 +251,7 @@ class Stage(Instrument):
     def _move_stage(self, position=None):
         if position is None:
             position = next(self._position)
+            self._moves += 1
         ret = self._controller.GroupMoveAbsolute(
             self._socket, self._group, [position])
         if ret[0] != _SUCCESS:
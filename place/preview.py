@@ -0,0 +1,314 @@
+"""Min/max previews of the traces in an experiment
+
+For each large array field (such as a trace), PLACE keeps a pyramid of
+decimated copies in the ``preview`` directory of the experiment. Each level
+stores the minimum and maximum of every group of samples along the last
+axis: the first level groups 4 samples, the next 16, and so on, down to a few
+dozen groups per trace. Drawing the minimum and maximum of each group shows
+the same envelope as the full trace, so any zoom level can be drawn from a
+small fraction of the data.
+
+The preview is written as the updates are saved, unless the ``preview``
+experiment option is false, and can be built for older experiments with the
+``place_preview`` command.
+"""
+import argparse
+import os
+
+import numpy as np
+
+from .reader import Experiment
+from .storage import read_manifest, reopen, resize, write_json
+from .utilities import for_each_directory
+
+FACTOR = 4
+"""The number of samples (or groups) combined at each level"""
+MIN_SAMPLES = 256
+"""Fields with fewer samples in each trace are not previewed"""
+MIN_BINS = 16
+"""The smallest number of groups in a level"""
+
+
+class PreviewFiles:
+    """Write the preview pyramid as updates are saved
+
+    This has the same interface as the storage objects in
+    :mod:`place.storage`, and is used alongside them. Each level of each
+    field is a memory-mapped NumPy file, with one row per update, holding the
+    minimum and maximum of each group of samples in its last axis.
+
+    The ``preview`` directory is only created once a field that can be
+    previewed is written.
+    """
+
+    def __init__(self, directory, total_updates):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :param total_updates: the number of updates in the experiment
+        :type total_updates: int
+        """
+        self.directory = os.path.join(directory, 'preview')
+        self.total_updates = total_updates
+        self.rows = 0
+        self._fields = None
+        self._levels = None
+
+    def write(self, update_number, data):
+        """Write the preview for one update, or for a block of updates
+
+        :param update_number: the (first) update that produced the data
+        :type update_number: int
+
+        :param data: the row data
+        :type data: numpy.array, structured array with one row per update,
+                    or a dictionary of field arrays
+
+        :raises FileExistsError: if the ``preview`` directory already exists
+                                 when the first field is previewed
+        """
+        if self._fields is None:
+            self._create(data)
+        for field, levels in zip(self._fields, self._levels):
+            values = data[field['name']]
+            for level, minmax in zip(levels, _pyramid(values, len(levels))):
+                level[update_number:update_number + len(values)] = minmax
+            self.rows = max(self.rows, update_number + len(values))
+
+    def resume(self, update_number):
+        """Continue an interrupted experiment from an update
+
+        :param update_number: the next update to be written
+        :type update_number: int
+
+        :raises RuntimeError: if a file cannot be extended
+        """
+        self.rows = update_number
+        try:
+            manifest = read_manifest(self.directory)
+        except FileNotFoundError:
+            return
+        self._fields = manifest['fields']
+        self._levels = [
+            [reopen(os.path.join(self.directory, level['file']), self.total_updates)
+             for level in field['levels']]
+            for field in self._fields
+        ]
+        self._write_manifest(None)
+
+    def close(self, abort=False):  # pylint: disable=unused-argument
+        """Flush the preview, trim any rows that were not written, and record
+        the number of rows in the manifest
+
+        :param abort: ``True`` if the experiment is being aborted
+        :type abort: bool
+        """
+        if not self._fields:
+            return
+        filenames = []
+        for levels in self._levels:
+            for level in levels:
+                level.flush()
+                filenames.append(level.filename)
+        self._levels = None
+        if self.rows < self.total_updates:
+            for filename in filenames:
+                resize(filename, self.rows)
+        self._write_manifest(self.rows)
+
+    def _create(self, data):
+        self._fields = []
+        self._levels = []
+        names = data.dtype.names if isinstance(data, np.ndarray) else list(data)
+        for name in names:
+            values = data[name]
+            if not _previewed(values.dtype, values.shape[1:]):
+                continue
+            if not self._fields:
+                os.makedirs(self.directory)
+            field = {
+                'name': name,
+                'dtype': np.lib.format.dtype_to_descr(values.dtype),
+                'shape': list(values.shape[1:]),
+                'levels': [],
+            }
+            levels = []
+            factor = FACTOR
+            while _bins(values.shape[-1], factor) >= MIN_BINS:
+                level = {
+                    'factor': factor,
+                    'bins': _bins(values.shape[-1], factor),
+                    'file': 'field_{:03d}_{}.npy'.format(len(self._fields), len(levels)),
+                }
+                levels.append(np.lib.format.open_memmap(
+                    os.path.join(self.directory, level['file']),
+                    mode='w+',
+                    dtype=values.dtype,
+                    shape=(self.total_updates,) + values.shape[1:-1] + (level['bins'], 2)
+                ))
+                field['levels'].append(level)
+                factor *= FACTOR
+            self._fields.append(field)
+            self._levels.append(levels)
+        if self._fields:
+            self._write_manifest(None)
+
+    def _write_manifest(self, rows):
+        manifest = {'updates': self.total_updates, 'rows': rows, 'fields': self._fields}
+        write_json(os.path.join(self.directory, 'manifest.json'), manifest)
+
+
+class Preview:
+    """Read the preview pyramid of an experiment
+
+    The level is chosen to suit the width of the plot: the coarsest level
+    with at least ``width`` groups is used. For example, to draw update 100
+    of a trace about 800 pixels wide::
+
+        preview = Preview('experiment')
+        factor, minmax = preview.read('ATS660-trace', 100, width=800)
+        x = np.arange(minmax.shape[-2]) * factor
+        plt.fill_between(x, minmax[..., 0], minmax[..., 1])
+    """
+
+    def __init__(self, directory):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :raises FileNotFoundError: if the experiment has no preview
+        """
+        self.directory = os.path.join(directory, 'preview')
+        manifest = read_manifest(self.directory)
+        self._fields = {field['name']: field for field in manifest['fields']}
+        self._rows = manifest['rows']
+        self.names = tuple(self._fields)
+
+    def __contains__(self, name):
+        return name in self._fields
+
+    def levels(self, name):
+        """Get the levels of a field, finest first
+
+        :param name: the field name
+        :type name: str
+
+        :returns: the number of samples in each group, and the number of
+                  groups in each trace, for each level
+        :rtype: list(tuple(int, int))
+
+        :raises KeyError: if the field has no preview
+        """
+        return [(level['factor'], level['bins']) for level in self._fields[name]['levels']]
+
+    def read(self, name, key=slice(None), width=None):
+        """Read the minimum and maximum of each group of samples
+
+        :param name: the field name
+        :type name: str
+
+        :param key: the update number, or a slice of updates
+        :type key: int or slice
+
+        :param width: the number of groups wanted in each trace; the coarsest
+                      level with at least this many is used, or the finest
+                      level if there is none (default: the coarsest level)
+        :type width: int
+
+        :returns: the number of samples in each group, and the preview, with
+                  the minimum and maximum in the last axis
+        :rtype: tuple(int, numpy.memmap)
+
+        :raises KeyError: if the field has no preview
+        """
+        levels = self._fields[name]['levels']
+        level = levels[-1]
+        if width is not None:
+            level = next((level for level in reversed(levels) if level['bins'] >= width),
+                         levels[0])
+        preview = np.load(os.path.join(self.directory, level['file']), mmap_mode='r')
+        if self._rows is not None:
+            preview = preview[:self._rows]
+        return level['factor'], preview[key]
+
+
+def preview():
+    """Command-line entry point to build previews for finished experiments"""
+    parser = argparse.ArgumentParser(
+        description='Build the min/max preview of the traces in PLACE experiments.')
+    parser.add_argument('directories', metavar='DIRECTORY', nargs='+',
+                        help='a PLACE experiment directory')
+    parser.add_argument('--jobs', type=int, default=4,
+                        help='directories to process at the same time (default: 4)')
+    args = parser.parse_args()
+    return for_each_directory(build_preview, args.directories, args.jobs)
+
+
+def build_preview(directory, chunk=256, throttle=None):
+    """Build the preview of a finished experiment
+
+    :param directory: the experiment directory
+    :type directory: str
+
+    :param chunk: the number of updates read at a time
+    :type chunk: int
+
+    :param throttle: (optional) a function called with the number of bytes
+                     after each chunk is read, which can sleep to limit the
+                     rate of reading
+    :type throttle: callable
+
+    :returns: the names of the fields that were previewed
+    :rtype: list
+
+    :raises FileExistsError: if the experiment already has a preview
+    :raises FileNotFoundError: if the experiment has no data
+    """
+    data = Experiment(directory)
+    if not previewed_fields(data.dtype):
+        return []
+    writer = PreviewFiles(directory, len(data))
+    try:
+        for start, rows in data.chunks(chunk):
+            writer.write(start, rows)
+            if throttle is not None:
+                throttle(rows.nbytes)
+    finally:
+        writer.close()
+    return list(Preview(directory).names)
+
+
+def previewed_fields(dtype):
+    """List the fields of a row that are given a preview
+
+    :param dtype: the data type of the rows
+    :type dtype: numpy.dtype
+
+    :returns: the field names
+    :rtype: list
+    """
+    return [name for name in dtype.names if _previewed(dtype[name].base, dtype[name].shape)]
+
+
+def _previewed(dtype, shape):
+    """Whether a field, with this type and shape in each row, is previewed"""
+    return len(shape) > 0 and shape[-1] >= MIN_SAMPLES and dtype.kind in 'iuf'
+
+
+def _pyramid(values, count):
+    """Compute the levels of the preview for a block of traces"""
+    starts = np.arange(0, values.shape[-1], FACTOR)
+    low = np.minimum.reduceat(values, starts, axis=-1)
+    high = np.maximum.reduceat(values, starts, axis=-1)
+    for _ in range(count):
+        yield np.stack([low, high], axis=-1)
+        starts = np.arange(0, low.shape[-1], FACTOR)
+        low = np.minimum.reduceat(low, starts, axis=-1)
+        high = np.maximum.reduceat(high, starts, axis=-1)
+
+
+def _bins(samples, factor):
+    return -(-samples // factor)
@@ -0,0 +1,238 @@
+"""Read PLACE experiments, whatever their layout
+
+An experiment directory can hold its data in several ways: packed into
+``data.npy``, still unpacked in ``data_XXX.npy`` files (because the
+experiment was aborted, or is still running), or in the ``columns`` or
+``compressed`` storage layouts. :class:`Experiment` opens any of them in the
+same way, without reading the data until it is used::
+
+    from place.reader import Experiment
+
+    experiment = Experiment('/path/to/experiment')
+    print(experiment.config['title'], len(experiment), experiment.names)
+    positions = experiment['LongStage-position']
+    first_rows = experiment[:10]
+    for start, rows in experiment.chunks():
+        ...
+
+Rows are returned as NumPy structured arrays, exactly as they would be read
+from ``data.npy``.
+"""
+import json
+import os
+
+import numpy as np
+
+from .storage import ColumnReader, CompressedReader
+from .utilities import row_file_number, row_files
+
+CHUNK_BYTES = 16 * 2**20
+"""The default size of the chunks given by :meth:`Experiment.chunks`"""
+
+
+class Experiment:
+    """A PLACE experiment directory, opened for reading
+
+    The data of an experiment that is still running, or that stopped early,
+    is read up to the last update that was saved. For the layouts that are
+    allocated for every update in advance, this is the last update in the
+    checkpoint, if there is one.
+    """
+
+    def __init__(self, directory):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :raises FileNotFoundError: if the directory has no ``config.json``,
+                                   or no data
+        """
+        self.directory = os.path.abspath(directory)
+        self.config = _load_json(os.path.join(self.directory, 'config.json'))
+        self.metadata = self.config.get('metadata', {})
+        try:
+            self.results = _load_json(os.path.join(self.directory, 'results.json'))
+        except FileNotFoundError:
+            self.results = None
+        self.layout, self._data = _open_data(self.directory)
+        self.dtype = self._data.dtype
+        self.names = self.dtype.names
+        self._rows = len(self._data)
+        if self.layout != 'files':
+            try:
+                checkpoint = _load_json(os.path.join(self.directory, 'checkpoint.json'))
+            except FileNotFoundError:
+                pass
+            else:
+                self._rows = min(self._rows, checkpoint['update'] + 1)
+
+    def __len__(self):
+        return self._rows
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.field(key)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            return self.rows(start, stop)[::step]
+        return self.rows(*_one(key, len(self)))[0]
+
+    def __iter__(self):
+        for _, rows in self.chunks():
+            yield from rows
+
+    def field(self, name, start=0, stop=None):
+        """Get the saved values of one field
+
+        For ``data.npy`` and the ``columns`` layout, this is memory-mapped.
+        For the other layouts, only the requested updates are read.
+
+        :param name: the field name
+        :type name: str
+
+        :param start: the first update
+        :type start: int
+
+        :param stop: the update after the last one (default: the end)
+        :type stop: int
+
+        :returns: the field, with one row per update
+        :rtype: numpy.array
+
+        :raises KeyError: if there is no such field
+        """
+        if name not in self.names:
+            raise KeyError(name)
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = min(start, stop)
+        if self.layout in ['packed', 'columns']:
+            return self._data[name][start:stop]
+        if start == 0 and stop == len(self._data):
+            return self._data[name]
+        return self._data[start:stop][name]
+
+    def rows(self, start=0, stop=None):
+        """Get a range of updates
+
+        For ``data.npy``, this is memory-mapped.
+
+        :param start: the first update
+        :type start: int
+
+        :param stop: the update after the last one (default: the end)
+        :type stop: int
+
+        :returns: the rows, as a structured array
+        :rtype: numpy.array
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = min(start, stop)
+        if self.layout == 'columns':
+            rows = np.empty(stop - start, dtype=self.dtype)
+            for name in self.names:
+                rows[name] = self._data[name][start:stop]
+            return rows
+        return self._data[start:stop]
+
+    def chunks(self, size=None, start=0):
+        """Iterate over the updates, a chunk at a time
+
+        :param size: the number of updates in each chunk (default: about
+                     16 MiB of data)
+        :type size: int
+
+        :param start: the first update
+        :type start: int
+
+        :returns: the first update of each chunk, and its rows
+        :rtype: iterator of (int, numpy.array)
+        """
+        if size is None:
+            size = max(1, CHUNK_BYTES // max(1, self.dtype.itemsize))
+        for first in range(start, len(self), size):
+            yield first, self.rows(first, first + size)
+
+    def data_files(self):
+        """List the files holding the data of the experiment
+
+        :returns: the paths of the files
+        :rtype: list
+        """
+        if self.layout in ['columns', 'compressed']:
+            subdirectory = os.path.join(self.directory, self.layout)
+            return sorted(os.path.join(subdirectory, filename)
+                          for filename in os.listdir(subdirectory))
+        if self.layout == 'files':
+            return self._data.files
+        return [os.path.join(self.directory, 'data.npy')]
+
+
+class _RowFiles:
+    """The ``data_XXX.npy`` files of an experiment, read as one array
+
+    Files are used in update order, up to the first file that is missing or
+    cannot be read (such as a file that is still being written).
+    """
+
+    def __init__(self, files):
+        self.files = []
+        self._arrays = []
+        self._starts = [0]
+        for filename in files:
+            if row_file_number(filename) != self._starts[-1]:
+                break
+            try:
+                rows = np.load(filename, mmap_mode='r')
+            except (OSError, ValueError):
+                break
+            if self._arrays and rows.dtype != self._arrays[0].dtype:
+                break
+            self.files.append(filename)
+            self._arrays.append(rows)
+            self._starts.append(self._starts[-1] + len(rows))
+        if not self._arrays:
+            raise FileNotFoundError('No readable data_000.npy in the experiment')
+        self.dtype = self._arrays[0].dtype
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return np.concatenate([rows[key] for rows in self._arrays])
+        start, stop, _ = key.indices(len(self))
+        parts = []
+        for rows, first in zip(self._arrays, self._starts):
+            if first < stop and first + len(rows) > start:
+                parts.append(rows[max(start - first, 0):stop - first])
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else self._arrays[0][:0]
+
+
+def _open_data(directory):
+    """Find and open the data, whatever the layout"""
+    if os.path.isdir(os.path.join(directory, 'columns')):
+        return 'columns', ColumnReader(directory)
+    if os.path.isdir(os.path.join(directory, 'compressed')):
+        return 'compressed', CompressedReader(directory)
+    if os.path.exists(os.path.join(directory, 'data.npy')):
+        return 'packed', np.load(os.path.join(directory, 'data.npy'), mmap_mode='r')
+    return 'files', _RowFiles(row_files(directory))
+
+
+def _load_json(filename):
+    with open(filename) as file_p:
+        return json.load(file_p)
+
+
+def _one(index, length):
+    """The range holding one update, allowing negative indices"""
+    if not -length <= index < length:
+        raise IndexError('update {} is out of range'.format(index))
+    index %= length
+    return index, index + 1
@@ -0,0 +1,980 @@
+"""Storage for the data produced during the PLACE update phase
+
+PLACE writes one row of data for each update. How those rows reach the disk
+is controlled by the ``storage`` experiment option:
+
+========== =================================================================
+Option     Meaning
+========== =================================================================
+files      *(default)* each update (or block of updates) is written to
+           its own ``data_XXX.npy`` file, and the files are packed into
+           ``data.npy`` when the experiment completes
+memmap     ``data.npy`` is created when the first row arrives, sized for
+           every update in the experiment, and each row is written directly
+           into the memory-mapped file
+columns    each field is written into its own memory-mapped file in the
+           ``columns`` directory, described by ``columns/manifest.json``;
+           no ``data.npy`` is created (see :class:`ColumnReader`)
+compressed array fields (such as traces) are compressed, one chunk per
+           update, in the ``compressed`` directory, and the other fields are
+           written to a memory-mapped file beside them; no ``data.npy`` is
+           created (see :class:`CompressedReader`)
+========== =================================================================
+
+The ``compressed`` mode uses the codec named by the ``compression``
+experiment option: ``zlib`` (the default), or ``zstd`` or ``lz4`` if the
+``zstandard`` or ``lz4`` package is installed.
+
+How often the data is forced onto the disk is controlled by the
+``durability`` experiment option:
+
+========== =================================================================
+Option     Meaning
+========== =================================================================
+none       *(default)* the data is handed to the operating system, which
+           writes it to the disk when it chooses; in ``files`` mode, when
+           updates arrive faster than once a second, rows are collected in
+           memory and written in batches at least once a second, rather
+           than one file for each update, so if PLACE itself crashes, up to
+           a second of updates can be lost
+N          every N updates, the data is written and synchronized to the
+           disk (with ``fsync``); in ``files`` mode, each batch of N rows is
+           written to one file
+update     the same as 1: every update is synchronized to the disk
+========== =================================================================
+
+The ``write`` method of each storage object returns ``True`` once every row
+written so far has been saved (and, unless the durability is ``none``,
+synchronized), which is when the experiment saves its checkpoint.
+"""
+import json
+import os
+import threading
+import zlib
+from time import monotonic
+
+import numpy as np
+
+from .pipeline import Stage
+from .utilities import build_single_file, rewrite_header, row_files, row_file_number
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+class RowFiles:
+    """Write batches of updates into their own NumPy files
+
+    Rows are collected in memory and each batch is written to a file named
+    after its first update. Unless a sync interval is set, a batch is
+    written when it reaches :attr:`buffer_bytes`, or when its first row is
+    :attr:`buffer_seconds` old, even if no more rows arrive. The first row,
+    and any row arriving :attr:`buffer_seconds` or more after the one
+    before it, is written at once, so slow experiments still write one file
+    for each update.
+    """
+
+    buffer_bytes = 2**20
+    """The largest batch, in bytes, when there is no sync interval"""
+    buffer_seconds = 1.0
+    """The longest time rows wait in memory, when there is no sync interval"""
+
+    def __init__(self, directory, total_updates, sync_every=0):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :param total_updates: the number of updates in the experiment
+        :type total_updates: int
+
+        :param sync_every: the number of updates between synchronizations,
+                           or 0 to leave this to the operating system
+        :type sync_every: int
+        """
+        self.directory = directory
+        self.total_updates = total_updates
+        self.sync_every = sync_every
+        self._pending = []
+        self._pending_rows = 0
+        self._since = None
+        self._last_write = None
+        self._lock = threading.Lock()
+        self._timer = None
+        self._error = None
+
+    def write(self, update_number, data):
+        """Write the rows for one update, or for a block of updates
+
+        :param update_number: the (first) update that produced the data
+        :type update_number: int
+
+        :param data: the row data
+        :type data: numpy.array, structured array with one row per update
+
+        :returns: ``True`` if every row has been written to a file
+        :rtype: bool
+
+        :raises OSError: if an earlier batch could not be written
+        """
+        now = monotonic()
+        with self._lock:
+            self._raise_error()
+            if not self._pending:
+                self._since = now
+            self._pending.append((update_number, data.copy()))
+            self._pending_rows += len(data)
+            if self.sync_every:
+                due = self._pending_rows >= self.sync_every
+            else:
+                due = (self._pending_rows * data.dtype.itemsize >= self.buffer_bytes
+                       or now - self._since >= self.buffer_seconds
+                       or self._last_write is None
+                       or now - self._last_write >= self.buffer_seconds)
+            self._last_write = now
+            if due:
+                self._flush()
+            elif not self.sync_every and self._timer is None:
+                self._timer = threading.Timer(self.buffer_seconds, self._flush_waiting)
+                self._timer.daemon = True
+                self._timer.start()
+        return due
+
+    def resume(self, update_number):
+        """Continue an interrupted experiment from an update
+
+        Any files written for this update, or later updates, are removed, as
+        they were not part of the last checkpoint.
+
+        :param update_number: the next update to be written
+        :type update_number: int
+        """
+        for filename in row_files(self.directory):
+            if row_file_number(filename) >= update_number:
+                os.remove(filename)
+
+    def close(self, abort=False):
+        """Write any waiting rows, and pack the rows into ``data.npy``,
+        unless the experiment was aborted
+
+        :param abort: ``True`` if the experiment is being aborted
+        :type abort: bool
+        """
+        with self._lock:
+            if self._pending:
+                self._flush()
+            self._raise_error()
+        if not abort:
+            build_single_file(self.directory)
+
+    def _flush_waiting(self):
+        """Write the rows that have waited too long (called by the timer)"""
+        with self._lock:
+            if threading.current_thread() is not self._timer:
+                return  # the batch was written before the timer could run
+            self._timer = None
+            if self._pending:
+                try:
+                    self._flush()
+                except OSError as err:
+                    self._error = err
+
+    def _raise_error(self):
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise err
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        update_number = self._pending[0][0]
+        data = np.concatenate([rows for _, rows in self._pending])
+        self._pending = []
+        self._pending_rows = 0
+        filename = '{}/data_{:03d}.npy'.format(self.directory, update_number)
+        with open(filename, 'xb') as data_file:
+            np.save(data_file, data, allow_pickle=False)
+            if self.sync_every:
+                _fsync(data_file)
+        if self.sync_every:
+            _fsync_directory(self.directory)
+
+
+class MemmapFile:
+    """Write each update directly into a memory-mapped ``data.npy``
+
+    The file is allocated for every update when the first row arrives, using
+    the data type of that row. Because the header is written first, the file
+    is a valid NumPy file at all times. If the experiment stops early, the
+    header is rewritten to describe only the rows that were written and the
+    unused space is removed from the end of the file.
+    """
+
+    def __init__(self, directory, total_updates, sync_every=0):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :param total_updates: the number of updates in the experiment
+        :type total_updates: int
+
+        :param sync_every: the number of updates between synchronizations,
+                           or 0 to leave this to the operating system
+        :type sync_every: int
+        """
+        self.filename = '{}/data.npy'.format(directory)
+        self.total_updates = total_updates
+        self.sync_every = sync_every
+        self.rows = 0
+        self._data = None
+        self._unsynced = 0
+
+    def write(self, update_number, data):
+        """Write the rows for one update, or for a block of updates
+
+        :param update_number: the (first) update that produced the data
+        :type update_number: int
+
+        :param data: the row data
+        :type data: numpy.array, structured array with one row per update
+
+        :returns: ``True`` if every row has been saved
+        :rtype: bool
+
+        :raises FileExistsError: if ``data.npy`` already exists when the first
+                                 row is written
+        """
+        if self._data is None:
+            if os.path.exists(self.filename):
+                raise FileExistsError(
+                    'Cannot create {}: file exists'.format(self.filename))
+            self._data = np.lib.format.open_memmap(
+                self.filename, mode='w+', dtype=data.dtype, shape=(self.total_updates,))
+            if self.sync_every:
+                _fsync_directory(os.path.dirname(self.filename))
+        self._data[update_number:update_number + len(data)] = data
+        self.rows = max(self.rows, update_number + len(data))
+        return self._sync(len(data))
+
+    def _sync(self, rows):
+        """Synchronize the file if it is due"""
+        if not self.sync_every:
+            return True
+        self._unsynced += rows
+        if self._unsynced < self.sync_every:
+            return False
+        self._data.flush()
+        self._unsynced = 0
+        return True
+
+    def resume(self, update_number):
+        """Continue an interrupted experiment from an update
+
+        The existing ``data.npy`` is opened for writing. If it was trimmed
+        when the experiment stopped, it is extended to hold every update
+        again.
+
+        :param update_number: the next update to be written
+        :type update_number: int
+
+        :raises RuntimeError: if the file cannot be extended
+        """
+        self.rows = update_number
+        if os.path.exists(self.filename):
+            self._data = reopen(self.filename, self.total_updates)
+
+    def close(self, abort=False):  # pylint: disable=unused-argument
+        """Flush the data and trim any rows that were not written
+
+        :param abort: ``True`` if the experiment is being aborted
+        :type abort: bool
+        """
+        if self._data is None:
+            return
+        self._data.flush()
+        self._data = None
+        if self.rows < self.total_updates:
+            resize(self.filename, self.rows)
+
+
+class ColumnFiles:
+    """Write each field into its own memory-mapped file
+
+    The files are created in the ``columns`` directory when the first row
+    arrives, each sized for every update in the experiment. A field with a
+    shape (such as a trace) is stored as a 2-D (or higher) array, with one
+    row per update. The manifest lists the name, file, type and shape of
+    each field, and the number of rows written (``null`` until the
+    experiment stops).
+    """
+
+    def __init__(self, directory, total_updates, sync_every=0):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :param total_updates: the number of updates in the experiment
+        :type total_updates: int
+
+        :param sync_every: the number of updates between synchronizations,
+                           or 0 to leave this to the operating system
+        :type sync_every: int
+        """
+        self.directory = os.path.join(directory, 'columns')
+        self.total_updates = total_updates
+        self.sync_every = sync_every
+        self.rows = 0
+        self._columns = None
+        self._fields = None
+        self._unsynced = 0
+
+    def write(self, update_number, data):
+        """Write the rows for one update, or for a block of updates
+
+        :param update_number: the (first) update that produced the data
+        :type update_number: int
+
+        :param data: the row data
+        :type data: numpy.array, structured array with one row per update
+
+        :returns: ``True`` if every row has been saved
+        :rtype: bool
+
+        :raises FileExistsError: if the ``columns`` directory already exists
+                                 when the first row is written
+        """
+        if self._columns is None:
+            self._create(data.dtype)
+        for name, column in self._columns.items():
+            column[update_number:update_number + len(data)] = data[name]
+        self.rows = max(self.rows, update_number + len(data))
+        if not self.sync_every:
+            return True
+        self._unsynced += len(data)
+        if self._unsynced < self.sync_every:
+            return False
+        for column in self._columns.values():
+            column.flush()
+        self._unsynced = 0
+        return True
+
+    def resume(self, update_number):
+        """Continue an interrupted experiment from an update
+
+        The existing column files are opened for writing, and extended if
+        they were trimmed when the experiment stopped.
+
+        :param update_number: the next update to be written
+        :type update_number: int
+
+        :raises RuntimeError: if a file cannot be extended
+        """
+        self.rows = update_number
+        try:
+            manifest = read_manifest(self.directory)
+        except FileNotFoundError:
+            return
+        self._fields = manifest['fields']
+        self._columns = {
+            field['name']: reopen(os.path.join(self.directory, field['file']),
+                                   self.total_updates)
+            for field in self._fields
+        }
+        self._write_manifest(None)
+
+    def close(self, abort=False):  # pylint: disable=unused-argument
+        """Flush the columns, trim any rows that were not written, and record
+        the number of rows in the manifest
+
+        :param abort: ``True`` if the experiment is being aborted
+        :type abort: bool
+        """
+        if self._columns is None:
+            return
+        for column in self._columns.values():
+            column.flush()
+        filenames = [column.filename for column in self._columns.values()]
+        self._columns = None
+        if self.rows < self.total_updates:
+            for filename in filenames:
+                resize(filename, self.rows)
+        self._write_manifest(self.rows)
+
+    def _create(self, dtype):
+        os.makedirs(self.directory)
+        self._columns = {}
+        self._fields = []
+        for i, name in enumerate(dtype.names):
+            field_dtype = dtype.fields[name][0]
+            filename = 'field_{:03d}.npy'.format(i)
+            self._columns[name] = np.lib.format.open_memmap(
+                os.path.join(self.directory, filename),
+                mode='w+',
+                dtype=field_dtype.base,
+                shape=(self.total_updates,) + field_dtype.shape
+            )
+            self._fields.append({
+                'name': name,
+                'file': filename,
+                'dtype': np.lib.format.dtype_to_descr(field_dtype.base),
+                'shape': list(field_dtype.shape),
+            })
+        self._write_manifest(None)
+
+    def _write_manifest(self, rows):
+        manifest = {'updates': self.total_updates, 'rows': rows, 'fields': self._fields}
+        write_json(os.path.join(self.directory, 'manifest.json'), manifest, self.sync_every)
+
+
+class ColumnReader:
+    """Read an experiment saved with the ``columns`` storage mode
+
+    The reader behaves like the structured array in ``data.npy``, but
+    nothing is read until it is used. Indexing with a field name returns a
+    read-only memory-mapped column, so a scalar column is read without
+    touching the traces, and a range of updates can be sliced from a trace
+    column without reading the rest::
+
+        data = ColumnReader('experiment')
+        times = data['PLACE-time']
+        traces = data['ATS660-trace'][100:200]
+
+    Indexing with an update number returns that update, as a dictionary of
+    field values, and iterating over the reader gives each update in turn.
+    """
+
+    def __init__(self, directory):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :raises FileNotFoundError: if the experiment has no column manifest
+        """
+        self.directory = os.path.join(directory, 'columns')
+        manifest = read_manifest(self.directory)
+        self.names = tuple(field['name'] for field in manifest['fields'])
+        self.dtype = np.dtype([
+            (field['name'], np.lib.format.descr_to_dtype(field['dtype']), tuple(field['shape']))
+            for field in manifest['fields']
+        ])
+        self._files = {field['name']: field['file'] for field in manifest['fields']}
+        self._rows = manifest['rows']
+        self._cache = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        return {name: self.column(name)[key] for name in self.names}
+
+    def __iter__(self):
+        for update_number in range(len(self)):
+            yield self[update_number]
+
+    def __len__(self):
+        if self._rows is not None:
+            return self._rows
+        return len(self.column(self.names[0]))
+
+    def __contains__(self, name):
+        return name in self._files
+
+    def column(self, name):
+        """Get one column, memory-mapped
+
+        :param name: the field name
+        :type name: str
+
+        :returns: the column, with one row per update
+        :rtype: numpy.memmap
+
+        :raises KeyError: if there is no such field
+        """
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        column = np.load(os.path.join(self.directory, self._files[name]), mmap_mode='r')
+        if self._rows is not None:
+            column = column[:self._rows]
+        self._cache[name] = column
+        return column
+
+
+class CompressedFiles:
+    """Write the array fields of each update as compressed chunks
+
+    Each array field of each update is compressed into its own chunk and
+    appended to ``chunks.bin``. Integer arrays (such as digitizer traces) are
+    stored as the differences between neighbouring samples, and the bytes of
+    every value are shuffled so that the high and low bytes are grouped
+    together, which lets the codec find far more repetition. The offset and
+    size of each chunk is kept in ``index.npy``, so any update can be read
+    without reading the others.
+
+    The compression is done on a background thread, so it does not hold up
+    the updates. The other (scalar) fields are written directly into the
+    memory-mapped ``rows.npy``.
+
+    Because the chunks are written after the update has finished, the last
+    few updates may be missing if PLACE crashes, and such an experiment
+    cannot be resumed. With a sync interval, the update loop waits for the
+    compression to catch up at each synchronization, and the checkpoint is
+    only saved then, so the experiment can always be resumed.
+    """
+
+    depth = 16
+    """The number of updates that can wait to be compressed"""
+
+    def __init__(self, directory, total_updates, sync_every=0, compression='zlib'):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :param total_updates: the number of updates in the experiment
+        :type total_updates: int
+
+        :param sync_every: the number of updates between synchronizations,
+                           or 0 to leave this to the operating system
+        :type sync_every: int
+
+        :param compression: the name of the codec
+        :type compression: str
+
+        :raises ValueError: if the codec is not available
+        """
+        self.directory = os.path.join(directory, 'compressed')
+        self.total_updates = total_updates
+        self.sync_every = sync_every
+        self.compression = compression
+        self._compress = _codec(compression)[0]
+        self.rows = 0
+        self._manifest = None
+        self._rows = None
+        self._index = None
+        self._chunks = None
+        self._stage = None
+        self._unsynced = 0
+
+    def write(self, update_number, data):
+        """Write the rows for one update, or for a block of updates
+
+        :param update_number: the (first) update that produced the data
+        :type update_number: int
+
+        :param data: the row data
+        :type data: numpy.array, structured array with one row per update
+
+        :returns: ``True`` if every row has been saved, or (with no sync
+                  interval) queued to be saved
+        :rtype: bool
+
+        :raises FileExistsError: if the ``compressed`` directory already
+                                 exists when the first row is written
+        """
+        if self._manifest is None:
+            self._create(data.dtype)
+        scalars = self._manifest['scalars']
+        if scalars:
+            self._rows[update_number:update_number + len(data)] = data[scalars]
+        arrays = {field['name']: data[field['name']].copy()
+                  for field in self._manifest['arrays']}
+        self._stage.put(update_number, arrays)
+        self.rows = max(self.rows, update_number + len(data))
+        if not self.sync_every:
+            return True
+        self._unsynced += len(data)
+        if self._unsynced < self.sync_every:
+            return False
+        self._stage.wait()
+        _fsync(self._chunks)
+        self._index.flush()
+        if self._rows is not None:
+            self._rows.flush()
+        self._unsynced = 0
+        return True
+
+    def resume(self, update_number):
+        """Continue an interrupted experiment from an update
+
+        The chunks for this update, and later updates, are removed.
+
+        :param update_number: the next update to be written
+        :type update_number: int
+
+        :raises RuntimeError: if an earlier update is missing, or a file
+                              cannot be extended
+        """
+        self.rows = update_number
+        try:
+            self._manifest = read_manifest(self.directory)
+        except FileNotFoundError:
+            return
+        self._index = reopen(os.path.join(self.directory, 'index.npy'), self.total_updates)
+        missing = np.flatnonzero((self._index[:update_number, :, 1] == 0).any(axis=1))
+        if missing.size:
+            raise RuntimeError('Cannot resume: update {} was not saved in {}'.format(
+                missing[0], self.directory))
+        self._index[update_number:] = 0
+        end = int((self._index[:update_number, :, 0] + self._index[:update_number, :, 1]).max(
+            initial=0))
+        if self._manifest['scalars']:
+            self._rows = reopen(os.path.join(self.directory, 'rows.npy'), self.total_updates)
+        self._chunks = open(os.path.join(self.directory, 'chunks.bin'), 'r+b')
+        self._chunks.truncate(end)
+        self._chunks.seek(end)
+        self._stage = Stage(self._write_chunks, self.depth)
+        self._write_manifest(None)
+
+    def close(self, abort=False):  # pylint: disable=unused-argument
+        """Finish compressing, trim any rows that were not written, and
+        record the number of rows in the manifest
+
+        :param abort: ``True`` if the experiment is being aborted
+        :type abort: bool
+        """
+        if self._manifest is None:
+            return
+        try:
+            if self._stage is not None:
+                self._stage.join()
+        finally:
+            self._stage = None
+            self._chunks.close()
+            filenames = [os.path.join(self.directory, 'index.npy')]
+            self._index.flush()
+            self._index = None
+            if self._rows is not None:
+                self._rows.flush()
+                self._rows = None
+                filenames.append(os.path.join(self.directory, 'rows.npy'))
+            if self.rows < self.total_updates:
+                for filename in filenames:
+                    resize(filename, self.rows)
+            self._write_manifest(self.rows)
+
+    def _create(self, dtype):
+        os.makedirs(self.directory)
+        scalars = [name for name in dtype.names if not dtype.fields[name][0].shape]
+        arrays = [name for name in dtype.names if dtype.fields[name][0].shape]
+        self._manifest = {
+            'updates': self.total_updates,
+            'rows': None,
+            'compression': self.compression,
+            'dtype': np.lib.format.dtype_to_descr(dtype),
+            'scalars': scalars,
+            'arrays': [{'name': name, 'delta': dtype.fields[name][0].base.kind in 'iu'}
+                       for name in arrays],
+        }
+        if scalars:
+            self._rows = np.lib.format.open_memmap(
+                os.path.join(self.directory, 'rows.npy'),
+                mode='w+',
+                dtype=_scalar_dtype(dtype, scalars),
+                shape=(self.total_updates,)
+            )
+        self._index = np.lib.format.open_memmap(
+            os.path.join(self.directory, 'index.npy'),
+            mode='w+',
+            dtype='<i8',
+            shape=(self.total_updates, len(arrays), 2)
+        )
+        self._chunks = open(os.path.join(self.directory, 'chunks.bin'), 'xb')
+        self._stage = Stage(self._write_chunks, self.depth)
+        self._write_manifest(None)
+        if self.sync_every:
+            _fsync_directory(self.directory)
+
+    def _write_chunks(self, update_number, arrays):
+        """Compress and append the array fields (runs on the stage thread)"""
+        for row in range(len(next(iter(arrays.values()), ()))):
+            for i, field in enumerate(self._manifest['arrays']):
+                chunk = self._compress(_encode(arrays[field['name']][row], field['delta']))
+                self._index[update_number + row, i] = (self._chunks.tell(), len(chunk))
+                self._chunks.write(chunk)
+
+    def _write_manifest(self, rows):
+        self._manifest['rows'] = rows
+        write_json(os.path.join(self.directory, 'manifest.json'), self._manifest,
+                    self.sync_every)
+
+
+class CompressedReader:
+    """Read an experiment saved with the ``compressed`` storage mode
+
+    Indexing the reader works like indexing the structured array in
+    ``data.npy``: an update number gives one row, a slice gives a structured
+    array, and a field name gives the whole column. Only the chunks that are
+    needed are decompressed::
+
+        data = CompressedReader('experiment')
+        trace = data[100]['ATS660-trace']
+        times = data['PLACE-time']
+        everything = np.asarray(data)
+    """
+
+    def __init__(self, directory):
+        """Constructor
+
+        :param directory: the experiment directory
+        :type directory: str
+
+        :raises FileNotFoundError: if the experiment has no compressed data
+        :raises ValueError: if the codec is not available
+        """
+        self.directory = os.path.join(directory, 'compressed')
+        manifest = read_manifest(self.directory)
+        self.dtype = np.lib.format.descr_to_dtype(
+            [tuple(field) for field in manifest['dtype']])
+        self.names = self.dtype.names
+        self._scalars = manifest['scalars']
+        self._arrays = manifest['arrays']
+        self._decompress = _codec(manifest['compression'])[1]
+        self._index = np.load(os.path.join(self.directory, 'index.npy'), mmap_mode='r')
+        self._rows = None
+        if self._scalars:
+            self._rows = np.load(os.path.join(self.directory, 'rows.npy'), mmap_mode='r')
+        if manifest['rows'] is not None:
+            self._index = self._index[:manifest['rows']]
+            if self._rows is not None:
+                self._rows = self._rows[:manifest['rows']]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, slice):
+            return self._read(range(len(self))[key])
+        return self._read([range(len(self))[key]])[0]
+
+    def __iter__(self):
+        for update_number in range(len(self)):
+            yield self[update_number]
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __array__(self, dtype=None):
+        data = self[:]
+        return data if dtype is None else data.astype(dtype)
+
+    def column(self, name):
+        """Get one column
+
+        Scalar fields are memory-mapped; array fields are decompressed.
+
+        :param name: the field name
+        :type name: str
+
+        :returns: the column, with one row per update
+        :rtype: numpy.array
+
+        :raises KeyError: if there is no such field
+        """
+        if name in self._scalars:
+            return self._rows[name]
+        field_dtype = self.dtype.fields[name][0]
+        i = [field['name'] for field in self._arrays].index(name)
+        column = np.empty((len(self),) + field_dtype.shape, dtype=field_dtype.base)
+        with open(os.path.join(self.directory, 'chunks.bin'), 'rb') as chunks:
+            for row in range(len(self)):
+                column[row] = self._chunk(chunks, row, i, field_dtype)
+        return column
+
+    def _read(self, updates):
+        data = np.zeros(len(updates), dtype=self.dtype)
+        for name in self._scalars:
+            data[name] = self._rows[name][list(updates)]
+        with open(os.path.join(self.directory, 'chunks.bin'), 'rb') as chunks:
+            for row, update_number in enumerate(updates):
+                for i, field in enumerate(self._arrays):
+                    data[field['name']][row] = self._chunk(
+                        chunks, update_number, i, self.dtype.fields[field['name']][0])
+        return data
+
+    def _chunk(self, chunks, update_number, i, field_dtype):
+        offset, size = self._index[update_number, i]
+        if size == 0:
+            raise RuntimeError('update {} was not saved in {}'.format(
+                update_number, self.directory))
+        chunks.seek(offset)
+        return _decode(self._decompress(chunks.read(size)), field_dtype,
+                       self._arrays[i]['delta'])
+
+
+def _codec(name):
+    """Get the compress and decompress functions for a codec"""
+    if name == 'zlib':
+        return lambda data: zlib.compress(data, 1), zlib.decompress
+    if name == 'zstd' and zstandard is not None:
+        return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+    if name == 'lz4' and lz4 is not None:
+        return lz4.frame.compress, lz4.frame.decompress
+    raise ValueError('compression codec not available: {}'.format(name))
+
+
+def _encode(array, delta):
+    """Delta-encode (integers only) and byte-shuffle an array"""
+    values = np.ascontiguousarray(array).reshape(-1)
+    if delta:
+        values = np.diff(values, prepend=values.dtype.type(0)).astype(values.dtype, copy=False)
+    return values.view(np.uint8).reshape(-1, values.dtype.itemsize).T.tobytes()
+
+
+def _decode(chunk, field_dtype, delta):
+    """Reverse :func:`_encode`"""
+    base = field_dtype.base
+    values = np.frombuffer(chunk, dtype=np.uint8).reshape(base.itemsize, -1).T.copy()
+    values = values.view(base).reshape(-1)
+    if delta:
+        values = np.cumsum(values, dtype=base)
+    return values.reshape(field_dtype.shape)
+
+
+def _scalar_dtype(dtype, names):
+    return np.dtype([(name, dtype.fields[name][0]) for name in names])
+
+
+def sync_interval(durability):
+    """Get the number of updates between synchronizations for a durability
+    setting
+
+    :param durability: ``none``, ``update``, or a number of updates
+    :type durability: str or int
+
+    :returns: the number of updates, or 0 to leave this to the operating
+              system
+    :rtype: int
+
+    :raises ValueError: if the setting is not valid
+    """
+    if durability == 'none':
+        return 0
+    if durability == 'update':
+        return 1
+    try:
+        updates = int(durability)
+    except ValueError:
+        updates = 0
+    if updates < 1:
+        raise ValueError('durability must be none, update or a number of updates: {}'.format(
+            durability))
+    return updates
+
+
+def write_json(filename, value, sync=False):
+    """Replace a JSON file, so that it is never partially written"""
+    with open(filename + '.tmp', 'w') as json_file:
+        json.dump(value, json_file, indent=2)
+        if sync:
+            _fsync(json_file)
+    os.replace(filename + '.tmp', filename)
+    if sync:
+        _fsync_directory(os.path.dirname(filename))
+
+
+def _fsync(file_p):
+    file_p.flush()
+    os.fsync(file_p.fileno())
+
+
+def _fsync_directory(directory):
+    """Make the creation (or renaming) of files in a directory durable"""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # directories cannot be opened on Windows
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def read_manifest(directory):
+    """Read the ``manifest.json`` file of a data directory"""
+    with open(os.path.join(directory, 'manifest.json')) as manifest_file:
+        return json.load(manifest_file)
+
+
+def reopen(filename, rows):
+    """Open a NumPy file for writing, extending it to ``rows`` if needed"""
+    if len(np.load(filename, mmap_mode='r')) < rows and not resize(filename, rows):
+        raise RuntimeError('Cannot extend {} for the remaining updates'.format(filename))
+    return np.lib.format.open_memmap(filename, mode='r+')
+
+
+def resize(filename, rows):
+    """Change the number of rows in a NumPy file, in place
+
+    The header is rewritten and the file is truncated (or extended with
+    zeros) to match.
+
+    :returns: ``False`` if the new header does not fit, and the file was not
+              changed
+    :rtype: bool
+    """
+    data = np.load(filename, mmap_mode='r')
+    shape = (rows,) + data.shape[1:]
+    size = data.offset + int(np.prod(shape)) * data.dtype.itemsize
+    del data
+    if not rewrite_header(filename, shape=shape):
+        return False
+    with open(filename, 'r+b') as data_file:
+        data_file.truncate(size)
+    return True
+
+
+STORAGE = {
+    'files': RowFiles,
+    'memmap': MemmapFile,
+    'columns': ColumnFiles,
+    'compressed': CompressedFiles,
+}
+
+
+def open_storage(mode, directory, total_updates, compression='zlib', durability='none'):
+    """Create the storage object for an experiment
+
+    :param mode: the name of the storage mode
+    :type mode: str
+
+    :param directory: the experiment directory
+    :type directory: str
+
+    :param total_updates: the number of updates in the experiment
+    :type total_updates: int
+
+    :param compression: the codec for the ``compressed`` mode
+    :type compression: str
+
+    :param durability: ``none``, ``update``, or the number of updates
+                       between synchronizations
+    :type durability: str or int
+
+    :returns: an object with ``write(update_number, data)``,
+              ``resume(update_number)`` and ``close(abort)`` methods
+    :rtype: RowFiles, MemmapFile, ColumnFiles or CompressedFiles
+
+    :raises ValueError: if the storage mode, codec or durability is not
+                        known
+    """
+    try:
+        class_ = STORAGE[mode]
+    except KeyError:
+        raise ValueError('unknown storage mode: {}'.format(mode))
+    sync_every = sync_interval(durability)
+    if class_ is CompressedFiles:
+        return class_(directory, total_updates, sync_every, compression)
+    return class_(directory, total_updates, sync_every)
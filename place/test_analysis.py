@@ -0,0 +1,123 @@
+"""Tests for reductions over experiments"""
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from place.analysis import reduce, stack
+from place.reader import Experiment
+from place.storage import open_storage
+
+ROW = np.dtype([('position', 'float64'), ('trace', 'int16', (4, 8)), ('power', 'float32'),
+                ('label', 'S8')])
+
+
+class TestReductions(TestCase):
+    """Test reductions against the same reductions in NumPy"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+        self.random = np.random.RandomState(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _experiment(self, name, updates, mode='memmap'):
+        """Save an experiment of random traces at three stage positions"""
+        data = np.zeros(updates, dtype=ROW)
+        data['position'] = np.arange(updates) % 3 + self.random.uniform(-0.01, 0.01, updates)
+        data['trace'] = self.random.randint(-1000, 1000, (updates, 4, 8))
+        data['power'] = self.random.normal(size=updates)
+        data['label'] = b'update'
+        directory = os.path.join(self.directory, name)
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'config.json'), 'w') as config_file:
+            json.dump({'title': name, 'updates': updates}, config_file)
+        storage = open_storage(mode, directory, updates)
+        storage.write(0, data)
+        storage.close()
+        return directory, data
+
+    def test0001_reduce(self):
+        """Each operation matches NumPy, for any chunk size and workers"""
+        expected = {
+            'mean': lambda values: values.mean(axis=0),
+            'sum': lambda values: values.sum(axis=0),
+            'rms': lambda values: np.sqrt((values * values).mean(axis=0)),
+        }
+        for mode in ['memmap', 'columns', 'compressed']:
+            directory, data = self._experiment(mode, 50, mode)
+            for operation, func in expected.items():
+                for chunk, workers in [(None, 1), (7, 1), (7, 3)]:
+                    with self.subTest(mode=mode, operation=operation, chunk=chunk,
+                                      workers=workers):
+                        result = reduce(directory, ['trace', 'power'], operation,
+                                        chunk=chunk, workers=workers)
+                        self.assertEqual(len(result), 1)
+                        self.assertEqual(result['count'][0], 50)
+                        for name in ['trace', 'power']:
+                            np.testing.assert_allclose(
+                                result[name][0], func(data[name].astype(np.float64)))
+
+    def test0002_by(self):
+        """Updates are reduced separately for each rounded position"""
+        directory, data = self._experiment('by', 50)
+        result = reduce(directory, 'trace', 'mean', by='position', decimals=1, chunk=4,
+                        workers=2)
+        np.testing.assert_array_equal(result['position'], [0.0, 1.0, 2.0])
+        positions = np.round(data['position'])
+        for row, position in zip(result, [0.0, 1.0, 2.0]):
+            selected = data['trace'][positions == position]
+            self.assertEqual(row['count'], len(selected))
+            np.testing.assert_allclose(row['trace'], selected.mean(axis=0))
+
+    def test0003_output(self):
+        """The result is saved as an experiment of its own"""
+        directory, data = self._experiment('source', 20)
+        output = os.path.join(self.directory, 'output')
+        result = reduce(directory, 'power', 'sum', by='position', decimals=0, output=output)
+        saved = Experiment(output)
+        self.assertEqual(saved.config['title'], 'source (sum)')
+        self.assertEqual(saved.metadata['analysis']['sources'], [directory])
+        np.testing.assert_array_equal(saved[:], result)
+        self.assertAlmostEqual(result['power'].sum(), data['power'].astype(np.float64).sum())
+        with self.assertRaises(FileExistsError):
+            reduce(directory, 'power', output=output)
+
+    def test0004_stack(self):
+        """Repeated experiments are averaged update by update"""
+        runs = [self._experiment('run{}'.format(i), updates) for i, updates in
+                enumerate([30, 25, 40])]
+        output = os.path.join(self.directory, 'stacked')
+        for chunk, destination in [(None, None), (6, output)]:
+            with self.subTest(chunk=chunk, output=destination):
+                result = stack([directory for directory, _ in runs], ['trace', 'power'],
+                               chunk=chunk, workers=2, output=destination)
+                self.assertEqual(len(result), 25)
+                for name in ['trace', 'power']:
+                    np.testing.assert_allclose(
+                        result[name],
+                        np.mean([data[name][:25].astype(np.float64) for _, data in runs],
+                                axis=0))
+                np.testing.assert_array_equal(result['position'], runs[0][1]['position'][:25])
+                np.testing.assert_array_equal(result['label'], runs[0][1]['label'][:25])
+        np.testing.assert_array_equal(Experiment(output)[:], result)
+
+    def test0005_errors(self):
+        """Reductions that cannot be done are refused"""
+        directory, _ = self._experiment('errors', 10)
+        with self.assertRaises(ValueError):
+            reduce(directory, 'trace', 'median')
+        with self.assertRaises(KeyError):
+            reduce(directory, 'time')
+        with self.assertRaises(KeyError):
+            reduce(directory, 'trace', by='time')
+        with self.assertRaises(ValueError):
+            reduce(directory, 'label')
+        with self.assertRaises(ValueError):
+            reduce(directory, 'power', by='trace')
+        with self.assertRaises(ValueError):
+            stack([], 'trace')
@@ -0,0 +1,375 @@
+"""Tests for running experiments"""
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from place.basic_experiment import BasicExperiment, _parallel_groups
+from place.plugins.instrument import AbortExperiment, Instrument
+from place.reader import Experiment
+from placeweb.worker import _saved_config
+
+
+def _synthetic(priority, parallel_group=None):
+    """The configuration of a plotting synthetic instrument"""
+    plugin = {
+        'metadata': {
+            'python_module_name': 'place_demo',
+            'python_class_name': 'SyntheticDemo',
+        },
+        'priority': priority,
+        'config': {'number_of_points': 16, 'plot': True},
+    }
+    if parallel_group is not None:
+        plugin['parallel_group'] = parallel_group
+    return plugin
+
+
+class TestPlotThrottling(TestCase):
+    """Test that plots are throttled in every kind of update"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _count_plots(self, plugins):
+        """Run 50 updates, plotting every 10th, and count the plots sent"""
+        config = {
+            'title': 'plot throttling', 'comments': '', 'updates': 50,
+            'directory': self.directory + '/experiment', 'plugins': plugins,
+            'storage': 'files', 'pipeline_depth': 0, 'batch_size': 1,
+            'parallel_updates': False, 'profile': False,
+        }
+        experiment = BasicExperiment(config)
+        sent = {}
+        for name, plotter in experiment._plotters.items():  # pylint: disable=protected-access
+            plotter.every = 10
+            plotter.interval = 0
+            plotter.mark = lambda title, name=name: sent.update({name: sent.get(name, 0) + 1})
+        experiment.run()
+        return sent
+
+    def test0001_sequential(self):
+        """Every 10th update, and the last, is plotted"""
+        self.assertEqual(self._count_plots({'Synth': _synthetic(10)}), {'Synth': 6})
+
+    def test0002_parallel_group(self):
+        """Instruments updated together are throttled in the same way"""
+        sent = self._count_plots({'Synth0': _synthetic(10, 'cards'),
+                                  'Synth1': _synthetic(10, 'cards')})
+        self.assertEqual(sent, {'Synth0': 6, 'Synth1': 6})
+
+
+class TestParallelGroups(TestCase):
+    """Test configuring and updating instruments together"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _experiment(self, parallel_group):
+        config = {
+            'title': 'parallel groups', 'comments': '', 'updates': 2,
+            'directory': self.directory + '/experiment',
+            'plugins': {'Synth{}'.format(number): _synthetic(10, parallel_group)
+                        for number in range(3)},
+            'storage': 'files', 'pipeline_depth': 0, 'batch_size': 1,
+            'parallel_updates': False, 'profile': False,
+        }
+        for plugin in config['plugins'].values():
+            plugin['config']['plot'] = False
+        return BasicExperiment(config)
+
+    def _metadata(self, parallel_group):
+        """Configure three instruments, each adding to the metadata"""
+        experiment = self._experiment(parallel_group)
+        for plugin in experiment.plugins:
+            def _config(metadata, total_updates, plugin=plugin, original=plugin.config):
+                original(metadata, total_updates)
+                metadata[plugin.elm_module_name] = total_updates
+                metadata['last'] = plugin.elm_module_name
+            plugin.config = _config
+        experiment.config_phase()
+        shutil.rmtree(experiment.config['directory'])
+        metadata = dict(experiment.config['metadata'])
+        del metadata['timestamp']
+        return metadata
+
+    def test0001_metadata(self):
+        """The metadata of a group is merged as if configured in turn"""
+        metadata = self._metadata('cards')
+        self.assertEqual(metadata, self._metadata(None))
+        self.assertEqual(metadata['last'], 'Synth2')
+        self.assertEqual([metadata['Synth{}'.format(number)] for number in range(3)],
+                         [2, 2, 2])
+
+    def test0002_errors(self):
+        """The errors of a group are raised as one, and an abort comes first"""
+        experiment = self._experiment('cards')
+        group = experiment.plugins
+
+        def _run(errors):
+            def _func(plugin):
+                if plugin.elm_module_name in errors:
+                    raise errors[plugin.elm_module_name]
+                return plugin.elm_module_name
+            return experiment._run_together(group, _func)  # pylint: disable=protected-access
+
+        self.assertEqual(_run({}), ['Synth0', 'Synth1', 'Synth2'])
+        with self.assertRaisesRegex(ValueError, '^one$'):
+            _run({'Synth1': ValueError('one')})
+        with self.assertRaises(RuntimeError) as raised:
+            _run({'Synth0': ValueError('one'), 'Synth2': OSError('two')})
+        self.assertEqual(str(raised.exception), 'Synth0: one; Synth2: two')
+        with self.assertRaises(AbortExperiment):
+            _run({'Synth0': ValueError('one'), 'Synth1': AbortExperiment(),
+                  'Synth2': OSError('two')})
+
+
+class TestDeclaredFields(TestCase):
+    """Test writing declared fields in place, next to merged data"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _update(self, declared, parallel_group):
+        """Run one update of three instruments, only some declaring fields
+
+        :returns: the new row, the finished row, and the rows given to the
+                  declared instruments
+        """
+        config = {
+            'title': 'declared fields', 'comments': '', 'updates': 1,
+            'directory': '{}/{}-{}'.format(self.directory, ''.join(declared), parallel_group),
+            'plugins': {'Synth{}'.format(number): _synthetic(10, parallel_group)
+                        for number in range(3)},
+            'storage': 'files', 'pipeline_depth': 0, 'batch_size': 1,
+            'parallel_updates': False, 'profile': False,
+        }
+        experiment = BasicExperiment(config)
+        rows = {}
+        for plugin in experiment.plugins:
+            plugin.plotter.every = 0
+            name = plugin.elm_module_name
+            if name in declared:
+                def _update(update_number, progress, row=None, name=name,
+                            original=plugin.update):
+                    rows[name] = row
+                    return original(update_number, progress, row=row)
+                plugin.update = _update
+            else:
+                plugin.fields = lambda: None
+        experiment.config_phase()
+        for plugin in experiment.plugins:
+            if plugin.elm_module_name not in declared:
+                del plugin.fields
+        data = experiment._new_row()  # pylint: disable=protected-access
+        groups = _parallel_groups(experiment.plugins, False)
+        result = experiment._run_plugins(groups, 0, data)  # pylint: disable=protected-access
+        return data, result, rows
+
+    def test0001_in_place(self):
+        """Declared fields are written into the row, giving the merged result"""
+        _, expected, _ = self._update([], None)
+        for declared in [['Synth0', 'Synth2'], ['Synth1'], ['Synth0', 'Synth1', 'Synth2']]:
+            for parallel_group in [None, 'cards']:
+                with self.subTest(declared=declared, parallel_group=parallel_group):
+                    data, result, rows = self._update(declared, parallel_group)
+                    self.assertEqual(sorted(result.dtype.names), sorted(expected.dtype.names))
+                    for name in expected.dtype.names[1:]:
+                        np.testing.assert_array_equal(result[name], expected[name])
+                    self.assertEqual(sorted(rows), declared)
+                    for row in rows.values():
+                        self.assertIsNotNone(row.base)
+                        for name in row.dtype.names:
+                            np.testing.assert_array_equal(row[name], result[name])
+                    if len(declared) == 3:
+                        self.assertIs(result, data)
+
+
+class TestTimings(TestCase):
+    """Test the timings and profiles recorded while running"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _run(self, profile):
+        config = {
+            'title': 'timings', 'comments': '', 'updates': 10,
+            'directory': '{}/{}'.format(self.directory, profile),
+            'plugins': {'Synth': _synthetic(10)},
+            'storage': 'memmap', 'durability': 'none', 'preview': True,
+            'pipeline_depth': 0, 'batch_size': 1, 'parallel_updates': False,
+            'profile': profile,
+        }
+        experiment = BasicExperiment(config)
+        for plotter in experiment._plotters.values():  # pylint: disable=protected-access
+            plotter.every = 1
+            plotter.interval = 0
+        experiment.run()
+        return experiment
+
+    def test0001_timings(self):
+        """Each phase, plot and write is counted, in the progress and results"""
+        experiment = self._run(False)
+        with open(experiment.config['directory'] + '/results.json') as results_file:
+            saved = json.load(results_file)['timings']
+        for timings in [experiment.progress.to_dict()['timings'], saved]:
+            counts = {source: {step: stats['count'] for step, stats in steps.items()}
+                      for source, steps in timings.items()}
+            self.assertEqual(counts['Synth'],
+                             {'config': 1, 'update': 10, 'plot': 10, 'cleanup': 1})
+            for step, count in [('update', 10), ('storage', 10), ('preview', 10),
+                                ('close storage', 1)]:
+                self.assertEqual(counts['PLACE'][step], count)
+            stats = timings['PLACE']['storage']
+            self.assertEqual(sorted(stats), ['count', 'max', 'mean', 'p50', 'p95'])
+            self.assertLessEqual(stats['p50'], stats['max'])
+        self.assertFalse([filename for filename in os.listdir(experiment.config['directory'])
+                          if filename.startswith('profile_')])
+
+    def test0002_profile(self):
+        """Each phase is profiled into its own file"""
+        directory = self._run(True).config['directory']
+        for phase in ['config', 'update', 'cleanup']:
+            with self.subTest(phase=phase):
+                stats = pstats.Stats('{}/profile_{}.prof'.format(directory, phase))
+                self.assertGreater(stats.total_calls, 0)
+        self.assertFalse(os.path.exists(directory + '/profile_abort.prof'))
+
+
+class TestCheckpoint(TestCase):
+    """Test saving checkpoints and resuming experiments"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _experiment(self, storage, durability='none'):
+        config = {
+            'title': 'checkpoint', 'comments': '', 'updates': 50,
+            'directory': self.directory + '/experiment',
+            'plugins': {'Synth': _synthetic(10)},
+            'storage': storage, 'durability': durability, 'pipeline_depth': 0,
+            'batch_size': 1, 'parallel_updates': False, 'profile': False,
+            'checkpoint_interval': 1000.0,
+        }
+        config['plugins']['Synth']['config']['plot'] = False
+        return BasicExperiment(config)
+
+    def _run_until(self, experiment, last, error):
+        """Run an experiment, raising an error after saving an update"""
+        write = experiment._write  # pylint: disable=protected-access
+
+        def _write(update_number, data):
+            saved = write(update_number, data)
+            if update_number == last:
+                raise error
+            return saved
+        experiment._write = _write  # pylint: disable=protected-access
+        experiment.run()
+
+    def _checkpoint(self):
+        with open(self.directory + '/experiment/checkpoint.json') as checkpoint_file:
+            return json.load(checkpoint_file)['update']
+
+    def test0001_interval(self):
+        """The checkpoint is not written again within the interval"""
+        experiment = self._experiment('memmap')
+        with self.assertRaises(OSError):
+            self._run_until(experiment, 29, OSError('disk'))
+        self.assertEqual(self._checkpoint(), 0)
+
+    def test0002_synchronized(self):
+        """Synchronized data is always checkpointed"""
+        experiment = self._experiment('memmap', durability='10')
+        with self.assertRaises(OSError):
+            self._run_until(experiment, 34, OSError('disk'))
+        self.assertEqual(self._checkpoint(), 29)
+
+    def test0003_abort_and_resume(self):
+        """The last saved update is checkpointed on abort, and resumed"""
+        for storage in ['files', 'memmap', 'columns']:
+            with self.subTest(storage=storage):
+                experiment = self._experiment(storage)
+                original = experiment._write  # pylint: disable=protected-access
+
+                def _write(update_number, data, experiment=experiment, original=original):
+                    saved = original(update_number, data)
+                    if update_number == 29:
+                        experiment.abort_event.set()
+                    return saved
+                experiment._write = _write  # pylint: disable=protected-access
+                experiment.run()
+                self.assertEqual(self._checkpoint(), 29)
+                directory = experiment.config['directory']
+                BasicExperiment(_saved_config(directory), resume=True).run()
+                counts = Experiment(directory)['Synth-count']
+                np.testing.assert_array_equal(counts, np.arange(1, 51))
+                shutil.rmtree(directory)
+
+    def test0004_pipelined_abort(self):
+        """Updates waiting to be saved are saved when a pipelined run is aborted"""
+        experiment = self._experiment('memmap')
+        experiment.config['pipeline_depth'] = 4
+        run_plugins = experiment._run_plugins  # pylint: disable=protected-access
+        write = experiment._write  # pylint: disable=protected-access
+
+        def _run_plugins(groups, update_number, data):
+            data = run_plugins(groups, update_number, data)
+            if groups and update_number == 29:
+                experiment.abort_event.set()
+            return data
+
+        def _write(update_number, data):
+            time.sleep(0.01)
+            return write(update_number, data)
+        experiment._run_plugins = _run_plugins  # pylint: disable=protected-access
+        experiment._write = _write  # pylint: disable=protected-access
+        experiment.run()
+        self.assertEqual(self._checkpoint(), 29)
+        directory = experiment.config['directory']
+        BasicExperiment(_saved_config(directory), resume=True).run()
+        np.testing.assert_array_equal(Experiment(directory)['Synth-count'], np.arange(1, 51))
+
+
+class TestWait(TestCase):
+    """Test that instruments stop waiting when an experiment is aborted"""
+
+    def test0001_sleep(self):
+        """Without an abort event, the instrument sleeps"""
+        instrument = Instrument({}, None)
+        start = time.time()
+        instrument.wait(0.05)
+        self.assertGreaterEqual(time.time() - start, 0.05)
+
+    def test0002_abort(self):
+        """Setting the abort event interrupts a long wait"""
+        instrument = Instrument({}, None)
+        instrument.abort_event = threading.Event()
+        instrument.wait(0.01)
+        threading.Timer(0.1, instrument.abort_event.set).start()
+        start = time.time()
+        with self.assertRaises(AbortExperiment):
+            instrument.wait(60)
+        self.assertLess(time.time() - start, 10)
+        with self.assertRaises(AbortExperiment):
+            instrument.wait(0)
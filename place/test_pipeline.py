@@ -0,0 +1,77 @@
+"""Tests for the background stage of pipelined updates"""
+import threading
+from unittest import TestCase
+
+from place.pipeline import Stage
+
+
+class TestStage(TestCase):
+    """Test processing items on a background thread"""
+
+    def setUp(self):
+        self.processed = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def _target(self, number):
+        self.release.wait()
+        if number < 0:
+            raise ValueError(number)
+        self.processed.append(number)
+
+    def test0001_order(self):
+        """Items are processed in the order they are queued"""
+        stage = Stage(self._target, 2)
+        for number in range(20):
+            stage.put(number)
+        stage.wait()
+        self.assertEqual(self.processed, list(range(20)))
+        stage.put(20)
+        stage.join()
+        self.assertEqual(self.processed, list(range(21)))
+
+    def test0002_error(self):
+        """An error in the target is raised again by the next call"""
+        for finish in ['put', 'wait', 'join']:
+            with self.subTest(finish=finish):
+                stage = Stage(self._target, 1)
+                stage.put(-1)
+                with self.assertRaises(ValueError):
+                    if finish == 'put':
+                        for number in range(10):
+                            stage.put(number)
+                    else:
+                        getattr(stage, finish)()
+                stage.stop()
+                self.assertEqual(self.processed, [])
+
+    def test0003_stop(self):
+        """Stopping discards the items that are waiting"""
+        self.release.clear()
+        stage = Stage(self._target, 4)
+        for number in range(4):
+            stage.put(number)
+        threading.Timer(0.2, self.release.set).start()
+        stage.stop()
+        self.assertLess(len(self.processed), 4)
+        self.assertEqual(self.processed, list(range(len(self.processed))))
+
+    def test0004_drain(self):
+        """Draining processes the items that are waiting"""
+        self.release.clear()
+        stage = Stage(self._target, 4)
+        for number in range(4):
+            stage.put(number)
+        threading.Timer(0.2, self.release.set).start()
+        stage.stop(drain=True)
+        self.assertEqual(self.processed, [0, 1, 2, 3])
+
+    def test0005_drain_after_error(self):
+        """Draining a failed stage returns, without raising the error"""
+        stage = Stage(self._target, 1)
+        stage.put(-1)
+        with self.assertRaises(ValueError):
+            for number in range(10):
+                stage.put(number)
+        stage.stop(drain=True)
+        self.assertEqual(self.processed, [])
@@ -0,0 +1,281 @@
+"""Tests for the PLACE plotter"""
+import io
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.image import imread
+
+from place.plots import (DATA_POINT_LIMIT, PlacePlotter, WigglePlot, _budgets, _data, _downsample,
+                         _values, wait_for_plots)
+from place.preview import PreviewFiles
+
+
+class TestThrottling(TestCase):
+    """Test which plots are sent"""
+
+    def setUp(self):
+        self.progress = {}
+        self.plotter = PlacePlotter(self.progress, 'test_plots')
+        self.plotter.interval = 0
+        self.plotter.every = 1
+
+    def test0001_every_nth_update(self):
+        """Only every nth update, and the last, is plotted"""
+        self.plotter.every = 10
+        sent = []
+        for update_number in range(25):
+            self.plotter.start_update(update_number, 1, 25)
+            if self.plotter.due('trace'):
+                sent.append(update_number)
+        self.assertEqual(sent, [0, 10, 20, 24])
+
+    def test0002_blocks(self):
+        """A block of updates is plotted if it holds an nth update"""
+        self.plotter.every = 10
+        sent = []
+        for update_number in range(0, 40, 4):
+            self.plotter.start_update(update_number, 4, 100)
+            if self.plotter.due('trace'):
+                sent.append(update_number)
+        self.assertEqual(sent, [0, 8, 20, 28])
+
+    def test0003_interval(self):
+        """A figure is not sent again within the interval"""
+        self.plotter.interval = 60
+        self.plotter.start_update(0, 1, 10)
+        self.plotter.view1('first', [1, 2, 3])
+        self.plotter.view1('second', [1, 2, 3])
+        self.plotter.start_update(1, 1, 10)
+        self.progress.clear()
+        self.plotter.view1('first', [1, 2, 3])
+        self.assertNotIn('first', self.progress)
+        self.plotter.start_update(9, 1, 10)
+        self.plotter.view1('first', [1, 2, 3])
+        self.assertIn('first', self.progress)
+
+    def test0004_no_update_information(self):
+        """Without update numbers, every plot is sent"""
+        for _ in range(3):
+            self.assertTrue(self.plotter.due('trace'))
+            self.plotter.mark('trace')
+
+
+class TestPreview(TestCase):
+    """Test sending previews"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+        data = np.zeros(3, dtype=[('trace', 'float64', (1024,))])
+        data['trace'] = np.sin(np.arange(1024) / 10)
+        writer = PreviewFiles(self.directory, len(data))
+        writer.write(0, data)
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test0001_preview_is_sent(self):
+        """A preview is sent, even when plots are throttled"""
+        progress = {}
+        plotter = PlacePlotter(progress, 'test_plots')
+        plotter.interval = 60
+        plotter.start_update(0, 1, 10)
+        plotter.preview('preview', self.directory, 'trace', 1)
+        self.assertEqual(progress['preview']['f'], 'view')
+        self.assertEqual([s['label'] for s in progress['preview']['series']], ['max', 'min'])
+
+
+class TestSeriesEncoding(TestCase):
+    """Test how series are sent to the web application"""
+
+    def test0001_round_trip(self):
+        """Numeric series are decoded to the same values"""
+        ydata = np.sin(np.arange(100) / 7)
+        for xdata in [None, np.arange(100) * 0.5 + 3, np.arange(100) ** 2]:
+            data = _data(ydata, xdata)
+            self.assertEqual(data['encoding'], 'f32')
+            decoded_x, decoded_y = _values(data)
+            expected_x = np.arange(100) if xdata is None else xdata
+            np.testing.assert_allclose(decoded_y, ydata, rtol=1e-6)
+            np.testing.assert_allclose(decoded_x, expected_x, rtol=1e-6)
+
+    def test0002_times(self):
+        """Times are sent as lists of milliseconds since the epoch"""
+        times = np.arange('2020-01-01T00:00', '2020-01-01T00:00:03', dtype='datetime64[s]')
+        data = _data([1, 2, 3], times)
+        self.assertNotIn('encoding', data)
+        self.assertEqual(data['x'], [1577836800000.0, 1577836801000.0, 1577836802000.0])
+        self.assertEqual(data['y'], [1.0, 2.0, 3.0])
+
+    def test0003_objects(self):
+        """Arrays of Python numbers are sent as lists"""
+        data = _data(np.array([1, 2.5], dtype=object))
+        self.assertEqual((data['x'], data['y']), ([0.0, 1.0], [1.0, 2.5]))
+
+
+class TestDownsample(TestCase):
+    """Test reducing long series to a budget of points"""
+
+    def test0001_buckets(self):
+        """The minimum and maximum of each bucket are kept, in order"""
+        ydata = np.random.RandomState(0).normal(size=1003)
+        ydata[500] = 100.0
+        xdata = np.arange(1003) * 0.5
+        for points in [2, 10, 100, 1002]:
+            with self.subTest(points=points):
+                kept_x, kept_y = _downsample(xdata, ydata, points)
+                self.assertLessEqual(len(kept_y), points)
+                self.assertTrue(np.all(np.diff(kept_x) > 0))
+                np.testing.assert_array_equal(kept_y, ydata[(kept_x * 2).astype(int)])
+                size = -(-len(ydata) // (points // 2))
+                for start in range(0, len(ydata), size):
+                    bucket = ydata[start:start + size]
+                    self.assertIn(bucket.min(), kept_y)
+                    self.assertIn(bucket.max(), kept_y)
+                self.assertIn(100.0, kept_y)
+
+    def test0002_encoded(self):
+        """A long series is sent with its peaks, within the budget"""
+        ydata = np.zeros(10000)
+        ydata[1234] = -5.0
+        ydata[8765] = 7.0
+        data = _data(ydata, points=100)
+        self.assertLessEqual(data['n'], 100)
+        xdata, decoded = _values(data)
+        self.assertEqual((decoded.min(), decoded.max()), (-5.0, 7.0))
+        self.assertIn(1234, xdata)
+        self.assertIn(8765, xdata)
+
+
+class TestBudgets(TestCase):
+    """Test sharing the point limit between the series of a plot"""
+
+    def test0001_short_series(self):
+        """Series that fit together are sent whole"""
+        self.assertEqual(_budgets([[1, 2, 3], list(range(10))]), [3, 10])
+
+    def test0002_shared(self):
+        """Short series are sent whole, and the rest is shared by the longer ones"""
+        lengths = [10, DATA_POINT_LIMIT, 3 * DATA_POINT_LIMIT, 5]
+        budgets = _budgets([{'n': length} for length in lengths])
+        self.assertEqual(budgets[0], 10)
+        self.assertEqual(budgets[3], 5)
+        self.assertLessEqual(sum(budgets), DATA_POINT_LIMIT)
+        self.assertLessEqual(abs(budgets[1] - budgets[2]), 1)
+        self.assertGreaterEqual(sum(budgets), DATA_POINT_LIMIT - 1)
+
+    def test0003_minimum(self):
+        """Every series gets at least two points"""
+        budgets = _budgets([np.zeros(DATA_POINT_LIMIT)] * (DATA_POINT_LIMIT // 2 + 5))
+        self.assertEqual(set(budgets), {2})
+
+
+class TestPlotWorker(TestCase):
+    """Test drawing and rendering figures on the plotting thread"""
+
+    def setUp(self):
+        self.plotter = PlacePlotter({}, 'test_plots')
+        self.plotter.interval = 0
+        self.plotter.every = 1
+        self.rendered = []
+        self.plotter._save_png = self._save_png  # pylint: disable=protected-access
+
+    def _save_png(self, title, fig, alt):  # pylint: disable=unused-argument
+        self.rendered.append((title, fig, threading.current_thread()))
+
+    def test0001_coalesced(self):
+        """Every drawing is done, in order, but only the latest is rendered"""
+        started = threading.Event()
+        release = threading.Event()
+        drawn = []
+
+        def _draw(number):
+            if number == 0:
+                started.set()
+                release.wait()
+            drawn.append(number)
+            return number
+        self.plotter.png('trace', lambda: _draw(0))
+        started.wait()
+        for number in range(1, 6):
+            self.plotter.png('trace', lambda number=number: _draw(number))
+        release.set()
+        wait_for_plots()
+        self.assertEqual(drawn, list(range(6)))
+        self.assertEqual([fig for _, fig, _ in self.rendered], [0, 5])
+
+    def test0002_figure(self):
+        """A figure is rendered on the plotting thread, and only when it is due"""
+        fig = Figure()
+        self.plotter.every = 2
+        for update_number in range(3):
+            self.plotter.start_update(update_number, 1, 10)
+            self.plotter.png('figure', fig)
+            wait_for_plots()
+        self.assertEqual(len(self.rendered), 2)
+        self.assertIs(self.rendered[-1][1], fig)
+        self.assertIsNot(self.rendered[-1][2], threading.current_thread())
+
+    def test0003_errors(self):
+        """An error in drawing is raised again in the calling thread"""
+
+        def _fail():
+            raise ValueError('broken plot')
+        self.plotter.png('broken', _fail)
+        with self.assertRaisesRegex(ValueError, 'broken plot'):
+            wait_for_plots()
+        self.plotter.png('broken', lambda: 'fixed')
+        wait_for_plots()
+        self.assertEqual(self.rendered[-1][1], 'fixed')
+
+
+class TestWigglePlot(TestCase):
+    """Test drawing a wiggle plot one trace at a time"""
+
+    def setUp(self):
+        self.plotter = PlacePlotter({}, 'test_plots')
+        self.plotter.interval = 0
+        self.plotter.every = 3
+        self.rendered = []
+        self.plotter._save_png = self._save_png  # pylint: disable=protected-access
+
+    def _save_png(self, title, fig, alt):  # pylint: disable=unused-argument
+        png = io.BytesIO()
+        fig.savefig(png, format='png')
+        self.rendered.append(png.getvalue())
+
+    def test0001_incremental(self):
+        """Each trace is drawn once, next to the earlier traces, which are kept"""
+        for style in ['wiggle', 'bscan']:
+            with self.subTest(style=style):
+                self.rendered.clear()
+                wiggle = WigglePlot(self.plotter, style, 10, style=style, size=(100, 50))
+                drawn = []
+                draw = wiggle._draw  # pylint: disable=protected-access
+
+                def _draw(update_number, trace, draw=draw, wiggle=wiggle, drawn=drawn):
+                    before = wiggle.image.copy()
+                    result = draw(update_number, trace)
+                    columns = np.nonzero((wiggle.image != before).any(axis=0))[0]
+                    drawn.append((update_number, columns.min(), columns.max()))
+                    return result
+                wiggle._draw = _draw  # pylint: disable=protected-access
+                for update_number in range(10):
+                    self.plotter.start_update(update_number, 1, 10)
+                    wiggle.add(update_number, np.sin(np.linspace(0, 6, 200)))
+                    wait_for_plots()
+                self.assertEqual([update_number for update_number, _, _ in drawn],
+                                 list(range(10)))
+                for update_number, first, last in drawn:
+                    self.assertGreaterEqual(first, (update_number - 1) * 10)
+                    self.assertLess(last, (update_number + 2) * 10)
+                self.assertEqual(len(self.rendered), 4)
+                image = imread(io.BytesIO(self.rendered[-1]), format='png')
+                self.assertEqual(image.shape[:2], (50, 100))
+                for update_number in range(10):
+                    columns = image[:, update_number * 10:(update_number + 1) * 10]
+                    self.assertTrue((columns[..., :3] < 0.5).any())
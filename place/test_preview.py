@@ -0,0 +1,89 @@
+"""Tests for the min/max previews of traces"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from place.preview import Preview, PreviewFiles, _pyramid, previewed_fields
+
+
+def _minmax(values, factor):
+    """Group the last axis by ``factor`` samples, the slow way"""
+    groups = [values[..., start:start + factor] for start in range(0, values.shape[-1], factor)]
+    return np.stack([np.stack([group.min(axis=-1), group.max(axis=-1)], axis=-1)
+                     for group in groups], axis=-2)
+
+
+class TestPyramid(TestCase):
+    """Test computing the levels of a preview"""
+
+    def test0001_levels(self):
+        """Each level holds the minimum and maximum of 4 times more samples"""
+        values = np.random.RandomState(0).normal(size=(3, 2, 1000))
+        levels = list(_pyramid(values, 3))
+        self.assertEqual([level.shape for level in levels],
+                         [(3, 2, 250, 2), (3, 2, 63, 2), (3, 2, 16, 2)])
+        for level, factor in zip(levels, [4, 16, 64]):
+            np.testing.assert_array_equal(level, _minmax(values, factor))
+
+
+class TestPreview(TestCase):
+    """Test writing and reading the preview of an experiment"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+        self.data = np.zeros(10, dtype=[('trace', 'float32', (1024,)), ('count', 'int64')])
+        self.data['trace'] = np.random.RandomState(0).normal(size=(10, 1024))
+        self.data['count'] = np.arange(10)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test0001_read(self):
+        """The level is chosen by width, and matches the traces"""
+        writer = PreviewFiles(self.directory, len(self.data))
+        writer.write(0, self.data[:4])
+        writer.write(4, self.data[4:])
+        writer.close()
+        preview = Preview(self.directory)
+        self.assertEqual(preview.names, ('trace',))
+        self.assertNotIn('count', preview)
+        self.assertEqual(preview.levels('trace'), [(4, 256), (16, 64), (64, 16)])
+        for width, expected in [(None, 64), (800, 4), (50, 16), (64, 16), (65, 4)]:
+            factor, minmax = preview.read('trace', 3, width=width)
+            self.assertEqual(factor, expected)
+            np.testing.assert_array_equal(minmax, _minmax(self.data['trace'][3], factor))
+        factor, minmax = preview.read('trace', slice(2, 5))
+        np.testing.assert_array_equal(minmax, _minmax(self.data['trace'][2:5], factor))
+
+    def test0002_resume(self):
+        """An interrupted preview is trimmed, and can be continued"""
+        writer = PreviewFiles(self.directory, len(self.data))
+        writer.write(0, self.data[:6])
+        writer.close(abort=True)
+        _, minmax = Preview(self.directory).read('trace')
+        self.assertEqual(len(minmax), 6)
+        writer = PreviewFiles(self.directory, len(self.data))
+        writer.resume(6)
+        writer.write(6, self.data[6:])
+        writer.close()
+        factor, minmax = Preview(self.directory).read('trace', width=256)
+        np.testing.assert_array_equal(minmax, _minmax(self.data['trace'], factor))
+
+    def test0003_no_fields(self):
+        """No preview directory is made if no field can be previewed"""
+        data = self.data.astype([('trace', 'float32', (64,)), ('count', 'int64')])
+        self.assertEqual(previewed_fields(data.dtype), [])
+        self.assertEqual(previewed_fields(self.data.dtype), ['trace'])
+        writer = PreviewFiles(self.directory, len(data))
+        writer.write(0, data[:4])
+        writer.close(abort=True)
+        writer = PreviewFiles(self.directory, len(data))
+        writer.resume(4)
+        writer.write(4, data[4:])
+        writer.close()
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'preview')))
+        with self.assertRaises(FileNotFoundError):
+            Preview(self.directory)
@@ -0,0 +1,107 @@
+"""Tests for reading experiments in every layout"""
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from place.reader import Experiment
+from place.storage import open_storage
+
+ROW = np.dtype([('count', 'int64'), ('trace', 'int16', (32,))])
+LAYOUTS = {'files': 'packed', 'memmap': 'packed', 'columns': 'columns',
+           'compressed': 'compressed'}
+
+
+def _rows(update_number, count=1):
+    """Make the rows of some updates, with the update number in ``count``"""
+    rows = np.zeros(count, dtype=ROW)
+    rows['count'] = np.arange(update_number, update_number + count)
+    rows['trace'] = rows['count'][:, np.newaxis] * np.arange(32)
+    return rows
+
+
+class TestExperiment(TestCase):
+    """Test reading an experiment, whatever its storage mode"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _experiment(self, mode, updates=10, stop=None, durability='none'):
+        """Write an experiment, leaving the storage open if ``stop`` is given"""
+        directory = os.path.join(self.directory, mode)
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'config.json'), 'w') as config_file:
+            json.dump({'title': mode, 'updates': updates}, config_file)
+        storage = open_storage(mode, directory, updates, durability=durability)
+        for update_number in range(updates if stop is None else stop):
+            storage.write(update_number, _rows(update_number))
+        if stop is None:
+            storage.close()
+        return directory, storage
+
+    def test0001_layouts(self):
+        """Every layout is read in the same way"""
+        expected = _rows(0, 10)
+        for mode, layout in LAYOUTS.items():
+            with self.subTest(mode=mode):
+                directory, _ = self._experiment(mode)
+                experiment = Experiment(directory)
+                self.assertEqual(experiment.layout, layout)
+                self.assertEqual(experiment.config['title'], mode)
+                self.assertIsNone(experiment.results)
+                self.assertEqual(len(experiment), 10)
+                self.assertEqual(experiment.names, ROW.names)
+                self.assertIn('trace', experiment)
+                np.testing.assert_array_equal(experiment['trace'], expected['trace'])
+                np.testing.assert_array_equal(experiment.field('count', 2, 5), [2, 3, 4])
+                np.testing.assert_array_equal(experiment[3], expected[3])
+                np.testing.assert_array_equal(experiment[-1], expected[-1])
+                np.testing.assert_array_equal(experiment[2:9:3], expected[2:9:3])
+                np.testing.assert_array_equal(experiment.rows(8, 100), expected[8:])
+                with self.assertRaises(IndexError):
+                    experiment[10]  # pylint: disable=pointless-statement
+                with self.assertRaises(KeyError):
+                    experiment.field('time')
+                chunks = list(experiment.chunks(size=3))
+                self.assertEqual([start for start, _ in chunks], [0, 3, 6, 9])
+                np.testing.assert_array_equal(
+                    np.concatenate([rows for _, rows in chunks]), expected)
+                self.assertEqual([row['count'] for row in experiment], list(range(10)))
+                self.assertTrue(all(os.path.isfile(filename)
+                                    for filename in experiment.data_files()))
+
+    def test0002_unpacked(self):
+        """Row files are read up to the first one that cannot be read"""
+        directory, storage = self._experiment('files', stop=7)
+        storage.close(abort=True)
+        with open(os.path.join(directory, 'data_007.npy'), 'wb') as partial:
+            partial.write(b'\x93NUMPY')
+        np.save(os.path.join(directory, 'data_009.npy'), _rows(9))
+        experiment = Experiment(directory)
+        self.assertEqual(experiment.layout, 'files')
+        self.assertEqual(len(experiment), 7)
+        np.testing.assert_array_equal(experiment['count'], np.arange(7))
+        np.testing.assert_array_equal(experiment[1:4], _rows(1, 3))
+        self.assertEqual(len(experiment.data_files()), 2)
+
+    def test0003_checkpoint(self):
+        """A running experiment is read up to its checkpoint"""
+        for mode in ['memmap', 'columns', 'compressed']:
+            with self.subTest(mode=mode):
+                directory, storage = self._experiment(mode, stop=8, durability='update')
+                with open(os.path.join(directory, 'checkpoint.json'), 'w') as checkpoint:
+                    json.dump({'update': 5, 'plugins': {}}, checkpoint)
+                try:
+                    experiment = Experiment(directory)
+                    self.assertEqual(len(experiment), 6)
+                    np.testing.assert_array_equal(experiment['count'], np.arange(6))
+                    np.testing.assert_array_equal(experiment[:], _rows(0, 6))
+                    np.testing.assert_array_equal(experiment[-1], _rows(5)[0])
+                finally:
+                    storage.close(abort=True)
@@ -0,0 +1,196 @@
+"""Tests for the storage of experiment data"""
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from place.storage import (ColumnReader, CompressedReader, RowFiles, _decode, _encode,
+                           open_storage, reopen, resize)
+from place.utilities import row_files
+
+ROW = np.dtype([('count', 'int64'), ('trace', 'float64', (8,))])
+
+
+def _rows(update_number, count=1):
+    """Make the rows of some updates, with the update number in ``count``"""
+    rows = np.zeros(count, dtype=ROW)
+    rows['count'] = np.arange(update_number, update_number + count)
+    rows['trace'] = rows['count'][:, np.newaxis]
+    return rows
+
+
+def _save(directory, mode, updates, start=0, stop=None, block=1, durability='none'):
+    """Write updates ``start`` to ``stop`` with a storage mode, and close it
+
+    :returns: the value returned by each write
+    :rtype: list(bool)
+    """
+    stop = updates if stop is None else stop
+    storage = open_storage(mode, directory, updates, durability=durability)
+    if start:
+        storage.resume(start)
+    saved = [storage.write(update_number, _rows(update_number, min(block, stop - update_number)))
+             for update_number in range(start, stop, block)]
+    storage.close(abort=stop < updates)
+    return saved
+
+
+class TestOpenStorage(TestCase):
+    """Test writing, stopping and resuming with each storage mode"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _subtests(self, modes, **kwargs):
+        """Run a subtest for each mode, each in an empty directory"""
+        for mode in modes:
+            with self.subTest(mode=mode, **kwargs):
+                shutil.rmtree(self.directory)
+                os.makedirs(self.directory)
+                yield mode
+
+    def test0001_round_trip(self):
+        """Every row is saved, whether written alone or in blocks"""
+        for block in [1, 3]:
+            for mode in self._subtests(['files', 'memmap'], block=block):
+                _save(self.directory, mode, 10, block=block)
+                np.testing.assert_array_equal(
+                    np.load(self.directory + '/data.npy'), _rows(0, 10))
+
+    def test0002_resume(self):
+        """A stopped experiment is trimmed, and resumed from its last update"""
+        for mode in self._subtests(['files', 'memmap']):
+            _save(self.directory, mode, 10, stop=6)
+            if mode == 'memmap':
+                np.testing.assert_array_equal(
+                    np.load(self.directory + '/data.npy'), _rows(0, 6))
+            _save(self.directory, mode, 10, start=6)
+            np.testing.assert_array_equal(
+                np.load(self.directory + '/data.npy'), _rows(0, 10))
+
+    def test0003_durability(self):
+        """With a sync interval, only the synchronized rows count as saved"""
+        saved = _save(self.directory, 'memmap', 10, durability='4')
+        self.assertEqual(saved, [False, False, False, True] * 2 + [False, False])
+
+    def test0004_unknown(self):
+        """Unknown modes and durability settings are rejected"""
+        with self.assertRaises(ValueError):
+            open_storage('tape', self.directory, 10)
+        with self.assertRaises(ValueError):
+            open_storage('memmap', self.directory, 10, durability='sometimes')
+
+    def test0005_resize(self):
+        """A NumPy file is trimmed and extended in place"""
+        filename = self.directory + '/rows.npy'
+        np.save(filename, _rows(0, 10))
+        self.assertTrue(resize(filename, 4))
+        np.testing.assert_array_equal(np.load(filename), _rows(0, 4))
+        data = reopen(filename, 8)
+        self.assertEqual(len(data), 8)
+        np.testing.assert_array_equal(data[:4], _rows(0, 4))
+        np.testing.assert_array_equal(data[4:], np.zeros(4, dtype=ROW))
+
+    def test0006_columns(self):
+        """Each field is read back as a column, and by update"""
+        for block in [1, 3]:
+            for _ in self._subtests(['columns'], block=block):
+                _save(self.directory, 'columns', 10, stop=6, block=block)
+                self.assertEqual(len(ColumnReader(self.directory)), 6)
+                _save(self.directory, 'columns', 10, start=6, block=block)
+                data = ColumnReader(self.directory)
+                expected = _rows(0, 10)
+                self.assertEqual(data.dtype, ROW)
+                self.assertEqual(len(data), 10)
+                self.assertIn('trace', data)
+                for name in ROW.names:
+                    np.testing.assert_array_equal(data[name], expected[name])
+                np.testing.assert_array_equal(data[7]['trace'], expected[7]['trace'])
+                self.assertEqual([row['count'] for row in data], list(range(10)))
+
+    def test0007_compressed(self):
+        """Compressed rows are read back by field, by update and as an array"""
+        for block in [1, 3]:
+            for _ in self._subtests(['compressed'], block=block):
+                _save(self.directory, 'compressed', 10, stop=6, block=block)
+                self.assertEqual(len(CompressedReader(self.directory)), 6)
+                _save(self.directory, 'compressed', 10, start=6, block=block)
+                data = CompressedReader(self.directory)
+                expected = _rows(0, 10)
+                self.assertEqual(data.dtype, ROW)
+                np.testing.assert_array_equal(np.asarray(data), expected)
+                np.testing.assert_array_equal(data['trace'], expected['trace'])
+                np.testing.assert_array_equal(data['count'], expected['count'])
+                np.testing.assert_array_equal(data[7], expected[7])
+                np.testing.assert_array_equal(data[2:5], expected[2:5])
+
+    def test0008_compressed_resume_missing(self):
+        """An experiment with an update missing from the chunks cannot be resumed"""
+        _save(self.directory, 'compressed', 10, stop=6)
+        index = np.load(self.directory + '/compressed/index.npy', mmap_mode='r+')
+        index[3] = 0
+        index.flush()
+        del index
+        storage = open_storage('compressed', self.directory, 10)
+        with self.assertRaises(RuntimeError):
+            storage.resume(6)
+
+    def test0009_encoding(self):
+        """Chunks are decoded to the same values, with or without deltas"""
+        values = np.random.RandomState(0).normal(size=(2, 50))
+        for dtype in ['<i2', '>i4', '<u1', '<f4', '>f8']:
+            with self.subTest(dtype=dtype):
+                array = (values * 100).astype(dtype)
+                field_dtype = np.dtype((dtype, array.shape))
+                delta = field_dtype.base.kind in 'iu'
+                np.testing.assert_array_equal(
+                    _decode(_encode(array, delta), field_dtype, delta), array)
+
+
+class TestRowFiles(TestCase):
+    """Test writing rows into their own files"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test0001_first_row_written_at_once(self):
+        """The first row is written at once, and fast rows are batched"""
+        writer = RowFiles(self.directory, 10)
+        self.assertTrue(writer.write(0, _rows(0)))
+        self.assertFalse(writer.write(1, _rows(1)))
+        self.assertEqual(len(row_files(self.directory)), 1)
+        writer.close()
+        np.testing.assert_array_equal(
+            np.load(self.directory + '/data.npy')['count'], [0, 1])
+
+    def test0002_waiting_rows_written(self):
+        """Rows are written within the time bound, even if no more arrive"""
+        writer = RowFiles(self.directory, 10)
+        writer.buffer_seconds = 0.1
+        writer.write(0, _rows(0))
+        writer.write(1, _rows(1))
+        time.sleep(0.5)
+        self.assertEqual(len(row_files(self.directory)), 2)
+        self.assertTrue(writer.write(2, _rows(2)))
+        writer.close()
+        np.testing.assert_array_equal(
+            np.load(self.directory + '/data.npy')['count'], [0, 1, 2])
+
+    def test0003_sync_interval(self):
+        """With a sync interval, each batch of that many rows is one file"""
+        writer = RowFiles(self.directory, 10, sync_every=4)
+        saved = [writer.write(update_number, _rows(update_number))
+                 for update_number in range(10)]
+        self.assertEqual(saved, [False, False, False, True] * 2 + [False, False])
+        writer.close(abort=True)
+        self.assertEqual([len(np.load(filename)) for filename in row_files(self.directory)],
+                         [4, 4, 2])
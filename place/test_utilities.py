@@ -0,0 +1,137 @@
+"""Tests for the PLACE data utilities"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from place.utilities import (build_single_file, rename_columns, rewrite_header, row_files,
+                             split_single_file)
+
+ROW = np.dtype([('count', 'int64'), ('trace', 'float32', (16,))])
+
+
+def _rows(update_number, count=1):
+    """Make the rows of some updates, with the update number in ``count``"""
+    rows = np.zeros(count, dtype=ROW)
+    rows['count'] = np.arange(update_number, update_number + count)
+    rows['trace'] = rows['count'][:, np.newaxis]
+    return rows
+
+
+class TestPacking(TestCase):
+    """Test packing row files into data.npy, and unpacking them"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _row_files(self, blocks):
+        """Write a row file for each (first update, rows) block"""
+        for update_number, count in blocks:
+            np.save('{}/data_{:03d}.npy'.format(self.directory, update_number),
+                    _rows(update_number, count))
+
+    def test0001_pack(self):
+        """Single rows and blocks of rows are packed in order"""
+        self._row_files([(0, 1), (1, 3), (4, 1), (5, 20)])
+        throttled = []
+        self.assertEqual(build_single_file(self.directory, workers=2,
+                                           throttle=throttled.append), 25)
+        np.testing.assert_array_equal(np.load(self.directory + '/data.npy'), _rows(0, 25))
+        self.assertEqual(sum(throttled), 25 * ROW.itemsize)
+        self.assertEqual(len(row_files(self.directory)), 4)
+        self.assertFalse(os.path.exists(self.directory + '/data.npy.part'))
+
+    def test0002_remove_rows(self):
+        """The row files are removed once data.npy is written"""
+        self._row_files([(0, 2), (2, 1)])
+        self.assertEqual(build_single_file(self.directory, remove_rows=True), 3)
+        self.assertEqual(row_files(self.directory), [])
+        np.testing.assert_array_equal(np.load(self.directory + '/data.npy'), _rows(0, 3))
+
+    def test0003_missing_update(self):
+        """Nothing is packed, or removed, if an update is missing"""
+        self._row_files([(0, 2), (3, 1)])
+        with self.assertRaises(ValueError):
+            build_single_file(self.directory, remove_rows=True)
+        self.assertEqual(len(row_files(self.directory)), 2)
+        self.assertFalse(os.path.exists(self.directory + '/data.npy'))
+
+    def test0004_different_types(self):
+        """Nothing is packed if the row files have different data types"""
+        self._row_files([(0, 1)])
+        np.save(self.directory + '/data_001.npy', _rows(1).astype(
+            [('count', 'int32'), ('trace', 'float32', (16,))]))
+        with self.assertRaises(ValueError):
+            build_single_file(self.directory)
+        self.assertFalse(os.path.exists(self.directory + '/data.npy'))
+
+    def test0005_existing(self):
+        """An existing data.npy is not replaced"""
+        self._row_files([(0, 1)])
+        np.save(self.directory + '/data.npy', _rows(5))
+        with self.assertRaises(FileExistsError):
+            build_single_file(self.directory, remove_rows=True)
+        self.assertEqual(len(row_files(self.directory)), 1)
+
+    def test0006_unpack(self):
+        """data.npy is unpacked into one file for each row"""
+        np.save(self.directory + '/data.npy', _rows(0, 12))
+        self.assertEqual(split_single_file(self.directory, workers=3), 12)
+        files = row_files(self.directory)
+        self.assertEqual(len(files), 12)
+        self.assertFalse(os.path.exists(self.directory + '/data.npy'))
+        np.testing.assert_array_equal(np.load(files[7]), _rows(7))
+        build_single_file(self.directory, remove_rows=True)
+        np.testing.assert_array_equal(np.load(self.directory + '/data.npy'), _rows(0, 12))
+
+
+class TestHeaders(TestCase):
+    """Test changing NPY headers without rewriting the data"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='test_place_')
+        self.filename = self.directory + '/data.npy'
+        np.save(self.filename, _rows(0, 10))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test0001_shape(self):
+        """The shape is changed, and the data left in place"""
+        size = os.path.getsize(self.filename)
+        self.assertTrue(rewrite_header(self.filename, shape=(4,)))
+        self.assertEqual(os.path.getsize(self.filename), size)
+        np.testing.assert_array_equal(np.load(self.filename), _rows(0, 4))
+
+    def test0002_dtype(self):
+        """The data type is changed, keeping the shape"""
+        dtype = np.dtype([('number', 'int64'), ('trace', 'float32', (16,))])
+        self.assertTrue(rewrite_header(self.filename, dtype=dtype))
+        data = np.load(self.filename)
+        self.assertEqual(data.dtype, dtype)
+        np.testing.assert_array_equal(data['number'], np.arange(10))
+
+    def test0003_too_long(self):
+        """A header that does not fit is refused, leaving the file unchanged"""
+        with open(self.filename, 'rb') as file_p:
+            original = file_p.read()
+        dtype = np.dtype([('count' * 40, 'int64'), ('trace', 'float32', (16,))])
+        self.assertFalse(rewrite_header(self.filename, dtype=dtype))
+        with open(self.filename, 'rb') as file_p:
+            self.assertEqual(file_p.read(), original)
+
+    def test0004_rename_columns(self):
+        """Columns are renamed in place, or by copying if the names are too long"""
+        for names, in_place in [(['number', 'wave'], True), (['n' * 200, 'wave'], False)]:
+            with self.subTest(in_place=in_place):
+                self.assertEqual(rename_columns(self.filename, names), in_place)
+                data = np.load(self.filename)
+                self.assertEqual(data.dtype.names, tuple(names))
+                np.testing.assert_array_equal(data[names[0]], np.arange(10))
+                np.testing.assert_array_equal(data['wave'], _rows(0, 10)['trace'])
+                self.assertFalse(os.path.exists(self.filename + '.part'))
@@ -1,10 +1,16 @@
 """Helper utilities for PLACE data"""
 
 from sys import argv
-from os import remove
-from os.path import basename, isdir, isfile
+from os import remove, replace
+from os.path import basename, exists, isdir, isfile
 from itertools import count
+from functools import partial
+from shutil import copyfileobj
 from glob import glob
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import struct
 import numpy as np
 
 def column_renamer():
@@ -19,13 +25,11 @@ def column_renamer():
         print('Example:')
         print('    {} data_001.npy 1 trace 2 data'.format(basename(argv[0])))
         return
-    with open(argv[1], 'rb') as file_p:
-        data = np.load(file_p)
+    names = list(np.load(argv[1], mmap_mode='r').dtype.names)
     if len(argv) == 2:
-        for i, name in enumerate(data.dtype.names):
+        for i, name in enumerate(names):
             print('{:2} {}'.format(i, name))
         return
-    names = list(data.dtype.names)
     for i in count(start=4, step=2):
         if len(argv) > i:
             names[int(argv[i-2])] = argv[i-1]
@@ -35,51 +39,325 @@ def column_renamer():
         else:
             print('Invalid number of arguments - no changes made')
             return
-    data.dtype.names = names
     print('Applying changes...', end='')
-    with open(argv[1], 'wb') as file_p:
-        np.save(file_p, data)
+    rename_columns(argv[1], names)
     print('done!')
 
+def rename_columns(filename, names):
+    """Rename the columns of a NumPy structured array file
+
+    Only the header of the file is rewritten, so this is fast for any size
+    of file. If the new names do not fit in the existing header, the file is
+    copied, in chunks, after a larger header and then replaced.
+
+    :param filename: the NPY file to modify
+    :type filename: str
+
+    :param names: the new name for every column
+    :type names: list
+
+    :returns: ``True`` if the header was rewritten in place, ``False`` if the
+              file had to be copied
+    :rtype: bool
+    """
+    with open(filename, 'rb') as file_p:
+        _, shape, fortran_order, dtype = _read_header(file_p)
+        offset = file_p.tell()
+    new_dtype = np.dtype({
+        'names': list(names),
+        'formats': [dtype.fields[name][0] for name in dtype.names],
+        'offsets': [dtype.fields[name][1] for name in dtype.names],
+        'itemsize': dtype.itemsize,
+    })
+    if rewrite_header(filename, dtype=new_dtype):
+        return True
+    header = {
+        'descr': np.lib.format.dtype_to_descr(new_dtype),
+        'fortran_order': fortran_order,
+        'shape': shape,
+    }
+    with open(filename, 'rb') as src, open(filename + '.part', 'wb') as dst:
+        try:
+            np.lib.format.write_array_header_1_0(dst, header)
+        except ValueError:
+            dst.seek(0)
+            np.lib.format.write_array_header_2_0(dst, header)
+        src.seek(offset)
+        copyfileobj(src, dst, 2**24)
+    replace(filename + '.part', filename)
+    return False
+
 def single_file():
     """Command-line entry point to packing NumPy array"""
-    if not (len(argv) == 2 and isdir(argv[1])):
-        print('Usage: {} [DIRECTORY]')
-        print('Pack PLACE data_XXX.npy files into a single file.')
-        return
-    build_single_file(argv[1])
-
-def build_single_file(directory):
-    """Pack the individual row files into one NumPy structured array"""
-    files = sorted(glob('{}/data_*.npy'.format(directory)))
-    print(files)
-    num = len(files)
-    if num == 0:
+    parser = argparse.ArgumentParser(
+        description='Pack PLACE data_XXX.npy files into a single file.')
+    parser.add_argument('directories', metavar='DIRECTORY', nargs='+',
+                        help='a PLACE experiment directory')
+    parser.add_argument('--remove', action='store_true',
+                        help='remove the data_XXX.npy files once data.npy is verified')
+    parser.add_argument('--jobs', type=int, default=4,
+                        help='directories to pack at the same time (default: 4)')
+    args = parser.parse_args()
+    return for_each_directory(
+        partial(build_single_file, remove_rows=args.remove), args.directories, args.jobs)
+
+def build_single_file(directory, remove_rows=False, workers=4, throttle=None):
+    """Pack the individual row files into one NumPy structured array
+
+    Each file may contain one row, or a block of rows. The rows are read by
+    a pool of threads and written, in order, into a memory-mapped
+    ``data.npy``, so only a few files are held in memory at once. Before
+    anything is written, the files are checked to have the same data type
+    and to cover every update with no gaps. The packed file is written
+    under a temporary name and renamed once it is complete.
+
+    :param directory: the experiment directory
+    :type directory: str
+
+    :param remove_rows: remove the row files once ``data.npy`` is verified
+    :type remove_rows: bool
+
+    :param workers: the number of threads reading the row files
+    :type workers: int
+
+    :param throttle: (optional) a function called with the number of bytes
+                     after each file is packed, which can sleep to limit the
+                     rate of packing
+    :type throttle: callable
+
+    :returns: the number of rows packed
+    :rtype: int
+
+    :raises FileExistsError: if ``data.npy`` already exists
+    :raises ValueError: if the row files do not fit together
+    """
+    files = row_files(directory)
+    if not files:
         print('No PLACE data_*.npy files found in {}'.format(directory))
-        return
-    with open(files[0], 'rb') as file_p:
-        row = np.load(file_p)
-    print(row.shape)
-    data = np.resize(row, (num,))
-    for i, filename in enumerate(files):
-        with open(filename, 'rb') as file_p:
-            row = np.load(file_p)
-        data[i] = row[0]
-    with open('{}/data.npy'.format(directory), 'xb') as file_p:
-        np.save(file_p, data)
-    #for filename in files:
-    #    remove(filename)
+        return 0
+    filename = '{}/data.npy'.format(directory)
+    if exists(filename):
+        raise FileExistsError('Cannot create {}: file exists'.format(filename))
+    dtype, lengths = check_row_files(files)
+    rows = sum(lengths)
+    data = np.lib.format.open_memmap(filename + '.part', mode='w+', dtype=dtype, shape=(rows,))
+    start = 0
+    for length, block in zip(lengths, read_ahead(_load_rows, files, workers)):
+        data[start:start + length] = block
+        start += length
+        if throttle is not None:
+            throttle(block.nbytes)
+    data.flush()
+    del data
+    replace(filename + '.part', filename)
+    packed = np.load(filename, mmap_mode='r')
+    if packed.dtype != dtype or len(packed) != rows:
+        raise ValueError('{} does not match its row files'.format(filename))
+    if remove_rows:
+        for row_file in files:
+            remove(row_file)
+    return rows
+
+def check_row_files(files):
+    """Check that the row files fit together, reading only their headers
+
+    :param files: the ``data_XXX.npy`` files, in update order
+    :type files: list
+
+    :returns: the data type, and the number of rows in each file
+    :rtype: (numpy.dtype, list)
+
+    :raises ValueError: if the data types differ, or an update is missing
+    """
+    dtype = None
+    lengths = []
+    expected = 0
+    for filename in files:
+        rows = np.load(filename, mmap_mode='r')
+        if dtype is None:
+            dtype = rows.dtype
+        elif rows.dtype != dtype:
+            raise ValueError('{} has a different data type: {}'.format(filename, rows.dtype))
+        if row_file_number(filename) != expected:
+            raise ValueError('{} should start at update {}'.format(filename, expected))
+        lengths.append(len(rows))
+        expected += len(rows)
+    return dtype, lengths
+
+def _load_rows(filename):
+    with open(filename, 'rb') as file_p:
+        return np.load(file_p)
+
+def read_ahead(func, items, workers):
+    """Call a function for each item on a pool of threads
+
+    The results are yielded in order, keeping at most ``2 * workers``
+    results waiting, so large results are not all held in memory.
+
+    :param func: the function to call with each item
+    :type func: function
+
+    :param items: the items
+    :type items: iterable
+
+    :param workers: the number of threads
+    :type workers: int
+
+    :returns: the results, in the order of the items
+    :rtype: generator
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+
+def for_each_directory(func, directories, jobs):
+    """Run a command-line tool on several directories at the same time
+
+    The outcome for each directory is printed.
+
+    :param func: the function to call with each directory
+    :type func: function
+
+    :param directories: the experiment directories
+    :type directories: list
+
+    :param jobs: the number of directories to process at once
+    :type jobs: int
+
+    :returns: 0 if every directory succeeded, otherwise 1
+    :rtype: int
+    """
+    status = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [executor.submit(func, directory) for directory in directories]
+        for directory, future in zip(directories, futures):
+            try:
+                future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                print('{}: {}'.format(directory, err))
+                status = 1
+            else:
+                print('{}: done'.format(directory))
+    return status
+
+def row_files(directory):
+    """List the ``data_XXX.npy`` files in a directory, in update order
+
+    :param directory: the experiment directory
+    :type directory: str
+
+    :returns: the file names
+    :rtype: list
+    """
+    files = glob('{}/data_*.npy'.format(directory))
+    numbered = [(row_file_number(filename), filename) for filename in files]
+    return [filename for number, filename in sorted(numbered) if number is not None]
+
+def row_file_number(filename):
+    """Get the update number from a ``data_XXX.npy`` file name"""
+    try:
+        return int(basename(filename)[len('data_'):-len('.npy')])
+    except ValueError:
+        return None
 
 def multiple_files():
     """Unpack one NumPy structured array into individual row files"""
-    if not (len(argv) == 2 and isdir(argv[1])):
-        print('Usage: {} [DIRECTORY]')
-        print('Unpack PLACE data.npy file into multiple files.')
-        return
-    directory = argv[1]
-    with open('{}/data.npy'.format(directory), 'rb') as file_p:
-        data = np.load(file_p)
-    for i, row in enumerate(data):
+    parser = argparse.ArgumentParser(
+        description='Unpack PLACE data.npy file into multiple files.')
+    parser.add_argument('directories', metavar='DIRECTORY', nargs='+',
+                        help='a PLACE experiment directory')
+    parser.add_argument('--jobs', type=int, default=4,
+                        help='directories to unpack at the same time (default: 4)')
+    args = parser.parse_args()
+    return for_each_directory(split_single_file, args.directories, args.jobs)
+
+def split_single_file(directory, workers=4):
+    """Unpack ``data.npy`` into one ``data_XXX.npy`` file for each row
+
+    The packed file is memory-mapped and the row files are written by a
+    pool of threads, so the data is never loaded into memory all at once.
+    ``data.npy`` is removed once every row file has been written.
+
+    :param directory: the experiment directory
+    :type directory: str
+
+    :param workers: the number of threads writing the row files
+    :type workers: int
+
+    :returns: the number of row files written
+    :rtype: int
+    """
+    filename = '{}/data.npy'.format(directory)
+    data = np.load(filename, mmap_mode='r')
+
+    def save_row(i):
         with open('{}/data_{:03d}.npy'.format(directory, i), 'xb') as file_p:
-            np.save(file_p, [row])
-    remove('{}/data.npy'.format(directory))
+            np.save(file_p, data[i:i + 1])
+
+    written = sum(1 for _ in read_ahead(save_row, range(len(data)), workers))
+    del data
+    remove(filename)
+    return written
+
+def rewrite_header(filename, dtype=None, shape=None):
+    """Rewrite the header of a NumPy file without touching its data
+
+    The new header must fit into the space used by the existing header (NPY
+    headers are padded, so small changes usually fit). The data itself is not
+    read or moved, so this is fast regardless of the file size.
+
+    :param filename: the NPY file to modify
+    :type filename: str
+
+    :param dtype: the new data type, or ``None`` to keep the current one
+    :type dtype: numpy.dtype
+
+    :param shape: the new shape, or ``None`` to keep the current one
+    :type shape: tuple
+
+    :returns: ``True`` if the header was rewritten, ``False`` if the new header
+              does not fit and the file was left unchanged
+    :rtype: bool
+    """
+    with open(filename, 'r+b') as file_p:
+        try:
+            version, old_shape, fortran_order, old_dtype = _read_header(file_p)
+        except ValueError:
+            return False
+        length_format = '<H' if version == (1, 0) else '<I'
+        data_offset = file_p.tell()
+        if dtype is None:
+            dtype = old_dtype
+        if shape is None:
+            shape = old_shape
+        header = "{{'descr': {!r}, 'fortran_order': {!r}, 'shape': {!r}, }}".format(
+            np.lib.format.dtype_to_descr(np.dtype(dtype)), fortran_order, tuple(shape))
+        prefix_length = len(np.lib.format.MAGIC_PREFIX) + 2 + struct.calcsize(length_format)
+        header_length = data_offset - prefix_length
+        if len(header) + 1 > header_length:
+            return False
+        header = header.ljust(header_length - 1) + '\n'
+        file_p.seek(prefix_length - struct.calcsize(length_format))
+        file_p.write(struct.pack(length_format, header_length))
+        file_p.write(header.encode('latin1'))
+    return True
+
+def _read_header(file_p):
+    """Read the header of an open NPY file, leaving the file at the data
+
+    :returns: the format version, shape, Fortran order and data type
+    :rtype: tuple
+
+    :raises ValueError: if the file is not a version 1.0 or 2.0 NPY file
+    """
+    version = np.lib.format.read_magic(file_p)
+    if version == (1, 0):
+        return (version,) + np.lib.format.read_array_header_1_0(file_p)
+    if version == (2, 0):
+        return (version,) + np.lib.format.read_array_header_2_0(file_p)
+    raise ValueError('unsupported NPY format version: {}'.format(version))
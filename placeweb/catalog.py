@@ -0,0 +1,213 @@
+"""A catalog of the experiments stored on the server
+
+The history of experiments is read from a small SQLite database in
+``MEDIA_ROOT``, rather than by reading the ``config.json`` of every
+experiment each time it is requested. The catalog is updated when an
+experiment starts, finishes or is deleted. If the catalog is missing, it is
+rebuilt from the experiment directories, and it can be rebuilt at any time
+with the ``place_catalog`` command.
+"""
+import json
+import os.path
+import sqlite3
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+from .settings import MEDIA_ROOT
+
+EXPERIMENTS = os.path.join(MEDIA_ROOT, 'experiments')
+CATALOG = os.path.join(MEDIA_ROOT, 'catalog.sqlite3')
+
+_COLUMNS = ['location', 'version', 'timestamp', 'title', 'comments', 'filename']
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS experiments (
+    location TEXT PRIMARY KEY,
+    version TEXT,
+    timestamp,
+    sort_key REAL,
+    title TEXT,
+    comments TEXT,
+    filename TEXT
+);
+CREATE INDEX IF NOT EXISTS experiments_by_time ON experiments (sort_key DESC);
+'''
+_LOCK = Lock()
+
+
+def entries(offset=0, limit=None):
+    """Get the summaries of stored experiments, newest first
+
+    :param offset: the number of experiments to skip
+    :type offset: int
+
+    :param limit: the maximum number of experiments to return, or ``None``
+                  for all of them
+    :type limit: int
+
+    :returns: the experiment summaries
+    :rtype: list
+    """
+    with _open() as conn:
+        rows = conn.execute(
+            'SELECT {} FROM experiments ORDER BY sort_key DESC, location DESC '
+            'LIMIT ? OFFSET ?'.format(', '.join(_COLUMNS)),
+            (-1 if limit is None else limit, offset)
+        ).fetchall()
+    return [dict(zip(_COLUMNS, row)) for row in rows]
+
+
+def count():
+    """Get the number of stored experiments
+
+    :returns: the number of experiments
+    :rtype: int
+    """
+    with _open() as conn:
+        return conn.execute('SELECT COUNT(*) FROM experiments').fetchone()[0]
+
+
+def record(directory):
+    """Add or update the summary of an experiment
+
+    Directories outside the experiments directory are ignored.
+
+    :param directory: the experiment directory
+    :type directory: str
+    """
+    location = _location(directory)
+    if location is None:
+        return
+    with _open() as conn:
+        _insert(conn, summarize(location))
+
+
+def forget(location):
+    """Remove an experiment from the catalog
+
+    :param location: the name of the experiment directory
+    :type location: str
+    """
+    with _open() as conn:
+        conn.execute('DELETE FROM experiments WHERE location = ?', (location,))
+
+
+def rebuild():
+    """Rebuild the catalog from the experiment directories
+
+    :returns: the number of experiments found
+    :rtype: int
+    """
+    with _open(scan=False) as conn:
+        return _scan(conn)
+
+
+def summarize(location):
+    """Summarize an experiment from its ``config.json``
+
+    :param location: the name of the experiment directory
+    :type location: str
+
+    :returns: the experiment summary
+    :rtype: dict
+    """
+    entry = {'location': location}
+    try:
+        with open(os.path.join(EXPERIMENTS, location, 'config.json')) as file_p:
+            config = json.load(file_p)
+    except (FileNotFoundError, ValueError):
+        entry['version'] = "0.0.0"
+        entry['timestamp'] = 0
+        entry['title'] = "<invalid>"
+        entry['comments'] = "<missing config.json>"
+        entry['filename'] = "data.zip"
+        return entry
+    metadata = config.get('metadata', {})
+    entry['version'] = metadata.get('PLACE_version', "0.0.0")
+    entry['timestamp'] = metadata.get('timestamp', 0)
+    entry['title'] = config.get('title', "untitled")
+    entry['comments'] = config.get('comments', "no comments")
+    entry['filename'] = title_to_filename(entry['title'])
+    return entry
+
+
+def timestamp_to_millis(entry):
+    """Convert timestamps to milliseconds (if not already)"""
+    if isinstance(entry['timestamp'], int):
+        return entry['timestamp']
+    # The following code is really only needed for
+    # experiments created with PLACE prior to version 0.8
+    return time.mktime(time.strptime(entry['timestamp'], r'%Y-%m-%d %H:%M:%S.%f'))
+
+
+def title_to_filename(title):
+    """convert title to a filename"""
+    filename = ''.join(
+        ['_' if c in '_.- ' else c
+         for c in list(title)
+         if c in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.- "][:25])
+    if filename == '':
+        return 'data.zip'
+    return filename + '.zip'
+
+
+def main():
+    """Command-line entry point to rebuild the catalog"""
+    print('Rebuilding {}...'.format(CATALOG), end='')
+    print('{} experiments'.format(rebuild()))
+
+
+@contextmanager
+def _open(scan=True):
+    """Open the catalog, creating it (and scanning the experiments) if needed
+
+    The connection commits when the block ends without an error.
+    """
+    with _LOCK:
+        new = not os.path.exists(CATALOG)
+        os.makedirs(os.path.dirname(CATALOG), exist_ok=True)
+        conn = sqlite3.connect(CATALOG)
+        try:
+            conn.executescript(_SCHEMA)
+            if new and scan:
+                _scan(conn)
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _scan(conn):
+    """Replace the catalog entries with the experiments on disk"""
+    conn.execute('DELETE FROM experiments')
+    try:
+        items = os.listdir(EXPERIMENTS)
+    except FileNotFoundError:
+        items = []
+    items = [item for item in items if os.path.isdir(os.path.join(EXPERIMENTS, item))]
+    for item in items:
+        _insert(conn, summarize(item))
+    return len(items)
+
+
+def _insert(conn, entry):
+    try:
+        sort_key = timestamp_to_millis(entry)
+    except (TypeError, ValueError):
+        sort_key = 0
+    conn.execute(
+        'INSERT OR REPLACE INTO experiments '
+        '(location, version, timestamp, sort_key, title, comments, filename) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (entry['location'], entry['version'], entry['timestamp'], sort_key,
+         entry['title'], entry['comments'], entry['filename'])
+    )
+
+
+def _location(directory):
+    """The name of an experiment directory, if it is in the experiments
+    directory"""
+    directory = os.path.normpath(os.path.abspath(directory))
+    if os.path.dirname(directory) != os.path.normpath(EXPERIMENTS):
+        return None
+    return os.path.basename(directory)
@@ -0,0 +1,348 @@
+"""Compaction of the experiments stored on the server
+
+Experiments can leave more on the disk than they need: the ``data_XXX.npy``
+files of aborted runs, row files left beside a packed ``data.npy``, and
+large uncompressed traces. Compaction tidies each experiment directory:
+
+1. the row files are packed into ``data.npy`` (or removed, if ``data.npy``
+   already holds them);
+2. the min/max preview of the traces is built, if it is missing;
+3. optionally, ``data.npy`` is converted to the ``compressed`` layout;
+4. the catalog entry of the experiment is updated.
+
+Experiments that can still be resumed are left alone, as packing them
+would stop them being resumed, unless asked otherwise or their checkpoint is
+older than a given number of days. Aborted and crashed runs keep their
+checkpoint, so this is how their row files are eventually packed.
+
+Compaction is run with the ``place_compact`` command, or by the server when
+it is idle, if ``compact when idle`` is set in the ``[Django]`` section of
+the PLACE config file. The server compacts resumable experiments once their
+checkpoint is older than ``compact resumable after (days)`` (7 by default).
+In both cases it reads and writes at a limited rate, and it pauses while an
+experiment is running.
+"""
+import argparse
+import os
+import shutil
+import threading
+from glob import glob
+from time import monotonic, sleep, time
+
+import numpy as np
+
+from place.config import PlaceConfig
+from place.preview import build_preview
+from place.reader import Experiment
+from place.storage import CompressedFiles, CompressedReader
+from place.utilities import build_single_file, check_row_files, row_files
+
+from . import catalog, worker
+
+ACTIVE_SECONDS = 30
+"""An experiment saved within this many seconds is treated as running"""
+SCAN_SECONDS = 600
+"""The time between scans of the experiments, when run by the server"""
+DAY_SECONDS = 24 * 60 * 60
+
+_SERVICE = None
+_ACTIVE = {'checked': 0.0, 'active': False}
+
+
+class Throttle:
+    """Limit the rate of compaction, and pause it while PLACE is busy
+
+    An instance is called with the number of bytes read or written since
+    the last call, and sleeps as needed.
+    """
+
+    def __init__(self, rate, busy=None):
+        """Constructor
+
+        :param rate: the highest average rate, in bytes per second, or 0 for
+                     no limit
+        :type rate: float
+
+        :param busy: (optional) a function returning ``True`` while
+                     compaction should pause
+        :type busy: callable
+        """
+        self.rate = rate
+        self.busy = busy
+        self._start = monotonic()
+        self._bytes = 0
+
+    def __call__(self, nbytes):
+        self._bytes += nbytes
+        if self.rate:
+            delay = self._bytes / self.rate - (monotonic() - self._start)
+            if delay > 0:
+                sleep(delay)
+        if self.busy is not None and self.busy():
+            while self.busy():
+                sleep(1.0)
+            self._start = monotonic()
+            self._bytes = 0
+
+
+def main():
+    """Command-line entry point for compacting experiments"""
+    parser = argparse.ArgumentParser(
+        description='Compact PLACE experiments: pack row files, build previews '
+                    'and optionally compress traces.')
+    parser.add_argument('directories', metavar='DIRECTORY', nargs='*',
+                        help='a PLACE experiment directory (default: every '
+                             'experiment on the server)')
+    parser.add_argument('--compress', action='store_true',
+                        help='convert data.npy to the compressed layout')
+    parser.add_argument('--compression', default='zlib',
+                        help='the codec used with --compress (default: zlib)')
+    parser.add_argument('--no-preview', action='store_true',
+                        help='do not build missing previews')
+    parser.add_argument('--include-resumable', action='store_true',
+                        help='also compact experiments that could be resumed, '
+                             'which can then no longer be resumed')
+    parser.add_argument('--stale-days', type=float,
+                        help='also compact experiments that could be resumed, if '
+                             'their checkpoint is older than this many days')
+    parser.add_argument('--rate', type=float, default=20.0,
+                        help='the highest rate of reading and writing, in MB/s '
+                             '(default: 20, 0 for no limit)')
+    args = parser.parse_args()
+    if hasattr(os, 'nice'):
+        os.nice(10)
+    throttle = Throttle(args.rate * 1e6, busy=_experiment_active)
+    status = 0
+    for directory in args.directories or experiment_directories():
+        try:
+            done = compact(directory, compress=args.compress, compression=args.compression,
+                           preview=not args.no_preview,
+                           include_resumable=args.include_resumable,
+                           stale_days=args.stale_days, throttle=throttle)
+        except Exception as err:  # pylint: disable=broad-except
+            print('{}: {}'.format(directory, err))
+            status = 1
+        else:
+            print('{}: {}'.format(directory, ', '.join(done) if done else 'nothing to do'))
+    return status
+
+
+def experiment_directories():
+    """List the experiment directories on the server, oldest first
+
+    :returns: the directories
+    :rtype: list
+    """
+    try:
+        names = sorted(os.listdir(catalog.EXPERIMENTS))
+    except FileNotFoundError:
+        return []
+    directories = [os.path.join(catalog.EXPERIMENTS, name) for name in names]
+    return [directory for directory in directories if os.path.isdir(directory)]
+
+
+def compact(directory, compress=False, compression='zlib', preview=True,
+            include_resumable=False, stale_days=None, throttle=None):
+    """Compact one experiment
+
+    :param directory: the experiment directory
+    :type directory: str
+
+    :param compress: convert ``data.npy`` to the ``compressed`` layout
+    :type compress: bool
+
+    :param compression: the codec used to compress
+    :type compression: str
+
+    :param preview: build the preview, if it is missing
+    :type preview: bool
+
+    :param include_resumable: compact the experiment even if it could be
+                              resumed, removing its checkpoint
+    :type include_resumable: bool
+
+    :param stale_days: (optional) compact the experiment even if it could be
+                       resumed, once its checkpoint is older than this many
+                       days
+    :type stale_days: float
+
+    :param throttle: (optional) called with the number of bytes after each
+                     step of the work
+    :type throttle: callable
+
+    :returns: a description of each thing that was done
+    :rtype: list
+
+    :raises ValueError: if the row files, or the compressed data, do not
+                        match the experiment data
+    """
+    checkpoint = os.path.join(directory, 'checkpoint.json')
+    if (os.path.exists(checkpoint) and not include_resumable
+            and not _stale(checkpoint, stale_days)):
+        return []
+    if _is_running(directory):
+        return []
+    done = []
+    files = row_files(directory)
+    if files:
+        done.append(_pack(directory, files, throttle))
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    if preview and not os.path.exists(os.path.join(directory, 'preview')):
+        try:
+            fields = build_preview(directory, throttle=throttle)
+        except FileNotFoundError:
+            pass  # no data
+        else:
+            if fields:
+                done.append('previewed {}'.format(', '.join(fields)))
+    if (compress and os.path.exists(os.path.join(directory, 'data.npy'))
+            and not os.path.exists(checkpoint)):
+        done.append(_compress(directory, compression, throttle))
+    if done:
+        catalog.record(directory)
+    return done
+
+
+def start_service():
+    """Start compacting experiments in the background, when PLACE is idle
+
+    This does nothing unless ``compact when idle`` is set in the
+    ``[Django]`` section of the PLACE config file, or if the service has
+    already started.
+    """
+    global _SERVICE  # pylint: disable=global-statement
+    if _SERVICE is not None:
+        return
+    config = PlaceConfig()
+    if config.get_config_value('Django', 'compact when idle', 'false').lower() not in [
+            'true', 'yes', 'on', '1']:
+        _SERVICE = False
+        return
+    rate = float(config.get_config_value('Django', 'compaction rate (MB/s)', '20'))
+    compress = config.get_config_value('Django', 'compress when compacting', 'false').lower()
+    stale_days = float(config.get_config_value('Django', 'compact resumable after (days)', '7'))
+    _SERVICE = threading.Thread(
+        target=_serve,
+        args=(Throttle(rate * 1e6, busy=_server_busy), compress in ['true', 'yes', 'on', '1'],
+              stale_days),
+        daemon=True
+    )
+    _SERVICE.start()
+
+
+def _serve(throttle, compress, stale_days):
+    """Compact every experiment, whenever PLACE is idle, including the
+    resumable experiments whose checkpoint is older than ``stale_days``"""
+    while True:
+        for directory in experiment_directories():
+            while _server_busy():
+                sleep(ACTIVE_SECONDS)
+            try:
+                compact(directory, compress=compress, stale_days=stale_days,
+                        throttle=throttle)
+            except Exception as err:  # pylint: disable=broad-except
+                print('Compaction of {} failed: {}'.format(directory, err))
+        sleep(SCAN_SECONDS)
+
+
+def _pack(directory, files, throttle):
+    """Pack the row files, or remove them if they are already packed"""
+    filename = os.path.join(directory, 'data.npy')
+    if not os.path.exists(filename):
+        rows = build_single_file(directory, remove_rows=True, workers=1, throttle=throttle)
+        return 'packed {} rows'.format(rows)
+    dtype, lengths = check_row_files(files)
+    packed = np.load(filename, mmap_mode='r')
+    if packed.dtype != dtype or len(packed) != sum(lengths):
+        raise ValueError('{} does not match its row files'.format(filename))
+    del packed
+    for row_file in files:
+        os.remove(row_file)
+    return 'removed {} row files'.format(len(files))
+
+
+def _compress(directory, compression, throttle):
+    """Convert ``data.npy`` to the ``compressed`` layout
+
+    The compressed data is written in a temporary directory, checked against
+    ``data.npy``, and only then moved into place.
+    """
+    experiment = Experiment(directory)
+    temporary = os.path.join(directory, '.compacting')
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    try:
+        writer = CompressedFiles(temporary, len(experiment), compression=compression)
+        try:
+            for start, rows in experiment.chunks():
+                writer.write(start, rows)
+                if throttle is not None:
+                    throttle(rows.nbytes)
+        finally:
+            writer.close()
+        reader = CompressedReader(temporary)
+        if reader.dtype != experiment.dtype or len(reader) != len(experiment):
+            raise ValueError('the compressed data does not match data.npy')
+        for start, rows in experiment.chunks():
+            if not np.array_equal(reader[start:start + len(rows)], rows):
+                raise ValueError('the compressed data does not match data.npy')
+            if throttle is not None:
+                throttle(rows.nbytes)
+        before = os.path.getsize(os.path.join(directory, 'data.npy'))
+        after = sum(os.path.getsize(filename)
+                    for filename in glob(os.path.join(temporary, 'compressed', '*')))
+        del experiment, reader
+        os.replace(os.path.join(temporary, 'compressed'), os.path.join(directory, 'compressed'))
+        os.remove(os.path.join(directory, 'data.npy'))
+    finally:
+        shutil.rmtree(temporary, ignore_errors=True)
+    return 'compressed {:.1f} MB to {:.1f} MB'.format(before / 1e6, after / 1e6)
+
+
+def _stale(checkpoint, stale_days):
+    """Check if a checkpoint is older than ``stale_days``"""
+    if stale_days is None:
+        return False
+    try:
+        return time() - os.path.getmtime(checkpoint) > stale_days * DAY_SECONDS
+    except FileNotFoundError:
+        return False
+
+
+def _is_running(directory):
+    """Check if an experiment is running in a directory"""
+    current = worker.WORKER
+    if (current is not None and worker.LOCK.locked()
+            and os.path.abspath(current.config['directory']) == os.path.abspath(directory)):
+        return True
+    return _recently_saved(directory)
+
+
+def _recently_saved(directory):
+    """Check if an experiment has saved a checkpoint, or a row file, in the
+    last few seconds (compaction writes neither)"""
+    for filename in [os.path.join(directory, 'checkpoint.json')] + row_files(directory)[-1:]:
+        try:
+            if time() - os.path.getmtime(filename) < ACTIVE_SECONDS:
+                return True
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def _experiment_active():
+    """Check if any experiment on the server has saved anything recently
+
+    The experiments are checked at most once a second.
+    """
+    if monotonic() - _ACTIVE['checked'] >= 1.0:
+        _ACTIVE['checked'] = monotonic()
+        _ACTIVE['active'] = any(_recently_saved(directory)
+                                for directory in experiment_directories())
+    return _ACTIVE['active']
+
+
+def _server_busy():
+    """Check if an experiment is running on this server, or elsewhere"""
+    return worker.LOCK.locked() or _experiment_active()
@@ -15,7 +15,7 @@ function runHandlers(experiment) {
             if (elmModuleName == plugin['metadata']['elm_module_name']) {
                 // yes - this one is being used
                 // send progress update to this plugin's Elm module
-                modulelist[elmModuleName].ports.processProgress.send(plugin);
+                modulelist[elmModuleName].ports.processProgress.send(decodePlugin(plugin));
                 foundFlag = true;
             }
         }
@@ -37,6 +37,60 @@ function runHandlers(experiment) {
     // it will not display progress or load settings into that plugin.
 }
 
+// plot series marked with an "encoding" of "f32" are sent by the server as
+// base64 text of little-endian 32-bit floats, which is decoded here into the
+// x and y lists expected by the Elm plotting functions
+function decodePlugin(plugin) {
+    var decoded = {};
+    for (var key in plugin) {
+        decoded[key] = plugin[key];
+    }
+    decoded['progress'] = decodeSeries(plugin['progress']);
+    return decoded;
+}
+
+function decodeSeries(value) {
+    if (Array.isArray(value)) {
+        return value.map(decodeSeries);
+    }
+    if (value === null || typeof value !== 'object') {
+        return value;
+    }
+    if (value['encoding'] === 'f32') {
+        var y = decodeFloat32(value['y']);
+        var x = new Array(y.length);
+        if (typeof value['x'] === 'string') {
+            var offsets = decodeFloat32(value['x']);
+            for (var i = 0; i < x.length; i++) {
+                x[i] = value['x0'] + offsets[i];
+            }
+        } else {
+            for (var i = 0; i < x.length; i++) {
+                x[i] = value['x0'] + value['dx'] * i;
+            }
+        }
+        return {'x': x, 'y': y};
+    }
+    var decoded = {};
+    for (var key in value) {
+        decoded[key] = decodeSeries(value[key]);
+    }
+    return decoded;
+}
+
+function decodeFloat32(text) {
+    var binary = atob(text);
+    var view = new DataView(new ArrayBuffer(binary.length));
+    for (var i = 0; i < binary.length; i++) {
+        view.setUint8(i, binary.charCodeAt(i));
+    }
+    var values = new Array(binary.length / 4);
+    for (var i = 0; i < values.length; i++) {
+        values[i] = view.getFloat32(4 * i, true);
+    }
+    return values;
+}
+
 function userAddModule(type, module, name) {
     localStorage.setItem(name, "1");
     addModule(type, module, name);
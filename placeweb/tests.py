@@ -1,3 +1,233 @@
-from django.test import TestCase
+"""Tests for the PLACE web application"""
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import catalog, compaction, views, worker
+
+
+class _MediaTestCase(SimpleTestCase):
+    """Run each test with its own, empty, media directory"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp(prefix='test_place_')
+        self.experiments = os.path.join(self.media, 'experiments')
+        os.makedirs(self.experiments)
+        media_root = override_settings(MEDIA_ROOT=self.media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        patches = [
+            mock.patch.object(catalog, 'EXPERIMENTS', self.experiments),
+            mock.patch.object(catalog, 'CATALOG', os.path.join(self.media, 'catalog.sqlite3')),
+            mock.patch.object(views.compaction, 'start_service'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def _post(self, view, data):
+        request = self.factory.post('/', json.dumps(data), content_type='application/json')
+        return view(request)
+
+    def _experiment(self, name, *filenames, timestamp=0):
+        directory = os.path.join(self.experiments, name)
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'config.json'), 'w') as config_file:
+            json.dump({'title': name, 'comments': '', 'updates': 1,
+                       'metadata': {'timestamp': timestamp}}, config_file)
+        for filename in filenames:
+            open(os.path.join(directory, filename), 'w').close()
+        catalog.record(directory)
+        return directory
+
+
+class TestExperimentViews(_MediaTestCase):
+    """Test submitting and deleting experiments"""
+
+    def test0001_submit_while_busy(self):
+        """An experiment that is refused is not added to the catalog"""
+        finished = threading.Event()
+        thread = threading.Thread(target=finished.wait)
+        thread.start()
+        running = mock.Mock()
+        running.get_progress.return_value = {}
+        self.assertTrue(worker.LOCK.acquire(blocking=False))
+        try:
+            with mock.patch.object(worker, 'WORK_THREAD', thread), \
+                    mock.patch.object(worker, 'WORKER', running):
+                response = self._post(views.submit, {'title': 'refused', 'plugins': {}})
+        finally:
+            worker.LOCK.release()
+            finished.set()
+            thread.join()
+        self.assertEqual(json.loads(response.content)['status'], worker.RUNNING)
+        self.assertEqual(catalog.count(), 0)
+        self.assertEqual(os.listdir(self.experiments), [])
+
+    def test0002_delete_resumable(self):
+        """An aborted experiment, with a checkpoint and profiles, is deleted"""
+        directory = self._experiment('000000', 'checkpoint.json', 'profile_update.prof')
+        self.assertEqual(catalog.count(), 1)
+        response = self._post(views.delete, {'location': '000000'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual(catalog.count(), 0)
+
+    def test0003_delete_outside_experiments(self):
+        """Only experiment directories can be deleted"""
+        self._experiment('000000')
+        for name in ['..', '', '000000/..']:
+            response = self._post(views.delete, {'location': name})
+            self.assertEqual(response.status_code, 400)
+        self.assertTrue(os.path.exists(self.experiments))
+        self.assertEqual(catalog.count(), 1)
+
+    def test0004_resume_outside_experiments(self):
+        """Only experiment directories can be resumed"""
+        outside = os.path.join(self.media, 'outside')
+        os.makedirs(outside)
+        with mock.patch.object(worker, 'resume') as resume:
+            for name in ['..', '', '../outside', outside, '000000/..']:
+                response = self._post(views.resume, {'location': name})
+                self.assertEqual(response.status_code, 400)
+            resume.assert_not_called()
+            self.assertEqual(catalog.count(), 0)
+            directory = os.path.join(self.experiments, '000000')
+            os.makedirs(directory)
+            self._post(views.resume, {'location': '000000'})
+            resume.assert_called_once_with(directory)
+        self.assertEqual(catalog.count(), 1)
+
+    def test0005_submit_catalog_error(self):
+        """The worker is released if the catalog cannot be updated"""
+        with mock.patch.object(worker, 'BasicExperiment') as experiment, \
+                mock.patch.object(catalog, 'record',
+                                  side_effect=sqlite3.OperationalError('database is locked')):
+            experiment.return_value.config = {'directory': self.experiments + '/000000'}
+            with self.assertRaises(sqlite3.OperationalError):
+                self._post(views.submit, {'title': 'locked', 'plugins': {}})
+        self.assertFalse(worker.LOCK.locked())
+
+    def test0006_history_pages(self):
+        """The history is sent a page at a time, newest first"""
+        for number in range(5):
+            self._experiment('{:06d}'.format(number), timestamp=1000 * number)
+        pages = []
+        for query in [{}, {'limit': 2}, {'offset': 2, 'limit': 2}, {'offset': 4},
+                      {'offset': 9}]:
+            response = views.status(self.factory.get('/', query))
+            history = json.loads(response.content)['history']
+            self.assertEqual(history['total'], 5)
+            pages.append([entry['location'] for entry in history['experiment_entries']])
+        self.assertEqual(pages, [['000004', '000003', '000002', '000001', '000000'],
+                                 ['000004', '000003'], ['000002', '000001'], ['000000'], []])
+        response = views.status(self.factory.get('/', {'limit': 'all'}))
+        self.assertEqual(response.status_code, 400)
+
+
+class TestCompaction(_MediaTestCase):
+    """Test compacting the experiments on the server"""
+
+    def _row_files(self, directory, updates, age=3600):
+        """Write one row file for each update, saved ``age`` seconds ago"""
+        for update_number in range(updates):
+            filename = os.path.join(directory, 'data_{:03d}.npy'.format(update_number))
+            np.save(filename, np.array([(update_number,)], dtype=[('count', 'int64')]))
+            _age(filename, age)
+
+    def test0001_pack(self):
+        """The row files of a finished run are packed into data.npy"""
+        directory = self._experiment('000000')
+        self._row_files(directory, 5)
+        self.assertEqual(compaction.compact(directory, preview=False), ['packed 5 rows'])
+        self.assertEqual(sorted(os.listdir(directory)), ['config.json', 'data.npy'])
+        np.testing.assert_array_equal(
+            np.load(os.path.join(directory, 'data.npy'))['count'], np.arange(5))
+        self.assertEqual(compaction.compact(directory, preview=False), [])
+
+    def test0002_packed_already(self):
+        """Row files left beside a matching data.npy are removed"""
+        directory = self._experiment('000000')
+        self._row_files(directory, 3)
+        np.save(os.path.join(directory, 'data.npy'),
+                np.array([(0,), (1,), (2,)], dtype=[('count', 'int64')]))
+        self.assertEqual(compaction.compact(directory, preview=False),
+                         ['removed 3 row files'])
+        self.assertEqual(sorted(os.listdir(directory)), ['config.json', 'data.npy'])
+
+    def test0003_resumable(self):
+        """Resumable runs are kept until their checkpoint is stale"""
+        directory = self._experiment('000000', 'checkpoint.json')
+        checkpoint = os.path.join(directory, 'checkpoint.json')
+        _age(checkpoint, 3600)
+        self._row_files(directory, 4)
+        self.assertEqual(compaction.compact(directory, preview=False), [])
+        self.assertEqual(compaction.compact(directory, preview=False, stale_days=1), [])
+        self.assertEqual(len(os.listdir(directory)), 6)
+        _age(checkpoint, 2 * compaction.DAY_SECONDS)
+        self.assertEqual(compaction.compact(directory, preview=False, stale_days=1),
+                         ['packed 4 rows'])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test0004_running(self):
+        """Experiments that are running are not touched"""
+        directory = self._experiment('000000')
+        self._row_files(directory, 2, age=0)
+        self.assertEqual(compaction.compact(directory, preview=False), [])
+        self._row_files(directory, 2)
+        running = mock.Mock(config={'directory': directory})
+        self.assertTrue(worker.LOCK.acquire(blocking=False))
+        try:
+            with mock.patch.object(worker, 'WORKER', running):
+                self.assertEqual(compaction.compact(directory, preview=False), [])
+        finally:
+            worker.LOCK.release()
+        self.assertEqual(len(os.listdir(directory)), 3)
+
+    def test0005_serve(self):
+        """The server compacts runs whose checkpoint is stale"""
+        directory = self._experiment('000000', 'checkpoint.json')
+        _age(os.path.join(directory, 'checkpoint.json'), 8 * compaction.DAY_SECONDS)
+        self._row_files(directory, 3)
+        with mock.patch.object(compaction, '_server_busy', return_value=False), \
+                mock.patch.object(compaction, 'sleep', side_effect=StopIteration), \
+                self.assertRaises(StopIteration):
+            compaction._serve(None, False, 7.0)  # pylint: disable=protected-access
+        self.assertTrue(os.path.exists(os.path.join(directory, 'data.npy')))
+        self.assertFalse(os.path.exists(os.path.join(directory, 'checkpoint.json')))
+
+    def test0006_throttle(self):
+        """The rate is limited, and compaction pauses while PLACE is busy"""
+        busy = iter([False, True, True, True, False, False])
+        with mock.patch.object(compaction, 'sleep') as sleep:
+            throttle = compaction.Throttle(1000.0, busy=lambda: next(busy))
+            throttle(500)
+            self.assertEqual(sleep.call_count, 1)
+            self.assertAlmostEqual(sleep.call_args[0][0], 0.5, places=1)
+            sleep.reset_mock()
+            throttle(0)
+            self.assertEqual(sleep.call_args_list[-2:], [mock.call(1.0)] * 2)
+            sleep.reset_mock()
+            throttle(100)
+            self.assertAlmostEqual(sleep.call_args[0][0], 0.1, places=1)
+        with mock.patch.object(compaction, 'sleep') as sleep:
+            compaction.Throttle(0)(10**9)
+            sleep.assert_not_called()
+
+
+def _age(filename, seconds):
+    """Set the modification time of a file to ``seconds`` ago"""
+    then = time.time() - seconds
+    os.utime(filename, (then, then))
@@ -26,8 +26,10 @@ urlpatterns = [  # pylint: disable=invalid-name
     path('', views.index, name='index'),
     path('submit/', views.submit, name='submit'),
     path('abort/', views.abort, name='abort'),
+    path('resume/', views.resume, name='resume'),
     path('status/', views.status, name='status'),
     path('results/', views.results, name='results'),
+    path('preview/', views.preview, name='preview'),
     path('delete/', views.delete, name='delete'),
     path('download/<str:location>', views.download, name='download'),
     re_path(r'^figures/(?P<path>.*)$',
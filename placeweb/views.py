@@ -2,17 +2,20 @@
 import io
 import os.path
 import json
-import time
+import shutil
 import zipfile
 import glob
 
 import pkg_resources
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse, Http404
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, Http404
 from django.views.static import serve
 from django.shortcuts import render
 
-from . import worker
+from place.preview import Preview
+from place.reader import Experiment
+
+from . import catalog, compaction, worker
 from .plugins import INSTALLED_PLACE_PLUGINS
 
 
@@ -38,11 +41,23 @@ def submit(request):
     return JsonResponse(worker.status())
 
 
-def status(request):  # pylint: disable=unused-argument
-    """Check status of PLACE"""
+def status(request):
+    """Check status of PLACE
+
+    When PLACE is ready, the experiment history is included. It can be
+    requested a page at a time, with the ``offset`` and ``limit`` query
+    parameters.
+    """
     current = worker.status()
     if current['status'] == worker.READY:
-        current['history'] = history()
+        compaction.start_service()
+        try:
+            offset = int(request.GET.get('offset', 0))
+            limit = request.GET.get('limit')
+            limit = None if limit is None else int(limit)
+        except ValueError:
+            return HttpResponseBadRequest('offset and limit must be integers')
+        current['history'] = history(offset, limit)
     return JsonResponse(current)
 
 
@@ -52,70 +67,36 @@ def abort(request):
     return status(request)
 
 
-def history():
-    """Get summary of experiments stored on the server"""
-    version = pkg_resources.require("place")[0].version
-    experiment_entries = []
-    path = '{}/experiments/'.format(settings.MEDIA_ROOT)
+def resume(request):
+    """Resume an interrupted PLACE experiment"""
+    name = json.load(request)['location']
+    location = _experiment_directory(name)
+    if location is None:
+        return HttpResponseBadRequest('not an experiment: {}'.format(name))
     try:
-        items = os.listdir(path)
+        worker.resume(location)
     except FileNotFoundError:
-        items = []
-    for item in items:
-        try:
-            with open(os.path.join(path, item, 'config.json')) as file_p:
-                config = json.load(file_p)
-            experiment_entry = {}
-            try:
-                experiment_entry['version'] = config['metadata']['PLACE_version']
-            except KeyError:
-                experiment_entry['version'] = "0.0.0"
-            try:
-                experiment_entry['timestamp'] = config['metadata']['timestamp']
-            except KeyError:
-                experiment_entry['timestamp'] = 0
-            try:
-                experiment_entry['title'] = config['title']
-            except KeyError:
-                experiment_entry['title'] = "untitled"
-            try:
-                experiment_entry['comments'] = config['comments']
-            except KeyError:
-                experiment_entry['comments'] = "no comments"
-            experiment_entry['location'] = item
-            experiment_entry['filename'] = _title_to_filename(
-                experiment_entry['title'])
-            experiment_entries.append(experiment_entry)
-        except FileNotFoundError:
-            experiment_entry = {}
-            experiment_entry['version'] = "0.0.0"
-            experiment_entry['timestamp'] = 0
-            experiment_entry['title'] = "<invalid>"
-            experiment_entry['comments'] = "<missing config.json>"
-            experiment_entry['location'] = item
-            experiment_entry['filename'] = "data.zip"
-            experiment_entries.append(experiment_entry)
-        except KeyError as err:
-            print('Experiment in {} is missing config values: {}'.format(
-                os.path.join(path, item), err))
-            experiment_entry = {}
-            experiment_entry['version'] = version
-            experiment_entry['timestamp'] = 0
-            experiment_entry['title'] = "<invalid>"
-            experiment_entry['comments'] = "<missing values in config.json>"
-            experiment_entry['location'] = item
-            experiment_entry['filename'] = "data.zip"
-            experiment_entries.append(experiment_entry)
-    return {'experiment_entries': sorted(experiment_entries, key=timestamp_to_millis, reverse=True)}
-
-
-def timestamp_to_millis(entry):
-    """Convert timestamps to milliseconds (if not already)"""
-    if isinstance(entry['timestamp'], int):
-        return entry['timestamp']
-    # The following code is really only needed for
-    # experiments created with PLACE prior to version 0.8
-    return time.mktime(time.strptime(entry['timestamp'], r'%Y-%m-%d %H:%M:%S.%f'))
+        raise Http404('No checkpoint for this PLACE experiment')
+    catalog.record(location)
+    return JsonResponse(worker.status())
+
+
+def history(offset=0, limit=None):
+    """Get summary of experiments stored on the server
+
+    The summaries come from the experiment catalog, newest first.
+
+    :param offset: the number of experiments to skip
+    :type offset: int
+
+    :param limit: the maximum number of experiments to return, or ``None``
+                  for all of them
+    :type limit: int
+    """
+    return {
+        'experiment_entries': catalog.entries(offset, limit),
+        'total': catalog.count(),
+    }
 
 
 def results(request):  # pylint: disable=unused-argument
@@ -132,7 +113,8 @@ def results(request):  # pylint: disable=unused-argument
         return JsonResponse(
             {
                 "result": "completed",
-                "progress": json_results_dat
+                "progress": json_results_dat,
+                "preview": _preview_fields(os.path.dirname(res))
             }
         )
     except FileNotFoundError:
@@ -158,6 +140,24 @@ def results(request):  # pylint: disable=unused-argument
     )
 
 
+def preview(request):
+    """Get the min/max preview of one update of a trace"""
+    query = json.load(request)
+    path = os.path.join(settings.MEDIA_ROOT, "experiments", query['location'])
+    try:
+        factor, minmax = Preview(path).read(
+            query['field'], int(query['update']), width=query.get('width'))
+    except (FileNotFoundError, KeyError, IndexError):
+        raise Http404('No preview for this PLACE experiment')
+    return JsonResponse(
+        {
+            "factor": factor,
+            "min": minmax[..., 0].tolist(),
+            "max": minmax[..., 1].tolist()
+        }
+    )
+
+
 def download(request, location):  # pylint: disable=unused-argument
     """Download experiment data"""
     path = os.path.join(settings.MEDIA_ROOT, "experiments", location)
@@ -175,10 +175,11 @@ def download(request, location):  # pylint: disable=unused-argument
     except FileNotFoundError:
         title = 'incomplete_' + title
     try:
-        zipf.write(os.path.join(path, 'data.npy'), arcname='data.npy')
+        data_files = Experiment(path).data_files()
     except FileNotFoundError:
-        for filename in glob.glob(path + '/data_*.npy'):
-            zipf.write(filename, arcname=os.path.basename(filename))
+        data_files = []
+    for filename in data_files + glob.glob(path + '/preview/*'):
+        zipf.write(filename, arcname=os.path.relpath(filename, path))
     for filename in glob.glob(path + '/*.png'):
         zipf.write(filename, arcname=os.path.basename(filename))
     for filename in glob.glob(path + '/*.csv'):
@@ -187,37 +188,30 @@ def download(request, location):  # pylint: disable=unused-argument
     response = HttpResponse(stream.getvalue())
     response['content_type'] = 'application/zip'
     response['Content-Disposition'] = 'attachement;filename={}'.format(
-        _title_to_filename(title))
+        catalog.title_to_filename(title))
     stream.close()
     return response
 
 
 def delete(request):
-    """Delete experiment data"""
-    location = os.path.join(
-        settings.MEDIA_ROOT,
-        "experiments",
-        json.load(request)['location']
-    )
-    try:
-        os.remove(os.path.join(location, 'config.json'))
-    except FileNotFoundError:
-        pass
-    try:
-        os.remove(os.path.join(location, 'results.json'))
-    except FileNotFoundError:
-        pass
-    try:
-        os.remove(os.path.join(location, 'data.npy'))
-    except FileNotFoundError:
-        for filename in glob.glob(location + '/data*.npy'):
-            os.remove(filename)
-    for filename in glob.glob(location + '/*.png'):
-        os.remove(filename)
+    """Delete experiment data
+
+    The whole experiment directory is removed, including checkpoints,
+    profiles and anything else saved in it.
+    """
+    name = json.load(request)['location']
+    location = _experiment_directory(name)
+    if location is None:
+        return HttpResponseBadRequest('not an experiment: {}'.format(name))
     try:
-        os.rmdir(location)
+        shutil.rmtree(location)
     except FileNotFoundError:
         pass
+    except OSError as err:
+        print('Could not delete {}: {}'.format(location, err))
+        catalog.record(location)
+        return status(request)
+    catalog.forget(name)
     return status(request)
 
 
@@ -229,12 +223,19 @@ def progress_plots(request, path):
           document_root=settings.MEDIA_ROOT)
 
 
-def _title_to_filename(title):
-    """convert title to a filename"""
-    filename = ''.join(
-        ['_' if c in '_.- ' else c
-         for c in list(title)
-         if c in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.- "][:25])
-    if filename == '':
-        return 'data.zip'
-    return filename + '.zip'
+def _experiment_directory(name):
+    """The directory of an experiment, or ``None`` if the name is not a
+    directory directly inside the experiments directory"""
+    experiments = os.path.join(settings.MEDIA_ROOT, "experiments")
+    location = os.path.join(experiments, name)
+    if os.path.dirname(os.path.abspath(location)) != os.path.abspath(experiments):
+        return None
+    return location
+
+
+def _preview_fields(path):
+    """The fields with a min/max preview in an experiment"""
+    try:
+        return list(Preview(path).names)
+    except FileNotFoundError:
+        return []
@@ -7,9 +7,15 @@ status function until PLACE says it is ready. Then you can submit a new
 experiment.
 """
 
+import json
+import os.path
 import threading
+from sys import argv
+
 from place.basic_experiment import BasicExperiment
 
+from . import catalog
+
 LOCK = threading.Lock()
 WORKER = None
 WORK_THREAD = None
@@ -22,13 +28,45 @@ QUEUED = 'Queued'
 def start(config):
     """Attempt to start a PLACE experiment
 
+    The experiment is added to the catalog once its directory has been
+    created.
+
     :returns: either a *started* or *busy* message
     :rtype: str
     """
     global WORKER, WORK_THREAD  # pylint: disable=global-statement
     if LOCK.acquire(blocking=False):
-        WORKER = BasicExperiment(config)
-        WORK_THREAD = threading.Thread(target=WORKER.run)
+        try:
+            WORKER = BasicExperiment(config)
+            catalog.record(WORKER.config['directory'])
+        except Exception:
+            LOCK.release()
+            raise
+        WORK_THREAD = threading.Thread(target=_run, args=(WORKER,))
+        WORK_THREAD.start()
+        return STARTED
+    return RUNNING
+
+
+def resume(directory):
+    """Attempt to resume an interrupted PLACE experiment
+
+    The experiment continues in its directory, from its last checkpoint.
+
+    :param directory: the experiment directory
+    :type directory: str
+
+    :returns: either a *started* or *busy* message
+    :rtype: str
+    """
+    global WORKER, WORK_THREAD  # pylint: disable=global-statement
+    if LOCK.acquire(blocking=False):
+        try:
+            WORKER = BasicExperiment(_saved_config(directory), resume=True)
+        except Exception:
+            LOCK.release()
+            raise
+        WORK_THREAD = threading.Thread(target=_run, args=(WORKER,))
         WORK_THREAD.start()
         return STARTED
     return RUNNING
@@ -72,3 +110,29 @@ def start_experiment(config):
             if not WORK_THREAD.is_alive():
                 break
             print(WORKER.get_progress())
+
+
+def resume_experiment():
+    """Command-line entry point to resume an interrupted experiment"""
+    if not (len(argv) == 2 and os.path.isfile(os.path.join(argv[1], 'checkpoint.json'))):
+        print('Usage: {} [DIRECTORY]'.format(os.path.basename(argv[0])))
+        print('Resume an interrupted PLACE experiment from its checkpoint.')
+        return
+    experiment = BasicExperiment(_saved_config(argv[1]), resume=True)
+    experiment.run()
+
+
+def _run(experiment):
+    """Run an experiment, and update its catalog entry when it stops"""
+    try:
+        experiment.run()
+    finally:
+        catalog.record(experiment.config['directory'])
+
+
+def _saved_config(directory):
+    """Load the configuration saved in an experiment directory"""
+    with open(os.path.join(directory, 'config.json')) as config_file:
+        config = json.load(config_file)
+    config['directory'] = directory
+    return config
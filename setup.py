@@ -34,5 +34,11 @@ setup(
         'place_server = placeweb.server:start',
         'place_renamer = place.utilities:column_renamer',
         'place_unpack = place.utilities:multiple_files',
-        'place_pack = place.utilities:single_file'], },
+        'place_pack = place.utilities:single_file',
+        'place_bench = place.bench:main',
+        'place_resume = placeweb.worker:resume_experiment',
+        'place_catalog = placeweb.catalog:main',
+        'place_preview = place.preview:preview',
+        'place_compact = placeweb.compaction:main',
+        'place_reduce = place.analysis:main'], },
 )